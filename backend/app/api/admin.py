@@ -2,17 +2,29 @@
 管理员相关API
 """
 import json
+import re
 from typing import List, Optional
+from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import desc
 from pydantic import BaseModel
 from passlib.context import CryptContext
 from functools import wraps
 
-from app.database.connection import get_database
-from app.models.database import AdminUser, ProhibitedWord, OriginalWord, HomophoneReplacement, AdminLog
-from app.api.auth import get_current_admin
+from app.database.connection import get_database, SessionLocal
+from app.models.database import (
+    AdminUser, ProhibitedWord, OriginalWord, HomophoneReplacement, AdminLog, WhitelistPattern, UserContentHistory
+)
+from app.api.auth import get_current_admin, invalidate_admin_user
+from app.core.catalog_versions import CATALOG_PROHIBITED_WORD, CATALOG_HOMOPHONE, bump_catalog_version
+from app.core.lexicon_artifact import lexicon_artifacts, rebuild_lexicon_artifact
+from app.core.lexicon_impact import preview_impact
+from app.core.history_archive import history_archive, history_retention, history_record
+from app.core.content_store import history_texts
+from app.core.config import IMPACT_PREVIEW_MAX_NOTES
 
 # 密码加密
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -136,6 +148,17 @@ class PasswordResetRequest(BaseModel):
     new_password: str
 
 
+class LexiconImpactRequest(BaseModel):
+    change_type: str  # add_word / remove_word / add_whitelist / remove_whitelist
+    word: Optional[str] = None
+    category: str = "general"
+    severity: str = "medium"
+    pattern: Optional[str] = None
+    pattern_id: Optional[int] = None
+    limit: int = 10000
+    sample_size: int = 5
+
+
 def require_super_admin(func):
     """装饰器：要求超级管理员权限"""
     @wraps(func)
@@ -242,6 +265,7 @@ async def create_prohibited_word(
         created_by=current_admin.username
     )
     db.add(prohibited_word)
+    bump_catalog_version(db, CATALOG_PROHIBITED_WORD)
     db.commit()
     db.refresh(prohibited_word)
     
@@ -251,6 +275,7 @@ async def create_prohibited_word(
         prohibited_word.id, None, word_data.dict()
     )
     db.commit()
+    await run_in_threadpool(rebuild_lexicon_artifact)
     
     return ProhibitedWordResponse(
         id=prohibited_word.id,
@@ -295,6 +320,7 @@ async def update_prohibited_word(
     if word_data.is_active is not None:
         prohibited_word.status = 1 if word_data.is_active else 0
     
+    bump_catalog_version(db, CATALOG_PROHIBITED_WORD)
     db.commit()
     db.refresh(prohibited_word)
     
@@ -304,6 +330,7 @@ async def update_prohibited_word(
         word_id, old_data, word_data.dict(exclude_unset=True)
     )
     db.commit()
+    await run_in_threadpool(rebuild_lexicon_artifact)
     
     return ProhibitedWordResponse(
         id=prohibited_word.id,
@@ -342,11 +369,78 @@ async def delete_prohibited_word(
     
     # 删除
     db.delete(prohibited_word)
+    bump_catalog_version(db, CATALOG_PROHIBITED_WORD)
     db.commit()
+    await run_in_threadpool(rebuild_lexicon_artifact)
     
     return {"message": "删除成功"}
 
 
+# 词库变更影响预览
+@router.post("/lexicon/impact-preview")
+async def preview_lexicon_impact(
+    request: LexiconImpactRequest,
+    db: Session = Depends(get_database),
+    current_admin: AdminUser = Depends(get_current_admin)
+):
+    """在最近的历史笔记上回放候选的词库变更，统计会新增/消除多少笔记的违规"""
+    lexicon = lexicon_artifacts.current()
+    whitelist = lexicon.whitelist_patterns
+    words = list(lexicon.prohibited_words.words())
+
+    if request.change_type == "remove_whitelist":
+        if request.pattern_id is None:
+            raise HTTPException(status_code=400, detail="缺少白名单模式ID")
+        pattern_row = db.query(WhitelistPattern).filter(WhitelistPattern.id == request.pattern_id).first()
+        if not pattern_row:
+            raise HTTPException(status_code=404, detail="白名单模式不存在")
+        word = pattern_row.prohibited_word
+    else:
+        word = (request.word or "").strip()
+        if not word:
+            raise HTTPException(status_code=400, detail="缺少违禁词")
+
+    index = words.index(word) if word in words else None
+    current_patterns = list(whitelist.get(word, []))
+
+    if request.change_type == "add_word":
+        if index is not None:
+            raise HTTPException(status_code=400, detail="该违禁词已存在")
+        word_info = {
+            "word": word,
+            "category": request.category,
+            "risk_level": _convert_severity_to_risk_level(request.severity)
+        }
+        before, after = None, current_patterns
+    else:
+        if index is None:
+            raise HTTPException(status_code=400, detail="该违禁词不在词库中")
+        word_info = lexicon.prohibited_words[index]
+        if request.change_type == "remove_word":
+            before, after = current_patterns, None
+        elif request.change_type == "add_whitelist":
+            if not request.pattern:
+                raise HTTPException(status_code=400, detail="缺少白名单模式")
+            try:
+                re.compile(request.pattern)
+            except re.error as e:
+                raise HTTPException(status_code=400, detail=f"无效的正则表达式: {str(e)}")
+            before, after = current_patterns, current_patterns + [request.pattern]
+        elif request.change_type == "remove_whitelist":
+            before = current_patterns
+            after = [p for p in current_patterns if p != pattern_row.pattern]
+        else:
+            raise HTTPException(status_code=400, detail="不支持的变更类型")
+
+    limit = max(1, min(request.limit, IMPACT_PREVIEW_MAX_NOTES))
+    # 读取历史笔记和回放都放到线程池中执行（正文分块流式读取），不阻塞事件循环
+    result = await run_in_threadpool(
+        preview_impact, db, limit, word_info, before, after,
+        list(lexicon.approved_spellings), max(0, min(request.sample_size, 50))
+    )
+    return {"change_type": request.change_type, "word": word, **result}
+
+
 # 原词管理  
 @router.get("/original-words", response_model=List[OriginalWordResponse])
 async def get_original_words(
@@ -415,6 +509,7 @@ async def create_original_word(
         created_by=current_admin.username
     )
     db.add(original_word)
+    bump_catalog_version(db, CATALOG_HOMOPHONE)
     db.commit()
     db.refresh(original_word)
     
@@ -424,6 +519,7 @@ async def create_original_word(
         original_word.id, None, word_data.dict()
     )
     db.commit()
+    await run_in_threadpool(rebuild_lexicon_artifact)
     
     return OriginalWordResponse(
         id=original_word.id,
@@ -457,6 +553,7 @@ async def update_original_word(
     if word_data.original_word is not None:
         original_word.word = word_data.original_word
     
+    bump_catalog_version(db, CATALOG_HOMOPHONE)
     db.commit()
     db.refresh(original_word)
     
@@ -466,6 +563,7 @@ async def update_original_word(
         word_id, old_data, word_data.dict(exclude_unset=True)
     )
     db.commit()
+    await run_in_threadpool(rebuild_lexicon_artifact)
     
     return OriginalWordResponse(
         id=original_word.id,
@@ -505,7 +603,9 @@ async def delete_original_word(
     
     # 删除原词
     db.delete(original_word)
+    bump_catalog_version(db, CATALOG_HOMOPHONE)
     db.commit()
+    await run_in_threadpool(rebuild_lexicon_artifact)
     
     return {"message": "删除成功"}
 
@@ -534,6 +634,7 @@ async def create_homophone_replacement(
         created_by=current_admin.username
     )
     db.add(replacement)
+    bump_catalog_version(db, CATALOG_HOMOPHONE)
     db.commit()
     db.refresh(replacement)
     
@@ -543,6 +644,7 @@ async def create_homophone_replacement(
         replacement.id, None, replacement_data.dict()
     )
     db.commit()
+    await run_in_threadpool(rebuild_lexicon_artifact)
     
     return HomophoneReplacementResponse(
         id=replacement.id,
@@ -584,6 +686,7 @@ async def update_homophone_replacement(
     if replacement_data.confidence_score is not None:
         replacement.confidence_score = replacement_data.confidence_score
     
+    bump_catalog_version(db, CATALOG_HOMOPHONE)
     db.commit()
     db.refresh(replacement)
     
@@ -593,6 +696,7 @@ async def update_homophone_replacement(
         replacement_id, old_data, replacement_data.dict(exclude_unset=True)
     )
     db.commit()
+    await run_in_threadpool(rebuild_lexicon_artifact)
     
     return HomophoneReplacementResponse(
         id=replacement.id,
@@ -630,7 +734,9 @@ async def delete_homophone_replacement(
     
     # 删除
     db.delete(replacement)
+    bump_catalog_version(db, CATALOG_HOMOPHONE)
     db.commit()
+    await run_in_threadpool(rebuild_lexicon_artifact)
     
     return {"message": "删除成功"}
 
@@ -694,6 +800,86 @@ async def get_admin_stats_summary(
     }
 
 
+# 历史记录归档
+@router.get("/history/archive")
+async def get_history_archive_status(
+    db: Session = Depends(get_database),
+    current_admin: AdminUser = Depends(get_current_admin)
+):
+    """历史记录分区概况：热分区记录数和最早时间，归档各月分区的记录数和压缩比"""
+    hot_count = db.query(UserContentHistory).count()
+    oldest = db.query(UserContentHistory.created_at).order_by(UserContentHistory.created_at).first()
+    archive = await run_in_threadpool(history_archive.status)
+    return {
+        "hot_days": history_retention.hot_days,
+        "hot_rows": hot_count,
+        "hot_oldest_at": oldest[0].isoformat() if oldest and oldest[0] else None,
+        "archive": archive
+    }
+
+
+@router.post("/history/archive/run")
+async def run_history_archive(
+    current_admin: AdminUser = Depends(get_current_admin)
+):
+    """立即执行一轮归档（已有进程在归档时跳过）"""
+    return await run_in_threadpool(history_retention.run_once)
+
+
+def _parse_export_date(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"无效的日期 {name}: {value}")
+
+
+@router.get("/history/export")
+async def export_history(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    include_archive: bool = True,
+    current_admin: AdminUser = Depends(get_current_admin)
+):
+    """导出历史记录（JSON Lines，按创建时间 [start_date, end_date] 过滤；先归档后热分区，流式输出）"""
+    start = _parse_export_date(start_date, "start_date")
+    end = _parse_export_date(end_date, "end_date")
+    if end is not None and len(end_date) <= 10:
+        # 只给日期时包含当天
+        end += timedelta(days=1)
+
+    def lines():
+        if include_archive:
+            for record in history_archive.iter_rows(start, end):
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+        db = SessionLocal()
+        try:
+            query = db.query(UserContentHistory)
+            if start is not None:
+                query = query.filter(UserContentHistory.created_at >= start)
+            if end is not None:
+                query = query.filter(UserContentHistory.created_at < end)
+            # 按id分页，每页批量读取正文
+            last_id = 0
+            while True:
+                rows = query.filter(UserContentHistory.id > last_id).order_by(UserContentHistory.id).limit(1000).all()
+                if not rows:
+                    break
+                for row, texts in zip(rows, history_texts(db, rows)):
+                    yield json.dumps(history_record(row, texts), ensure_ascii=False) + "\n"
+                last_id = rows[-1].id
+                db.expunge_all()
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="history.jsonl"'}
+    )
+
+
 # 管理员账号管理
 @router.get("/users", response_model=List[AdminUserResponse])
 @require_super_admin
@@ -831,6 +1017,7 @@ async def reset_admin_password(
     
     # 更新密码
     target_user.password_hash = pwd_context.hash(password_data.new_password)
+    invalidate_admin_user(db, user_id)
     db.commit()
     
     # 记录操作日志
@@ -863,6 +1050,7 @@ async def update_admin_status(
     
     old_status = target_user.status
     target_user.status = status
+    invalidate_admin_user(db, user_id)
     db.commit()
     
     # 记录操作日志
@@ -926,6 +1114,7 @@ async def delete_admin_user(
         # 删除用户
         print("开始删除用户...")
         db.delete(target_user)
+        invalidate_admin_user(db, user_id)
         db.commit()
         print("用户删除成功")
         
@@ -1,10 +1,13 @@
 """
 认证相关API
 """
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -12,6 +15,9 @@ from pydantic import BaseModel
 
 from app.database.connection import get_database
 from app.models.database import AdminUser
+from app.core.catalog_versions import CATALOG_ADMIN_USER, catalog_versions, bump_catalog_version
+from app.core.config import ADMIN_AUTH_CACHE_TTL
+from app.core.metrics import record_cache
 
 router = APIRouter()
 security = HTTPBearer()
@@ -59,11 +65,96 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-def get_current_admin(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_database)
-) -> AdminUser:
-    """获取当前登录的管理员"""
+class AdminPrincipal:
+    """已校验的管理员身份（与数据库会话无关，可跨请求缓存）"""
+
+    __slots__ = ("id", "username", "email", "role", "permissions", "status")
+
+    def __init__(self, user: AdminUser):
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+        self.role = user.role
+        self.permissions = user.permissions
+        self.status = user.status
+
+
+class AdminPrincipalCache:
+    """令牌 -> 已校验身份 的短时缓存；过期时间不超过令牌本身的有效期"""
+
+    def __init__(self, ttl: float, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, AdminPrincipal]] = {}
+        self._version: Optional[int] = None
+
+    def get(self, token: str) -> Optional[AdminPrincipal]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            self._entries.pop(token, None)
+            return None
+        return entry[1]
+
+    def put(self, token: str, principal: AdminPrincipal, token_expires_at: Optional[float]):
+        if self.ttl <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                self._evict()
+            self._entries[token] = (expires_at, principal)
+
+    def _evict(self):
+        """先清理过期项，仍然超限时丢弃最早写入的一半"""
+        now = time.time()
+        for token in [t for t, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[token]
+        if len(self._entries) >= self.max_size:
+            for token in list(self._entries)[:self.max_size // 2]:
+                del self._entries[token]
+
+    def invalidate_user(self, user_id: int):
+        """账号被禁用、删除或重置密码后，立即作废该账号的所有缓存令牌"""
+        with self._lock:
+            for token in [t for t, (_, principal) in self._entries.items() if principal.id == user_id]:
+                del self._entries[token]
+
+    def sync_version(self, version: Optional[int]):
+        """管理员账号目录版本变化（其他进程修改了账号）时清空全部缓存"""
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+
+
+principal_cache = AdminPrincipalCache(ADMIN_AUTH_CACHE_TTL)
+
+
+def invalidate_admin_user(db: Session, user_id: int):
+    """修改管理员账号的事务提交前调用：提交后本进程立即作废该账号的缓存令牌，其他进程在下次轮询目录版本时清空缓存"""
+    bump_catalog_version(db, CATALOG_ADMIN_USER)
+    event.listen(db, "after_commit", lambda session: principal_cache.invalidate_user(user_id), once=True)
+
+
+def _on_catalog_change(versions: Dict[str, int]):
+    principal_cache.sync_version(versions.get(CATALOG_ADMIN_USER))
+
+
+catalog_versions.add_listener(_on_catalog_change)
+
+
+def _verify_admin_token(token: str, db: Session) -> AdminPrincipal:
+    """校验访问令牌并返回对应的启用状态管理员；命中缓存时不查询数据库"""
+    principal = principal_cache.get(token)
+    record_cache("admin_principal", principal is not None)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -71,7 +162,7 @@ def get_current_admin(
     )
     
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
@@ -82,7 +173,30 @@ def get_current_admin(
     if user is None or user.status != 1:
         raise credentials_exception
     
-    return user
+    principal = AdminPrincipal(user)
+    principal_cache.put(token, principal, payload.get("exp"))
+    return principal
+
+
+def get_current_admin(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_database)
+) -> AdminPrincipal:
+    """获取当前登录的管理员"""
+    return _verify_admin_token(credentials.credentials, db)
+
+
+def get_admin_from_request(request: Request, db: Session) -> AdminPrincipal:
+    """按需校验请求中的管理员令牌（用于公开接口中的管理员专属选项）"""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return _verify_admin_token(token, db)
 
 
 @router.post("/login", response_model=LoginResponse)
@@ -127,7 +241,7 @@ async def login(request: LoginRequest, db: Session = Depends(get_database)):
 
 
 @router.get("/profile", response_model=UserInfo)
-async def get_profile(current_user: AdminUser = Depends(get_current_admin)):
+async def get_profile(current_user: AdminPrincipal = Depends(get_current_admin)):
     """获取当前用户信息"""
     import json
     
@@ -4,8 +4,9 @@
 import json
 import time
 import uuid
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from itertools import islice
+from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
@@ -13,6 +14,13 @@ from app.database.connection import get_database
 from app.models.database import UserContentHistory
 from app.core.algorithms.content_analyzer import ContentAnalyzer
 from app.core.algorithms.content_optimizer import ContentOptimizer
+from app.core.responses import fast_json_response
+from app.core.history_archive import history_archive
+from app.core.issue_facts import record_issue_facts
+from app.core.content_store import content_hash, store_content, history_texts
+from app.core.metrics import instrumented, track_stage, record_issues
+from app.core.profiling import profile_request
+from app.api.auth import get_admin_from_request
 
 router = APIRouter()
 
@@ -20,6 +28,7 @@ router = APIRouter()
 class ContentRequest(BaseModel):
     content: str
     user_session: Optional[str] = None
+    debug: bool = False  # 调试模式（仅管理员），返回分阶段耗时和采样剖析摘要
 
 
 class DetectedIssue(BaseModel):
@@ -35,6 +44,7 @@ class DetectedIssue(BaseModel):
     context: str
     confidence: float
     severity: str  # "high", "medium", "low"
+    original_word: Optional[str] = None  # 变形写法对应的词条
 
 
 class OptimizationSuggestion(BaseModel):
@@ -49,12 +59,15 @@ class ContentAnalysisResponse(BaseModel):
     content_score: int
     suggestions: List[OptimizationSuggestion]
     processing_time: float
+    debug: Optional[dict] = None
 
 
 class ContentOptimizeRequest(BaseModel):
     content: str
     apply_suggestions: List[str] = []
     user_session: Optional[str] = None
+    deterministic: Optional[bool] = None  # 同一内容结果固定（以内容哈希为种子），省略时按服务配置
+    debug: bool = False  # 调试模式（仅管理员），返回分阶段耗时和采样剖析摘要
 
 
 class ContentOptimizeResponse(BaseModel):
@@ -62,6 +75,7 @@ class ContentOptimizeResponse(BaseModel):
     applied_changes: List[dict]
     score_improvement: int
     processing_time: float
+    debug: Optional[dict] = None
 
 
 class HistoryItem(BaseModel):
@@ -73,137 +87,173 @@ class HistoryItem(BaseModel):
     created_at: str
 
 
+def _serialize_issue(issue: Dict[str, Any]) -> Dict[str, Any]:
+    """将检测器输出的问题整理为DetectedIssue结构（不经过Pydantic校验）"""
+    position = issue.get("position", issue.get("start_pos", 0))
+    return {
+        "id": issue.get("id") or str(uuid.uuid4()),
+        "type": issue["type"],
+        "word": issue["word"],
+        "start_pos": position,
+        "end_pos": issue.get("end_pos", position + len(issue["word"])),
+        "risk_level": issue["risk_level"],
+        "category": issue.get("category", "unknown"),
+        "reason": issue.get("analysis", issue.get("reason", "检测到违规内容")),
+        "suggestions": issue["suggestions"],
+        "context": issue.get("context", ""),
+        "confidence": issue.get("confidence", 0.8),
+        "severity": issue.get("severity", "medium"),
+        "original_word": issue.get("original_word")
+    }
+
+
+def _serialize_suggestion(sugg: Dict[str, Any]) -> Dict[str, Any]:
+    """将优化建议整理为OptimizationSuggestion结构"""
+    return {
+        "type": sugg["type"],
+        "title": sugg["title"],
+        "description": sugg["description"],
+        "priority": sugg["priority"]
+    }
+
+
 @router.post("/analyze", response_model=ContentAnalysisResponse)
+@instrumented("analyze")
 async def analyze_content(
     request: ContentRequest,
+    http_request: Request,
     db: Session = Depends(get_database)
 ):
     """分析内容"""
+    if request.debug:
+        get_admin_from_request(http_request, db)
+    
     start_time = time.time()
     
-    try:
-        # 初始化分析器
-        analyzer = ContentAnalyzer(db)
-        
-        # 执行分析
-        analysis_result = await analyzer.analyze_content(request.content)
-        
-        processing_time = time.time() - start_time
-        
-        # 保存到历史记录
-        user_session = request.user_session or str(uuid.uuid4())
-        history = UserContentHistory(
-            user_session=user_session,
-            original_content=request.content,
-            detected_issues=json.dumps(analysis_result["issues"], ensure_ascii=False),
-            content_score_before=analysis_result["score"],
-            processing_time=processing_time,
-            is_optimized=0
-        )
-        db.add(history)
-        db.commit()
-        
-        return ContentAnalysisResponse(
-            detected_issues=[
-                DetectedIssue(
-                    id=issue.get("id", str(uuid.uuid4())),
-                    type=issue["type"],
-                    word=issue["word"],
-                    start_pos=issue.get("position", issue.get("start_pos", 0)),
-                    end_pos=issue.get("end_pos", issue.get("position", 0) + len(issue["word"])),
-                    risk_level=issue["risk_level"],
-                    category=issue.get("category", "unknown"),
-                    reason=issue.get("analysis", issue.get("reason", "检测到违规内容")),
-                    suggestions=issue["suggestions"],
-                    context=issue.get("context", ""),
-                    confidence=issue.get("confidence", 0.8),
-                    severity=issue.get("severity", "medium")
-                ) for issue in analysis_result["issues"]
-            ],
-            content_score=analysis_result["score"],
-            suggestions=[
-                OptimizationSuggestion(
-                    type=sugg["type"],
-                    title=sugg["title"],
-                    description=sugg["description"],
-                    priority=sugg["priority"]
-                ) for sugg in analysis_result["suggestions"]
-            ],
-            processing_time=processing_time
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"内容分析失败: {str(e)}")
+    with profile_request(request.debug) as profile:
+        try:
+            # 初始化分析器
+            analyzer = ContentAnalyzer(db)
+            
+            # 执行分析
+            analysis_result = await analyzer.analyze_content(request.content)
+            record_issues(analysis_result["issues"])
+            
+            processing_time = time.time() - start_time
+            
+            # 保存到历史记录
+            user_session = request.user_session or str(uuid.uuid4())
+            with track_stage("persistence"):
+                history = UserContentHistory(
+                    user_session=user_session,
+                    original_hash=store_content(db, request.content),
+                    detected_issues=json.dumps(analysis_result["issues"], ensure_ascii=False),
+                    content_score_before=analysis_result["score"],
+                    processing_time=processing_time,
+                    is_optimized=0
+                )
+                db.add(history)
+                db.flush()
+                # 问题同时写入事实表（同一事务，批量插入）
+                record_issue_facts(db, analysis_result["issues"], history.id, user_session, history.created_at)
+                db.commit()
+            
+            # 内部结果已是可信的dict，直接序列化，避免逐个构建Pydantic对象再校验一遍
+            payload = {
+                "detected_issues": [_serialize_issue(issue) for issue in analysis_result["issues"]],
+                "content_score": analysis_result["score"],
+                "suggestions": [_serialize_suggestion(sugg) for sugg in analysis_result["suggestions"]],
+                "processing_time": processing_time
+            }
+            if profile is not None:
+                payload["debug"] = profile.report()
+            return fast_json_response(http_request, payload)
+            
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"内容分析失败: {str(e)}")
 
 
 @router.post("/optimize", response_model=ContentOptimizeResponse)
+@instrumented("optimize")
 async def optimize_content(
     request: ContentOptimizeRequest,
+    http_request: Request,
     db: Session = Depends(get_database)
 ):
     """优化内容"""
+    if request.debug:
+        get_admin_from_request(http_request, db)
+    
     start_time = time.time()
     
-    try:
-        # 初始化优化器
-        optimizer = ContentOptimizer(db)
-        
-        # 执行优化
-        optimization_result = await optimizer.optimize_content(
-            request.content,
-            apply_suggestions=request.apply_suggestions
-        )
-        
-        processing_time = time.time() - start_time
-        
-        # 更新历史记录
-        user_session = request.user_session or str(uuid.uuid4())
-        
-        # 查找最近的分析记录
-        recent_history = db.query(UserContentHistory).filter(
-            UserContentHistory.user_session == user_session,
-            UserContentHistory.original_content == request.content
-        ).order_by(UserContentHistory.created_at.desc()).first()
-        
-        if recent_history:
-            # 更新现有记录
-            recent_history.optimized_content = optimization_result["optimized_content"]
-            recent_history.applied_optimizations = json.dumps(optimization_result["applied_changes"], ensure_ascii=False)
-            recent_history.content_score_after = optimization_result["score_after"]
-            recent_history.is_optimized = 1
-        else:
-            # 创建新记录
-            history = UserContentHistory(
-                user_session=user_session,
-                original_content=request.content,
-                optimized_content=optimization_result["optimized_content"],
-                applied_optimizations=json.dumps(optimization_result["applied_changes"], ensure_ascii=False),
-                content_score_after=optimization_result["score_after"],
-                processing_time=processing_time,
-                is_optimized=1
+    with profile_request(request.debug) as profile:
+        try:
+            # 初始化优化器
+            optimizer = ContentOptimizer(db)
+            
+            # 执行优化
+            optimization_result = await optimizer.optimize_content(
+                request.content,
+                apply_suggestions=request.apply_suggestions,
+                deterministic=request.deterministic
             )
-            db.add(history)
-        
-        db.commit()
-        
-        return ContentOptimizeResponse(
-            optimized_content=optimization_result["optimized_content"],
-            applied_changes=optimization_result["applied_changes"],
-            score_improvement=optimization_result["score_improvement"],
-            processing_time=processing_time
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"内容优化失败: {str(e)}")
+            
+            processing_time = time.time() - start_time
+            
+            # 更新历史记录
+            user_session = request.user_session or str(uuid.uuid4())
+            
+            with track_stage("persistence"):
+                # 查找最近的分析记录（按会话和原文哈希走索引）
+                recent_history = db.query(UserContentHistory).filter(
+                    UserContentHistory.user_session == user_session,
+                    UserContentHistory.original_hash == content_hash(request.content)
+                ).order_by(UserContentHistory.created_at.desc()).first()
+                optimized_hash = store_content(db, optimization_result["optimized_content"], count_submission=False)
+            
+                if recent_history:
+                    # 更新现有记录
+                    recent_history.optimized_hash = optimized_hash
+                    recent_history.applied_optimizations = json.dumps(optimization_result["applied_changes"], ensure_ascii=False)
+                    recent_history.content_score_after = optimization_result["score_after"]
+                    recent_history.is_optimized = 1
+                else:
+                    # 创建新记录
+                    history = UserContentHistory(
+                        user_session=user_session,
+                        original_hash=store_content(db, request.content),
+                        optimized_hash=optimized_hash,
+                        applied_optimizations=json.dumps(optimization_result["applied_changes"], ensure_ascii=False),
+                        content_score_after=optimization_result["score_after"],
+                        processing_time=processing_time,
+                        is_optimized=1
+                    )
+                    db.add(history)
+            
+                db.commit()
+            
+            payload = {
+                "optimized_content": optimization_result["optimized_content"],
+                "applied_changes": optimization_result["applied_changes"],
+                "score_improvement": optimization_result["score_improvement"],
+                "processing_time": processing_time
+            }
+            if profile is not None:
+                payload["debug"] = profile.report()
+            return fast_json_response(http_request, payload)
+            
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"内容优化失败: {str(e)}")
 
 
 @router.get("/history", response_model=List[HistoryItem])
 async def get_content_history(
     user_session: Optional[str] = None,
     limit: int = 20,
+    include_archive: bool = False,
     db: Session = Depends(get_database)
 ):
-    """获取内容历史记录"""
+    """获取内容历史记录（默认只读热分区；include_archive 时热分区不足limit条再从归档中补足）"""
     query = db.query(UserContentHistory)
     
     if user_session:
@@ -211,13 +261,27 @@ async def get_content_history(
     
     histories = query.order_by(UserContentHistory.created_at.desc()).limit(limit).all()
     
-    return [
+    items = [
         HistoryItem(
             id=h.id,
-            original_content=h.original_content,
-            optimized_content=h.optimized_content,
+            original_content=original_content,
+            optimized_content=optimized_content,
             content_score_before=h.content_score_before,
             content_score_after=h.content_score_after,
             created_at=h.created_at.isoformat()
-        ) for h in histories
-    ]
\ No newline at end of file
+        ) for h, (original_content, optimized_content) in zip(histories, history_texts(db, histories))
+    ]
+    
+    if include_archive and len(items) < limit:
+        archived = history_archive.iter_rows(user_session=user_session or None, newest_first=True)
+        for record in islice(archived, limit - len(items)):
+            items.append(HistoryItem(
+                id=record["id"],
+                original_content=record["original_content"],
+                optimized_content=record["optimized_content"],
+                content_score_before=record["content_score_before"],
+                content_score_after=record["content_score_after"],
+                created_at=record["created_at"]
+            ))
+    
+    return items
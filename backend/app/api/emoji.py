@@ -1,7 +1,8 @@
 """
 小红书表情管理API
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from typing import List, Optional
@@ -11,6 +12,10 @@ from datetime import datetime
 from app.database.connection import get_database as get_db
 from app.models.database import XiaohongshuEmoji, EmojiCategory, EmojiUsageLog
 from app.api.auth import get_current_admin
+from app.core.catalog_versions import CATALOG_EMOJI, CATALOG_EMOJI_CATEGORY, bump_catalog_version
+from app.core.lexicon_artifact import rebuild_lexicon_artifact
+from app.core.http_cache import check_catalog_cache
+from app.core.config import EMOJI_USAGE_REFRESH_S
 
 router = APIRouter(prefix="/api/emoji", tags=["表情管理"])
 
@@ -19,13 +24,19 @@ router = APIRouter(prefix="/api/emoji", tags=["表情管理"])
 
 @router.get("/list", summary="获取表情列表")
 async def get_emoji_list(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     category: Optional[str] = Query(None, description="表情分类"),
     emoji_type: Optional[str] = Query(None, description="表情类型(R/H)"),
     keyword: Optional[str] = Query(None, description="关键词搜索"),
     limit: int = Query(50, description="返回数量限制")
 ):
-    """获取表情列表 - 用户端"""
+    """获取表情列表 - 用户端（使用次数及排序按 EMOJI_USAGE_REFRESH_S 周期刷新）"""
+    not_modified = check_catalog_cache(request, response, CATALOG_EMOJI, refresh_seconds=EMOJI_USAGE_REFRESH_S)
+    if not_modified:
+        return not_modified
+    
     query = db.query(XiaohongshuEmoji).filter(XiaohongshuEmoji.status == 1)
     
     if category:
@@ -69,8 +80,16 @@ async def get_emoji_list(
 
 
 @router.get("/categories", summary="获取表情分类")
-async def get_emoji_categories(db: Session = Depends(get_db)):
+async def get_emoji_categories(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
     """获取表情分类列表"""
+    not_modified = check_catalog_cache(request, response, CATALOG_EMOJI_CATEGORY)
+    if not_modified:
+        return not_modified
+    
     categories = db.query(EmojiCategory).filter(
         EmojiCategory.status == 1
     ).order_by(EmojiCategory.sort_order).all()
@@ -157,7 +176,7 @@ async def log_emoji_usage(
     )
     db.add(usage_log)
     
-    # 更新使用次数
+    # 更新使用次数（不递增目录版本号：列表中的使用次数按刷新周期更新，不让每次使用都使缓存失效）
     emoji.usage_count += 1
     
     db.commit()
@@ -255,8 +274,10 @@ async def admin_create_emoji(
     )
     
     db.add(emoji)
+    bump_catalog_version(db, CATALOG_EMOJI)
     db.commit()
     db.refresh(emoji)
+    await run_in_threadpool(rebuild_lexicon_artifact)
     
     return {
         "message": "表情创建成功",
@@ -307,7 +328,9 @@ async def admin_update_emoji(
     emoji.updated_by = admin.username
     emoji.updated_at = datetime.utcnow()
     
+    bump_catalog_version(db, CATALOG_EMOJI)
     db.commit()
+    await run_in_threadpool(rebuild_lexicon_artifact)
     
     return {"message": "表情更新成功"}
 
@@ -331,7 +354,9 @@ async def admin_delete_emoji(
     emoji.updated_by = admin.username
     emoji.updated_at = datetime.utcnow()
     
+    bump_catalog_version(db, CATALOG_EMOJI)
     db.commit()
+    await run_in_threadpool(rebuild_lexicon_artifact)
     
     return {"message": "表情删除成功"}
 
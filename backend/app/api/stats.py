@@ -1,15 +1,23 @@
 """
 统计相关API
 """
-from typing import List, Dict, Any
-from fastapi import APIRouter, Depends
+from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 
 from app.database.connection import get_database
-from app.models.database import UserContentHistory, ProhibitedWord, HomophoneReplacement, AdminLog
+from app.api.auth import get_current_admin
+from app.models.database import (
+    AdminUser, UserContentHistory, ProhibitedWord, HomophoneReplacement, AdminLog, IssueFact, OriginalWord, ContentBlob
+)
+from app.core.catalog_versions import CATALOG_PROHIBITED_WORD
+from app.core.http_cache import check_catalog_cache
+from app.core.history_archive import history_archive
+from app.core.issue_facts import ISSUE_TYPE_CODES
+from app.core.content_store import history_texts
 
 router = APIRouter()
 
@@ -31,8 +39,8 @@ class UsageStats(BaseModel):
 
 
 @router.get("/dashboard", response_model=DashboardStats)
-async def get_dashboard_stats(db: Session = Depends(get_database)):
-    """获取仪表板统计数据"""
+async def get_dashboard_stats(include_archive: bool = False, db: Session = Depends(get_database)):
+    """获取仪表板统计数据（默认只统计热分区，include_archive 时合并归档分段的汇总）"""
     
     # 基础统计
     total_detections = db.query(UserContentHistory).count()
@@ -40,26 +48,32 @@ async def get_dashboard_stats(db: Session = Depends(get_database)):
     total_prohibited_words = db.query(ProhibitedWord).filter(ProhibitedWord.status == 1).count()
     total_homophone_words = db.query(HomophoneReplacement).filter(HomophoneReplacement.status == 1).count()
     
-    # 平均分数提升
-    score_improvements = db.query(
-        (UserContentHistory.content_score_after - UserContentHistory.content_score_before).label('improvement')
+    # 平均分数提升（只计有提升或下降的记录）
+    improvement = UserContentHistory.content_score_after - UserContentHistory.content_score_before
+    improvement_sum, improvement_count = db.query(
+        func.coalesce(func.sum(improvement), 0), func.count(improvement)
     ).filter(
         UserContentHistory.content_score_after.isnot(None),
-        UserContentHistory.content_score_before.isnot(None)
-    ).all()
+        UserContentHistory.content_score_before.isnot(None),
+        improvement != 0
+    ).one()
+    
+    if include_archive:
+        archived = history_archive.totals()
+        total_detections += archived["detections"]
+        total_optimizations += archived["optimizations"]
+        improvement_sum += archived["improvement_sum"]
+        improvement_count += archived["improvement_count"]
     
-    avg_score_improvement = 0
-    if score_improvements:
-        improvements = [s.improvement for s in score_improvements if s.improvement]
-        avg_score_improvement = sum(improvements) / len(improvements) if improvements else 0
+    avg_score_improvement = improvement_sum / improvement_count if improvement_count else 0
     
     # 最近活动
     recent_histories = db.query(UserContentHistory).order_by(desc(UserContentHistory.created_at)).limit(5).all()
     recent_activity = []
-    for history in recent_histories:
+    for history, (original_content, _) in zip(recent_histories, history_texts(db, recent_histories)):
         activity = {
             "type": "optimization" if history.is_optimized else "detection",
-            "content_preview": history.original_content[:50] + "..." if len(history.original_content) > 50 else history.original_content,
+            "content_preview": original_content[:50] + "..." if len(original_content) > 50 else original_content,
             "score_before": history.content_score_before,
             "score_after": history.content_score_after,
             "created_at": history.created_at.isoformat()
@@ -77,8 +91,8 @@ async def get_dashboard_stats(db: Session = Depends(get_database)):
 
 
 @router.get("/usage", response_model=List[UsageStats])
-async def get_usage_stats(days: int = 7, db: Session = Depends(get_database)):
-    """获取使用统计（按日期）"""
+async def get_usage_stats(days: int = 7, include_archive: bool = False, db: Session = Depends(get_database)):
+    """获取使用统计（按日期；默认只统计热分区，include_archive 时合并归档分段的逐日汇总）"""
     
     # 计算日期范围
     end_date = datetime.now().date()
@@ -89,7 +103,8 @@ async def get_usage_stats(days: int = 7, db: Session = Depends(get_database)):
         func.date(UserContentHistory.created_at).label('date'),
         func.count(UserContentHistory.id).label('detections'),
         func.sum(UserContentHistory.is_optimized).label('optimizations'),
-        func.avg(UserContentHistory.processing_time).label('avg_processing_time')
+        func.sum(UserContentHistory.processing_time).label('processing_time_sum'),
+        func.count(UserContentHistory.processing_time).label('processing_time_count')
     ).filter(
         func.date(UserContentHistory.created_at) >= start_date,
         func.date(UserContentHistory.created_at) <= end_date
@@ -99,21 +114,36 @@ async def get_usage_stats(days: int = 7, db: Session = Depends(get_database)):
         func.date(UserContentHistory.created_at)
     ).all()
     
+    stats_dict = {
+        stat.date: {
+            "detections": stat.detections or 0,
+            "optimizations": stat.optimizations or 0,
+            "processing_time_sum": stat.processing_time_sum or 0,
+            "processing_time_count": stat.processing_time_count or 0
+        }
+        for stat in stats
+    }
+    if include_archive:
+        for date, archived in history_archive.daily_stats(start_date.isoformat(), end_date.isoformat()).items():
+            day = stats_dict.setdefault(date, dict.fromkeys(archived, 0))
+            for key, value in archived.items():
+                day[key] += value
+    
     # 填充缺失的日期
     result = []
     current_date = start_date
-    stats_dict = {stat.date: stat for stat in stats}
     
     while current_date <= end_date:
         # 将date对象转换为字符串进行匹配
         current_date_str = current_date.isoformat()
         if current_date_str in stats_dict:
             stat = stats_dict[current_date_str]
+            avg_processing_time = stat["processing_time_sum"] / stat["processing_time_count"] if stat["processing_time_count"] else 0
             result.append(UsageStats(
                 date=current_date_str,
-                detections=stat.detections or 0,
-                optimizations=stat.optimizations or 0,
-                avg_processing_time=round(stat.avg_processing_time or 0, 3)
+                detections=stat["detections"],
+                optimizations=stat["optimizations"],
+                avg_processing_time=round(avg_processing_time, 3)
             ))
         else:
             result.append(UsageStats(
@@ -128,8 +158,15 @@ async def get_usage_stats(days: int = 7, db: Session = Depends(get_database)):
 
 
 @router.get("/prohibited-words/categories")
-async def get_prohibited_word_categories(db: Session = Depends(get_database)):
+async def get_prohibited_word_categories(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_database)
+):
     """获取违禁词分类统计"""
+    not_modified = check_catalog_cache(request, response, CATALOG_PROHIBITED_WORD)
+    if not_modified:
+        return not_modified
     
     categories = db.query(
         ProhibitedWord.category,
@@ -161,4 +198,142 @@ async def get_homophone_usage_stats(db: Session = Depends(get_database)):
             "replacement_type": replacement.replacement_type
         })
     
-    return result
\ No newline at end of file
+    return result
+
+
+@router.get("/repeat-submissions")
+async def get_repeat_submissions(
+    limit: int = 20,
+    db: Session = Depends(get_database),
+    current_admin: AdminUser = Depends(get_current_admin)
+):
+    """重复提交最多的笔记正文（仅管理员；内容表按提交次数索引，不比较正文）"""
+    blobs = db.query(
+        ContentBlob.hash, ContentBlob.content, ContentBlob.length, ContentBlob.submission_count,
+        ContentBlob.first_seen_at, ContentBlob.last_seen_at
+    ).filter(
+        ContentBlob.submission_count > 1
+    ).order_by(desc(ContentBlob.submission_count)).limit(max(1, min(limit, 200))).all()
+    
+    return [
+        {
+            "hash": blob.hash,
+            "content_preview": blob.content[:50] + "..." if len(blob.content) > 50 else blob.content,
+            "length": blob.length,
+            "submission_count": blob.submission_count,
+            "first_seen_at": blob.first_seen_at.isoformat() if blob.first_seen_at else None,
+            "last_seen_at": blob.last_seen_at.isoformat() if blob.last_seen_at else None
+        }
+        for blob in blobs
+    ]
+
+
+def _issue_days(days: int):
+    """最近days天（含今天，UTC日期）的起止日期"""
+    if days < 1:
+        raise HTTPException(status_code=400, detail="days必须大于0")
+    end_date = datetime.utcnow().date()
+    return end_date - timedelta(days=days - 1), end_date
+
+
+def _issue_type_code(issue_type: str) -> int:
+    code = ISSUE_TYPE_CODES.get(issue_type)
+    if code is None:
+        raise HTTPException(status_code=400, detail=f"不支持的问题类型: {issue_type}")
+    return code
+
+
+@router.get("/issues/top-words")
+async def get_top_issue_words(
+    days: int = 7,
+    issue_type: str = "prohibited_word",
+    category: Optional[str] = None,
+    limit: int = 20,
+    db: Session = Depends(get_database)
+):
+    """最近days天违规次数最多的词条（可按分类过滤）"""
+    start_date, end_date = _issue_days(days)
+    code = _issue_type_code(issue_type)
+    query = db.query(
+        IssueFact.word_id,
+        IssueFact.category,
+        func.count(IssueFact.id).label('count'),
+        func.max(IssueFact.risk_level).label('max_risk_level')
+    ).filter(
+        IssueFact.day >= start_date,
+        IssueFact.day <= end_date,
+        IssueFact.issue_type == code
+    )
+    if category:
+        query = query.filter(IssueFact.category == category)
+    rows = query.group_by(IssueFact.word_id, IssueFact.category).order_by(
+        desc('count')
+    ).limit(max(1, min(limit, 200))).all()
+    
+    # 只为上榜的词条查询词
+    model = ProhibitedWord if issue_type == "prohibited_word" else OriginalWord
+    word_ids = [row.word_id for row in rows if row.word_id is not None]
+    words = dict(db.query(model.id, model.word).filter(model.id.in_(word_ids)).all()) if word_ids else {}
+    
+    return [
+        {
+            "word_id": row.word_id,
+            "word": words.get(row.word_id),
+            "category": row.category,
+            "count": row.count,
+            "max_risk_level": row.max_risk_level
+        }
+        for row in rows
+    ]
+
+
+@router.get("/issues/categories")
+async def get_issue_categories(days: int = 7, issue_type: str = "prohibited_word", db: Session = Depends(get_database)):
+    """最近days天各分类的违规次数及风险等级分布"""
+    start_date, end_date = _issue_days(days)
+    rows = db.query(
+        IssueFact.category,
+        IssueFact.risk_level,
+        func.count(IssueFact.id).label('count')
+    ).filter(
+        IssueFact.day >= start_date,
+        IssueFact.day <= end_date,
+        IssueFact.issue_type == _issue_type_code(issue_type)
+    ).group_by(IssueFact.category, IssueFact.risk_level).all()
+    
+    categories: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        entry = categories.setdefault(row.category, {"category": row.category, "count": 0, "risk_levels": {}})
+        entry["count"] += row.count
+        entry["risk_levels"][str(row.risk_level)] = row.count
+    return sorted(categories.values(), key=lambda entry: entry["count"], reverse=True)
+
+
+@router.get("/issues/daily")
+async def get_issue_daily(
+    days: int = 30,
+    issue_type: str = "prohibited_word",
+    word_id: Optional[int] = None,
+    category: Optional[str] = None,
+    db: Session = Depends(get_database)
+):
+    """最近days天逐日的违规次数（可按词条或分类过滤），缺失的日期补0"""
+    start_date, end_date = _issue_days(days)
+    query = db.query(
+        IssueFact.day,
+        func.count(IssueFact.id).label('count')
+    ).filter(
+        IssueFact.day >= start_date,
+        IssueFact.day <= end_date,
+        IssueFact.issue_type == _issue_type_code(issue_type)
+    )
+    if word_id is not None:
+        query = query.filter(IssueFact.word_id == word_id)
+    if category:
+        query = query.filter(IssueFact.category == category)
+    counts = {row.day: row.count for row in query.group_by(IssueFact.day).all()}
+    
+    return [
+        {"date": (start_date + timedelta(days=offset)).isoformat(), "count": counts.get(start_date + timedelta(days=offset), 0)}
+        for offset in range((end_date - start_date).days + 1)
+    ]
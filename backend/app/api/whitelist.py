@@ -1,7 +1,8 @@
 """
 白名单管理API
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -11,6 +12,9 @@ import re
 from app.database.connection import get_database
 from app.models.database import WhitelistPattern
 from app.api.auth import get_current_admin
+from app.core.catalog_versions import CATALOG_WHITELIST, bump_catalog_version
+from app.core.lexicon_artifact import rebuild_lexicon_artifact
+from app.core.http_cache import check_catalog_cache, PRIVATE_CACHE_CONTROL
 
 router = APIRouter(prefix="/admin/whitelist", tags=["白名单管理"])
 
@@ -134,8 +138,10 @@ async def create_whitelist_pattern(
         )
         
         db.add(new_pattern)
+        bump_catalog_version(db, CATALOG_WHITELIST)
         db.commit()
         db.refresh(new_pattern)
+        await run_in_threadpool(rebuild_lexicon_artifact)
         
         return new_pattern
     except HTTPException:
@@ -173,8 +179,10 @@ async def update_whitelist_pattern(
         
         pattern.updated_at = datetime.utcnow()
         
+        bump_catalog_version(db, CATALOG_WHITELIST)
         db.commit()
         db.refresh(pattern)
+        await run_in_threadpool(rebuild_lexicon_artifact)
         
         return pattern
     except HTTPException:
@@ -198,7 +206,9 @@ async def delete_whitelist_pattern(
             raise HTTPException(status_code=404, detail="白名单模式不存在")
         
         db.delete(pattern)
+        bump_catalog_version(db, CATALOG_WHITELIST)
         db.commit()
+        await run_in_threadpool(rebuild_lexicon_artifact)
         
         return {"message": "白名单模式删除成功"}
     except HTTPException:
@@ -210,10 +220,16 @@ async def delete_whitelist_pattern(
 
 @router.get("/categories")
 async def get_whitelist_categories(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_database),
     current_admin = Depends(get_current_admin)
 ):
     """获取白名单分类列表"""
+    not_modified = check_catalog_cache(request, response, CATALOG_WHITELIST, PRIVATE_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+    
     try:
         categories = db.query(WhitelistPattern.category).filter(
             WhitelistPattern.category.isnot(None),
@@ -0,0 +1,188 @@
+"""
+准入控制 - 内容分析/优化接口的并发上限与有界等待队列，过载时快速返回503
+
+检测是CPU密集的同步计算，直接在事件循环上执行：流量突增时所有请求一起变慢，直到客户端超时。
+这里在接口前限制同时处理的请求数，其余请求按到达顺序排队：
+1. 队列已满的请求立即拒绝；
+2. 排队超过期限仍未开始的请求拒绝（放行时发现已过期的同样拒绝，不再占用处理时间）；
+3. 拒绝时返回503和 Retry-After（按近期处理耗时和排队长度估算）。
+准入在ASGI入口处进行（解析请求体、在线程池中打开数据库会话之前）：事件循环被某个请求的计算阻塞期间
+到达的请求，会在下一轮一起进入并排队，排队时间从这里开始计算；在接口函数内做准入则此时请求已串行到达，
+积压发生在准入之前，既无法排队也无法拒绝。每个工作进程各自一份状态（各有自己的事件循环）。
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+from app.core.config import ADMISSION_MAX_CONCURRENT, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_MS
+from app.core.metrics import registry
+
+ADMISSION_IN_FLIGHT = registry.gauge(
+    "admission_in_flight",
+    "Requests currently admitted and being processed",
+    ["pool"]
+)
+ADMISSION_QUEUE_DEPTH = registry.gauge(
+    "admission_queue_depth",
+    "Requests waiting for admission",
+    ["pool"]
+)
+ADMISSION_SHED_TOTAL = registry.counter(
+    "admission_shed_total",
+    "Requests rejected with 503 by admission control",
+    ["pool", "reason"]
+)
+ADMISSION_WAIT_SECONDS = registry.histogram(
+    "admission_queue_wait_seconds",
+    "Time admitted requests spent waiting in the admission queue",
+    ["pool"]
+)
+
+# Retry-After 的取值范围（秒）
+RETRY_AFTER_MIN_S = 1
+RETRY_AFTER_MAX_S = 30
+# 处理耗时滑动平均的权重
+SERVICE_TIME_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    """请求未获准入"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """并发上限 + 有界FIFO等待队列（max_concurrent为0时不限制）"""
+
+    def __init__(self, pool: str, max_concurrent: int, max_queue: int, queue_timeout_ms: int):
+        self.pool = pool
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.in_flight = 0
+        # (放行信号, 排队期限)；放行信号结果为True表示获得名额，False表示已过期
+        self._waiters: Deque[Tuple[asyncio.Future, float]] = deque()
+        self._service_time = 0.0
+        ADMISSION_IN_FLIGHT.set(0, pool=pool)
+        ADMISSION_QUEUE_DEPTH.set(0, pool=pool)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrent > 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """按近期平均处理耗时估算排在队尾的请求多久能开始"""
+        backlog = self.queue_depth + self.in_flight
+        estimate = self._service_time * backlog / max(self.max_concurrent, 1)
+        return min(RETRY_AFTER_MAX_S, max(RETRY_AFTER_MIN_S, math.ceil(estimate)))
+
+    def _shed(self, reason: str) -> Overloaded:
+        ADMISSION_SHED_TOTAL.inc(pool=self.pool, reason=reason)
+        return Overloaded(reason, self.retry_after())
+
+    def _update_gauges(self):
+        ADMISSION_IN_FLIGHT.set(self.in_flight, pool=self.pool)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters), pool=self.pool)
+
+    async def acquire(self) -> float:
+        """获得处理名额，返回排队时间（秒）；未获准入时抛出 Overloaded"""
+        arrived = time.monotonic()
+        if self.in_flight < self.max_concurrent and not self._waiters:
+            self.in_flight += 1
+            self._update_gauges()
+            return time.monotonic() - arrived
+        if len(self._waiters) >= self.max_queue:
+            raise self._shed("queue_full")
+
+        deadline = arrived + self.queue_timeout
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (waiter, deadline)
+        self._waiters.append(entry)
+        self._update_gauges()
+        try:
+            admitted = await asyncio.wait_for(waiter, max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            # 超时与转交同时发生时名额已交到本请求，拒绝前要还回去
+            if waiter.done() and not waiter.cancelled() and waiter.result():
+                self.release()
+            admitted = False
+        except asyncio.CancelledError:
+            # 客户端断开：已转交的名额要还回去
+            if waiter.done() and not waiter.cancelled() and waiter.result():
+                self.release()
+            raise
+        finally:
+            try:
+                self._waiters.remove(entry)
+            except ValueError:
+                pass
+            self._update_gauges()
+        if not admitted:
+            raise self._shed("timeout")
+        return time.monotonic() - arrived
+
+    def release(self, service_time: Optional[float] = None):
+        """归还名额：直接转交给队首未过期的请求，已过期的请求通知其拒绝"""
+        if service_time is not None:
+            self._service_time += SERVICE_TIME_ALPHA * (service_time - self._service_time)
+        now = time.monotonic()
+        while self._waiters:
+            waiter, deadline = self._waiters.popleft()
+            if waiter.done():
+                continue
+            if deadline <= now:
+                waiter.set_result(False)
+                continue
+            waiter.set_result(True)
+            self._update_gauges()
+            return
+        self.in_flight -= 1
+        self._update_gauges()
+
+
+content_admission = AdmissionController(
+    "content", ADMISSION_MAX_CONCURRENT, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_MS
+)
+
+
+class AdmissionMiddleware:
+    """ASGI中间件：对指定路径的POST请求做准入控制，未获准入时直接返回503和 Retry-After"""
+
+    def __init__(self, app, routes: Dict[str, AdmissionController]):
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        controller = None
+        if scope["type"] == "http" and scope["method"] == "POST":
+            controller = self.routes.get(scope["path"])
+        if controller is None or not controller.enabled:
+            await self.app(scope, receive, send)
+            return
+        try:
+            waited = await controller.acquire()
+        except Overloaded as e:
+            response = JSONResponse(
+                {"detail": "服务繁忙，请稍后重试"},
+                status_code=503,
+                headers={"Retry-After": str(e.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+        ADMISSION_WAIT_SECONDS.observe(waited, pool=controller.pool)
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(time.monotonic() - start)
@@ -2,12 +2,16 @@
 内容分析器 - 违禁词检测和内容质量分析
 """
 import re
-import jieba
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
 from sqlalchemy.orm import Session
 
-from app.models.database import ProhibitedWord
+from app.core.algorithms.edit_log import EditLog
+from app.core.algorithms.incremental_scorer import AnalysisSnapshot, IncrementalScorer
+from app.core.algorithms.parsed_document import ParsedDocument
 from app.core.algorithms.smart_prohibited_detector import SmartProhibitedDetector
+from app.core.chunked_analysis import detect_matches
+from app.core.metrics import record_prefilter, track_stage
+from app.core.profiling import traced
 
 
 class ContentAnalyzer:
@@ -15,89 +19,110 @@ class ContentAnalyzer:
     
     def __init__(self, db: Session):
         self.db = db
-        self.prohibited_words = self._load_prohibited_words()
         self.smart_detector = SmartProhibitedDetector(db)
+        # 与智能检测器共用同一份违禁词库，避免重复加载
+        self.prohibited_words = self.smart_detector.prohibited_words
+        # 谐音替换表随词库制品加载（与预筛的候选原词同一来源），检测时不再查询数据库
+        self.homophone_mappings = self.smart_detector.lexicon.homophone_mappings
     
-    def _load_prohibited_words(self) -> List[Dict]:
-        """加载违禁词库"""
-        words = self.db.query(ProhibitedWord).filter(ProhibitedWord.status == 1).all()
-        return [
-            {
-                "word": word.word,
-                "category": word.category,
-                "risk_level": word.risk_level
-            }
-            for word in words
-        ]
+    @traced("analyze_content")
+    async def analyze_content(self, content: str, doc: Optional[ParsedDocument] = None) -> Dict[str, Any]:
+        """分析内容（doc为调用方已构建的解析文档，省略时现场解析）"""
+        doc = ParsedDocument.of(content, doc)
+        analysis, _ = self._analyze(doc, await self._detect_matches(doc))
+        return analysis
     
-    async def analyze_content(self, content: str) -> Dict[str, Any]:
-        """分析内容"""
-        # 使用智能违禁词检测器
-        detected_issues = self.smart_detector.detect_prohibited_words(content)
+    @traced("analyze_content")
+    async def analyze_for_rescoring(self, content: str, doc: Optional[ParsedDocument] = None) -> Tuple[Dict[str, Any], AnalysisSnapshot]:
+        """分析内容，同时返回分析快照，供编辑后用 rescore 增量计算评分"""
+        doc = ParsedDocument.of(content, doc)
+        return self._analyze(doc, await self._detect_matches(doc), rescoring=True)
+    
+    async def _detect_matches(self, doc: ParsedDocument) -> Optional[List]:
+        """违禁词检测（长文本分块并行）；预筛判定不可能命中任何词条时返回None，不做匹配和评估"""
+        prefilter = self.smart_detector.prefilter
+        if prefilter is not None:
+            with track_stage("prefilter"):
+                possible = prefilter.may_match_prohibited(doc)
+            if not possible:
+                return None
+        return await detect_matches(self.smart_detector, doc)
+    
+    def rescore(self, snapshot: AnalysisSnapshot, edit_log: EditLog, final_doc: ParsedDocument) -> int:
+        """由原文分析快照和编辑日志计算编辑后文本的评分（只复查编辑附近的区域，结果与完整分析一致）"""
+        with track_stage("incremental_scoring"):
+            return IncrementalScorer(self).score(snapshot, edit_log, final_doc)
+    
+    def _analyze(self, doc: ParsedDocument, matches: Optional[List],
+                 rescoring: bool = False) -> Tuple[Dict[str, Any], AnalysisSnapshot]:
+        """matches 为 _detect_matches 的违禁词检测结果，None 表示预筛已判定不可能命中；
+        rescoring 为True时快照中记录增量评分所需的谐音原词信息"""
+        content = doc.content
+        snapshot = AnalysisSnapshot(doc)
         
-        # 检测谐音词替换机会
-        homophone_opportunities = self._detect_homophone_opportunities(content)
+        # 智能违禁词检测器的结果（未构成违规的命中也记入快照）
+        snapshot.matches = matches or []
+        detected_issues = [issue for _, issue in snapshot.matches if issue is not None]
+        
+        # 检测谐音词替换机会（只扫描预筛列出的候选原词）
+        candidates = None
+        prefilter = self.smart_detector.prefilter
+        if prefilter is not None:
+            with track_stage("prefilter"):
+                candidates = prefilter.homophone_candidates(content)
+            # 不可能命中违禁词、也没有候选原词：内容干净，直接进入结构评分
+            record_prefilter(matches is None and not candidates)
+        with track_stage("homophone_detection"):
+            homophone_opportunities = self._detect_homophone_opportunities(
+                content, snapshot if rescoring else None, candidates
+            )
         detected_issues.extend(homophone_opportunities)
         
         # 计算内容质量评分
-        content_score = self._calculate_content_score(content, detected_issues)
+        with track_stage("scoring"):
+            content_score = self._calculate_content_score(doc, [issue.get("risk_level", 1) for issue in detected_issues])
+        snapshot.score = content_score
         
         # 生成优化建议
-        suggestions = self._generate_suggestions(content, detected_issues)
+        with track_stage("suggestion_generation"):
+            suggestions = self._generate_suggestions(doc, detected_issues)
         
         return {
             "issues": detected_issues,
             "score": content_score,
             "suggestions": suggestions
-        }
+        }, snapshot
     
     def _detect_prohibited_words(self, content: str) -> List[Dict]:
-        """检测违禁词"""
+        """检测违禁词（规范化后一次匹配，覆盖空格/符号分隔、全角、零宽字符、繁体、谐音等变形）"""
         issues = []
         
-        for word_info in self.prohibited_words:
+        for start_pos, end_pos, word_info, _ in self.smart_detector.find_word_matches(content):
             word = word_info["word"]
+            matched_text = content[start_pos:end_pos]
             
-            # 精确匹配
-            for match in re.finditer(re.escape(word), content, re.IGNORECASE):
+            if matched_text.lower() == word.lower():
                 issues.append({
                     "type": "prohibited_word",
                     "word": word,
-                    "position": match.start(),
+                    "position": start_pos,
+                    "risk_level": word_info["risk_level"],
+                    "category": word_info["category"],
+                    "suggestions": self._get_replacement_suggestions(word)
+                })
+            else:
+                issues.append({
+                    "type": "prohibited_word_variation",
+                    "word": matched_text,
+                    "original_word": word,
+                    "position": start_pos,
                     "risk_level": word_info["risk_level"],
                     "category": word_info["category"],
                     "suggestions": self._get_replacement_suggestions(word)
                 })
-            
-            # 变形词检测（简单实现）
-            variations = self._generate_word_variations(word)
-            for variation in variations:
-                for match in re.finditer(re.escape(variation), content, re.IGNORECASE):
-                    issues.append({
-                        "type": "prohibited_word_variation",
-                        "word": variation,
-                        "original_word": word,
-                        "position": match.start(),
-                        "risk_level": word_info["risk_level"],
-                        "category": word_info["category"],
-                        "suggestions": self._get_replacement_suggestions(word)
-                    })
         
         return issues
     
-    def _generate_word_variations(self, word: str) -> List[str]:
-        """生成词汇变形（简单版本）"""
-        variations = []
-        
-        # 添加空格和符号分隔
-        if len(word) > 1:
-            for i in range(1, len(word)):
-                variations.append(word[:i] + " " + word[i:])
-                variations.append(word[:i] + "*" + word[i:])
-                variations.append(word[:i] + "." + word[i:])
-        
-        return variations
-    
     def _get_replacement_suggestions(self, word: str) -> List[str]:
         """获取替换建议（从谐音词库获取）"""
         suggestions = []
@@ -133,33 +158,37 @@ class ContentAnalyzer:
         
         return suggestions[:3]  # 最多返回3个建议
     
-    def _detect_homophone_opportunities(self, content: str) -> List[Dict]:
-        """检测谐音词替换机会"""
+    def _detect_homophone_opportunities(self, content: str, snapshot: Optional[AnalysisSnapshot] = None,
+                                        candidates: Optional[Set[str]] = None) -> List[Dict]:
+        """检测谐音词替换机会（传入快照时记录各词的出现位置）
+
+        candidates 为预筛列出的可能出现的原词，其余原词不在内容中或没有可用替换，不再逐词扫描。
+        """
         issues = []
         
-        # 从数据库获取所有可替换的原始词汇
-        from app.models.database import OriginalWord, HomophoneReplacement
-        
-        original_words = self.db.query(OriginalWord).filter(
-            OriginalWord.status == 1
-        ).all()
+        # 谐音替换表中的原始词汇（按原词id排列，每个词都有可用替换）
+        if snapshot is not None:
+            # 增量评分需要全部原词（编辑可能引入原文中没有的词）
+            snapshot.homophone_words = self.homophone_mappings
+        if candidates is None:
+            original_words = self.homophone_mappings
+        elif candidates:
+            original_words = [word for word in self.homophone_mappings if word in candidates]
+        else:
+            return issues
         
-        for original_word in original_words:
-            word = original_word.word
-            
+        for word in original_words:
             # 查找该词在内容中的所有位置
+            replacements = None
             for match in re.finditer(re.escape(word), content, re.IGNORECASE):
                 start_pos = match.start()
                 end_pos = match.end()
                 
-                # 获取该词的谐音替换选项
-                replacements = self.db.query(HomophoneReplacement).filter(
-                    HomophoneReplacement.original_word_id == original_word.id,
-                    HomophoneReplacement.status == 1
-                ).order_by(
-                    HomophoneReplacement.priority.desc(),
-                    HomophoneReplacement.confidence_score.desc()
-                ).limit(5).all()
+                # 获取该词的谐音替换选项（每个词只取一次）
+                if replacements is None:
+                    replacements = self._get_homophone_replacements(word)
+                if snapshot is not None:
+                    snapshot.homophone_occurrences.setdefault(word, []).append((start_pos, end_pos))
                 
                 if replacements:
                     # 生成唯一ID
@@ -184,13 +213,13 @@ class ContentAnalyzer:
                         "context": context,
                         "confidence": 0.9,
                         "severity": "low",
-                        "suggestions": [r.replacement_word for r in replacements],
+                        "suggestions": [r["replacement"] for r in replacements],
                         "replacement_options": [
                             {
-                                "replacement": r.replacement_word,
-                                "type": r.replacement_type,
-                                "confidence": r.confidence_score,
-                                "priority": r.priority
+                                "replacement": r["replacement"],
+                                "type": r["type"],
+                                "confidence": r["confidence"],
+                                "priority": r["priority"]
                             }
                             for r in replacements
                         ]
@@ -198,13 +227,18 @@ class ContentAnalyzer:
         
         return issues
     
-    def _calculate_content_score(self, content: str, issues: List[Dict]) -> int:
-        """计算内容质量评分（0-100分）"""
+    def _get_homophone_replacements(self, word: str, limit: int = 5) -> List[Dict]:
+        """获取原始词汇的谐音替换选项（按优先级、置信度排序）"""
+        replacements = self.homophone_mappings.get(word, [])
+        return sorted(replacements, key=lambda r: (-r["priority"], -r["confidence"]))[:limit]
+    
+    def _calculate_content_score(self, doc: ParsedDocument, risk_levels: Iterable[int]) -> int:
+        """计算内容质量评分（0-100分），risk_levels 为各问题的风险等级"""
+        content = doc.content
         base_score = 100
         
         # 根据违禁词扣分
-        for issue in issues:
-            risk_level = issue.get("risk_level", 1)
+        for risk_level in risk_levels:
             if risk_level == 3:  # 高风险
                 base_score -= 20
             elif risk_level == 2:  # 中风险
@@ -220,14 +254,14 @@ class ContentAnalyzer:
             base_score -= 5   # 内容过长
         
         # 段落结构评分
-        paragraphs = content.split('\n')
-        if len(paragraphs) == 1 and len(content) > 200:
+        if doc.paragraph_count == 1 and len(content) > 200:
             base_score -= 5  # 缺少段落分隔
         
         return max(0, min(100, base_score))
     
-    def _generate_suggestions(self, content: str, issues: List[Dict]) -> List[Dict]:
+    def _generate_suggestions(self, doc: ParsedDocument, issues: List[Dict]) -> List[Dict]:
         """生成优化建议"""
+        content = doc.content
         suggestions = []
         
         # 违禁词替换建议
@@ -257,8 +291,7 @@ class ContentAnalyzer:
             })
         
         # 段落结构建议
-        paragraphs = content.split('\n')
-        if len(paragraphs) == 1 and len(content) > 200:
+        if doc.paragraph_count == 1 and len(content) > 200:
             suggestions.append({
                 "type": "paragraph_structure",
                 "title": "优化段落结构",
@@ -267,8 +300,7 @@ class ContentAnalyzer:
             })
         
         # 表情符号建议
-        emoji_count = len(re.findall(r'[😀-🙏]', content))
-        if emoji_count == 0:
+        if doc.emoji_count == 0:
             suggestions.append({
                 "type": "emoji",
                 "title": "添加表情符号",
@@ -277,8 +309,7 @@ class ContentAnalyzer:
             })
         
         # 互动元素建议
-        question_count = content.count('?') + content.count('？')
-        if question_count == 0:
+        if doc.question_count == 0:
             suggestions.append({
                 "type": "interaction",
                 "title": "增加互动元素",
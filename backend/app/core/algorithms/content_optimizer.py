@@ -1,13 +1,17 @@
 """
 内容优化器 - 谐音词替换和内容优化
 """
-import re
-import random
 from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 
-from app.models.database import OriginalWord, HomophoneReplacement
+from app.models.database import HomophoneReplacement
+from app.core.algorithms.edit_log import EditLog
 from app.core.algorithms.emoji_inserter import EmojiInserter
+from app.core.algorithms.parsed_document import ParsedDocument, SENTENCE_TERMINATORS
+from app.core.algorithms.replacement_policy import ReplacementPolicy
+from app.core.lexicon_artifact import lexicon_artifacts
+from app.core.metrics import track_stage
+from app.core.profiling import traced
 
 
 class ContentOptimizer:
@@ -15,66 +19,51 @@ class ContentOptimizer:
     
     def __init__(self, db: Session):
         self.db = db
-        self.homophone_mappings = self._load_homophone_mappings()
-        self.emoji_inserter = EmojiInserter(db)
+        with track_stage("lexicon_load"):
+            # 谐音映射和表情数据来自内存映射的编译制品
+            lexicon = lexicon_artifacts.current()
+            self.homophone_mappings = lexicon.homophone_mappings
+            self.emoji_inserter = EmojiInserter(db, emoji_data=lexicon.emoji_data)
     
-    def _load_homophone_mappings(self) -> Dict[str, List[Dict]]:
-        """加载谐音词映射"""
-        mappings = {}
-        
-        # 查询所有启用的谐音词替换
-        replacements = self.db.query(HomophoneReplacement).join(OriginalWord).filter(
-            HomophoneReplacement.status == 1,
-            OriginalWord.status == 1
-        ).all()
-        
-        for replacement in replacements:
-            original_word = replacement.original.word
-            if original_word not in mappings:
-                mappings[original_word] = []
-            
-            mappings[original_word].append({
-                "replacement": replacement.replacement_word,
-                "type": replacement.replacement_type,
-                "priority": replacement.priority,
-                "confidence": replacement.confidence_score,
-                "usage_count": replacement.usage_count,
-                "id": replacement.id
-            })
-        
-        return mappings
-    
-    async def optimize_content(self, content: str, apply_suggestions: List[str] = None) -> Dict[str, Any]:
-        """优化内容"""
-        optimized_content = content
-        applied_changes = []
+    @traced("optimize_content")
+    async def optimize_content(self, content: str, apply_suggestions: List[str] = None,
+                               deterministic: Optional[bool] = None) -> Dict[str, Any]:
+        """优化内容（deterministic为True时同一内容结果固定，None时按配置REPLACEMENT_SAMPLING）"""
+        # 原文只解析一次；各阶段都在原文上定位，把编辑登记到同一个编辑日志，最后一次性生成结果
+        doc = ParsedDocument(content)
+        edit_log = EditLog(content)
+        policy = ReplacementPolicy(self.homophone_mappings, content, deterministic)
         
         # 应用谐音词替换
         if not apply_suggestions or "homophone_replacement" in apply_suggestions:
-            optimized_content, changes = self._apply_homophone_replacements(optimized_content)
-            applied_changes.extend(changes)
+            with track_stage("homophone_replacement"):
+                self._plan_homophone_replacements(doc, edit_log, policy)
         
         # 应用其他优化
         if not apply_suggestions or "structure_optimization" in apply_suggestions:
-            optimized_content, changes = self._apply_structure_optimization(optimized_content)
-            applied_changes.extend(changes)
+            with track_stage("structure_optimization"):
+                self._plan_structure_optimization(doc, edit_log, policy)
         
         # 应用表情符号优化
         if not apply_suggestions or "emoji_optimization" in apply_suggestions:
-            optimized_content, changes = self.emoji_inserter.analyze_content_and_insert_emojis(optimized_content)
-            applied_changes.extend(changes)
+            with track_stage("emoji_insertion"):
+                self.emoji_inserter.plan_emoji_insertions(doc, edit_log)
+        
+        # 生成结果文本，变更附上原文和结果中的区间
+        with track_stage("edit_apply"):
+            optimized_content = edit_log.apply()
+            applied_changes = edit_log.changes()
         
         # 计算优化后的分数
         from app.core.algorithms.content_analyzer import ContentAnalyzer
         analyzer = ContentAnalyzer(self.db)
         
         # 分析原始内容
-        original_analysis = await analyzer.analyze_content(content)
+        original_analysis, snapshot = await analyzer.analyze_for_rescoring(content, doc)
         original_score = original_analysis["score"]
         
-        # 分析优化后内容
-        optimized_analysis = await analyzer.analyze_content(optimized_content)
-        optimized_score = optimized_analysis["score"]
+        # 优化后内容的分数：在原文分析的基础上只复查被编辑的区域
+        optimized_score = analyzer.rescore(snapshot, edit_log, ParsedDocument.of(optimized_content, doc))
         
         # 更新使用统计
         self._update_usage_statistics(applied_changes)
@@ -87,50 +76,38 @@ class ContentOptimizer:
             "score_improvement": optimized_score - original_score
         }
     
-    def _apply_homophone_replacements(self, content: str) -> tuple[str, List[Dict]]:
-        """应用谐音词替换"""
-        optimized_content = content
-        applied_changes = []
-        
-        for original_word, replacements in self.homophone_mappings.items():
-            if original_word in optimized_content:
-                # 选择替换词
-                replacement_info = self._select_replacement(replacements)
+    def _plan_homophone_replacements(self, doc: ParsedDocument, edit_log: EditLog, policy: ReplacementPolicy) -> int:
+        """登记谐音词替换（词条按谐音词库顺序，与先登记的替换重叠的出现位置跳过），返回登记的变更数"""
+        content = doc.content
+        count = 0
+        
+        for original_word in self.homophone_mappings:
+            if original_word in content:
+                # 选择替换词（按预先构建的别名表抽取，不展开全部替换项）
+                replacement_info = policy.select_replacement(original_word)
                 if replacement_info:
                     replacement_word = replacement_info["replacement"]
                     
-                    # 执行替换
-                    old_content = optimized_content
-                    optimized_content = optimized_content.replace(original_word, replacement_word)
-                    
-                    if old_content != optimized_content:
-                        applied_changes.append({
-                            "type": "homophone_replacement",
-                            "original_word": original_word,
-                            "replacement_word": replacement_word,
-                            "replacement_type": replacement_info["type"],
-                            "replacement_id": replacement_info["id"],
-                            "positions": self._find_word_positions(old_content, original_word)
-                        })
-        
-        return optimized_content, applied_changes
-    
-    def _select_replacement(self, replacements: List[Dict]) -> Optional[Dict]:
-        """选择谐音词替换"""
-        if not replacements:
-            return None
-        
-        # 优先选择priority=1的词汇
-        priority_words = [r for r in replacements if r["priority"] == 1]
-        if priority_words:
-            return random.choice(priority_words)
-        
-        # 如果没有高优先级词汇，按置信度加权随机选择
-        weights = [r["confidence"] for r in replacements]
-        return random.choices(replacements, weights=weights)[0]
+                    # 与 str.replace 相同，从左到右替换所有不重叠的出现位置
+                    edits = [
+                        edit_log.replace(position, position + len(original_word), replacement_word)
+                        for position in self._find_word_positions(content, original_word)
+                    ]
+                    change = edit_log.record({
+                        "type": "homophone_replacement",
+                        "original_word": original_word,
+                        "replacement_word": replacement_word,
+                        "replacement_type": replacement_info["type"],
+                        "replacement_id": replacement_info["id"],
+                        "positions": [edit.start for edit in edits if edit is not None]
+                    }, edits)
+                    if change is not None:
+                        count += 1
+        
+        return count
     
     def _find_word_positions(self, content: str, word: str) -> List[int]:
-        """查找词汇在内容中的位置"""
+        """查找词汇在内容中不重叠的出现位置"""
         positions = []
         start = 0
         while True:
@@ -138,61 +115,74 @@ class ContentOptimizer:
             if pos == -1:
                 break
             positions.append(pos)
-            start = pos + 1
+            start = pos + len(word)
         return positions
     
-    def _apply_structure_optimization(self, content: str) -> tuple[str, List[Dict]]:
-        """应用结构优化"""
-        optimized_content = content
-        applied_changes = []
+    def _plan_structure_optimization(self, doc: ParsedDocument, edit_log: EditLog, policy: ReplacementPolicy) -> int:
+        """登记结构优化，返回登记的变更数"""
+        content = doc.content
+        # 按已登记的替换之后的长度判断
+        length = edit_log.length
+        count = 0
         
         # 段落优化
-        if len(content) > 200 and '\n' not in content:
-            # 简单的段落分割（在句号后分割）
-            sentences = re.split(r'([。！？])', content)
-            if len(sentences) > 3:
-                # 每2-3句组成一个段落
+        if length > 200 and doc.paragraph_count == 1:
+            # 简单的段落分割（在句末标点后分割；没有换行时句子区间即按句末标点切分）
+            sentences = doc.sentences
+            if len(sentences) >= 3:
+                # 每2-3句组成一个段落（原文区间）
                 paragraphs = []
-                current_paragraph = ""
+                paragraph_start = None
                 sentence_count = 0
                 
-                for i in range(0, len(sentences) - 1, 2):
-                    if i + 1 < len(sentences):
-                        sentence = sentences[i] + sentences[i + 1]
-                        current_paragraph += sentence
-                        sentence_count += 1
-                        
-                        if sentence_count >= 2 or len(current_paragraph) > 100:
-                            paragraphs.append(current_paragraph.strip())
-                            current_paragraph = ""
-                            sentence_count = 0
+                for start, end in sentences:
+                    # 连同句末标点一起；末尾没有标点的残句也保留
+                    if end < len(content) and content[end] in SENTENCE_TERMINATORS:
+                        end += 1
+                    if paragraph_start is None:
+                        paragraph_start = start
+                    sentence_count += 1
+                    
+                    if sentence_count >= 2 or end - paragraph_start > 100:
+                        paragraphs.append((paragraph_start, end))
+                        paragraph_start = None
+                        sentence_count = 0
+                
+                if paragraph_start is not None:
+                    paragraphs.append((paragraph_start, len(content)))
                 
-                if current_paragraph.strip():
-                    paragraphs.append(current_paragraph.strip())
+                # 各段去掉首尾空白后的区间（只有空白的段落并入段间分隔）
+                stripped = []
+                for start, end in paragraphs:
+                    text = content[start:end]
+                    if text.strip():
+                        stripped.append((start + len(text) - len(text.lstrip()), end - len(text) + len(text.rstrip())))
                 
-                if len(paragraphs) > 1:
-                    optimized_content = '\n\n'.join(paragraphs)
-                    applied_changes.append({
+                if len(stripped) > 1:
+                    edits = [edit_log.delete(0, stripped[0][0])]
+                    for (_, previous_end), (next_start, _) in zip(stripped, stripped[1:]):
+                        edits.append(edit_log.replace(previous_end, next_start, "\n\n"))
+                    edits.append(edit_log.delete(stripped[-1][1], len(content)))
+                    if edit_log.record({
                         "type": "paragraph_structure",
-                        "description": f"将长段落分解为 {len(paragraphs)} 个段落",
-                        "paragraphs_count": len(paragraphs)
-                    })
+                        "description": f"将长段落分解为 {len(stripped)} 个段落",
+                        "paragraphs_count": len(stripped)
+                    }, edits) is not None:
+                        count += 1
         
         # 表情符号优化（简单示例）
-        emoji_count = len(re.findall(r'[😀-🙏]', content))
-        if emoji_count == 0 and len(content) > 50:
+        if doc.emoji_count == 0 and length > 50:
             # 在内容末尾添加适当的表情符号
             positive_emojis = ['✨', '👍', '💫', '🌟', '😊']
-            selected_emoji = random.choice(positive_emojis)
-            optimized_content += f" {selected_emoji}"
-            
-            applied_changes.append({
+            selected_emoji = policy.choice("structure_emoji", positive_emojis)
+            if edit_log.record({
                 "type": "emoji_addition",
                 "description": f"添加表情符号: {selected_emoji}",
                 "emoji": selected_emoji
-            })
+            }, [edit_log.insert(len(content), f" {selected_emoji}")]) is not None:
+                count += 1
         
-        return optimized_content, applied_changes
+        return count
     
     def _update_usage_statistics(self, applied_changes: List[Dict]):
         """更新使用统计"""
@@ -0,0 +1,172 @@
+"""
+编辑日志 - 优化各阶段按原文坐标登记编辑操作，最后一次性生成结果文本
+
+各阶段都在原文上定位，不再各自生成新字符串，先登记的位置也不会因后续改写而失效。
+编辑区间冲突时先登记者优先，后登记的被拒绝；同一位置的多个插入按登记顺序排列。
+"""
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional, Tuple
+
+
+class Edit:
+    """一次编辑：把原文 [start, end) 替换为 text（start == end 时为插入，text 为空时为删除）"""
+
+    __slots__ = ("start", "end", "text", "seq", "final_start", "final_end")
+
+    def __init__(self, start: int, end: int, text: str, seq: int):
+        self.start = start
+        self.end = end
+        self.text = text
+        self.seq = seq
+        # 生成结果后填入结果文本中的坐标
+        self.final_start: Optional[int] = None
+        self.final_end: Optional[int] = None
+
+    @property
+    def sort_key(self) -> Tuple[int, int, int]:
+        # 同一位置插入排在替换之前，插入之间按登记顺序
+        return (self.start, 1 if self.end > self.start else 0, self.seq)
+
+
+class EditLog:
+    """一段原文上的编辑日志"""
+
+    def __init__(self, original: str):
+        self.original = original
+        self._edits: List[Edit] = []
+        # 已登记的非空区间（按起点排序，互不重叠）和插入位置，用于冲突检查
+        self._range_starts: List[int] = []
+        self._range_ends: List[int] = []
+        self._insert_positions: List[int] = []
+        self._changes: List[Tuple[Dict, List[Edit]]] = []
+        self._delta = 0
+        self._result: Optional[str] = None
+        # 生成结果后：按位置排序的编辑、各编辑的原文终点及其之前的累计长度变化
+        self._applied: List[Edit] = []
+        self._applied_ends: List[int] = []
+        self._shifts: List[int] = [0]
+
+    def __len__(self) -> int:
+        return len(self._edits)
+
+    @property
+    def length(self) -> int:
+        """应用全部已登记编辑后的文本长度"""
+        return len(self.original) + self._delta
+
+    def _conflicts(self, start: int, end: int) -> bool:
+        index = bisect_right(self._range_starts, start) - 1
+        if start == end:
+            # 插入不能落在已替换区间的内部
+            return index >= 0 and self._range_starts[index] < start < self._range_ends[index]
+        # 与前一个区间重叠
+        if index >= 0 and self._range_ends[index] > start:
+            return True
+        # 与后一个区间重叠
+        following = index + 1
+        if following < len(self._range_starts) and self._range_starts[following] < end:
+            return True
+        # 区间内部已有插入
+        position = bisect_right(self._insert_positions, start)
+        return position < len(self._insert_positions) and self._insert_positions[position] < end
+
+    def replace(self, start: int, end: int, text: str) -> Optional[Edit]:
+        """登记替换；与已登记的编辑冲突或没有实际变化时返回None"""
+        if self._result is not None:
+            raise RuntimeError("编辑日志已生成结果，不能继续登记")
+        if not 0 <= start <= end <= len(self.original):
+            raise ValueError(f"编辑区间越界: [{start}, {end})")
+        if text == self.original[start:end] or self._conflicts(start, end):
+            return None
+        edit = Edit(start, end, text, len(self._edits))
+        self._edits.append(edit)
+        if start == end:
+            insort(self._insert_positions, start)
+        else:
+            index = bisect_left(self._range_starts, start)
+            self._range_starts.insert(index, start)
+            self._range_ends.insert(index, end)
+        self._delta += len(text) - (end - start)
+        return edit
+
+    def insert(self, position: int, text: str) -> Optional[Edit]:
+        return self.replace(position, position, text)
+
+    def delete(self, start: int, end: int) -> Optional[Edit]:
+        return self.replace(start, end, "")
+
+    def record(self, change: Dict, edits: List[Optional[Edit]]) -> Optional[Dict]:
+        """登记一项变更及其对应的编辑（被拒绝的编辑忽略）；全部被拒绝时不登记，返回None"""
+        edits = [edit for edit in edits if edit is not None]
+        if not edits:
+            return None
+        self._changes.append((change, edits))
+        return change
+
+    def _ordered(self) -> List[Edit]:
+        return sorted(self._edits, key=lambda edit: edit.sort_key)
+
+    def apply(self) -> str:
+        """一次遍历生成结果文本，并为每个编辑填入结果坐标"""
+        if self._result is not None:
+            return self._result
+        pieces = []
+        cursor = 0
+        length = 0
+        self._applied = self._ordered()
+        for edit in self._applied:
+            unchanged = self.original[cursor:edit.start]
+            pieces.append(unchanged)
+            length += len(unchanged)
+            edit.final_start = length
+            pieces.append(edit.text)
+            length += len(edit.text)
+            edit.final_end = length
+            cursor = edit.end
+            self._applied_ends.append(edit.end)
+            self._shifts.append(edit.final_end - edit.end)
+        pieces.append(self.original[cursor:])
+        self._result = "".join(pieces)
+        return self._result
+
+    @property
+    def edits(self) -> List[Edit]:
+        """按位置排序的全部编辑（已填入结果坐标）"""
+        self.apply()
+        return self._applied
+
+    def touches(self, start: int, end: int) -> bool:
+        """原文区间 [start, end) 是否被某个编辑改动（与替换/删除区间重叠，或有插入落在区间内部）"""
+        return self._conflicts(start, end)
+
+    def map_position(self, position: int) -> int:
+        """原文位置在结果文本中的位置（位置上的插入排在该字符之前；位置不应落在被替换区间内部）"""
+        self.apply()
+        # 编辑按位置排序后原文终点单调不减，终点不超过该位置的编辑都在它之前
+        return position + self._shifts[bisect_right(self._applied_ends, position)]
+
+    def changes(self) -> List[Dict]:
+        """按登记顺序返回变更，附上每个编辑在原文和结果文本中的区间（须先生成结果）"""
+        self.apply()
+        result = []
+        for change, edits in self._changes:
+            change["original_spans"] = [[edit.start, edit.end] for edit in edits]
+            change["final_spans"] = [[edit.final_start, edit.final_end] for edit in edits]
+            result.append(change)
+        return result
+
+    def tail(self, size: int) -> str:
+        """应用已登记编辑后文本的最后 size 个字符（不生成整段文本）"""
+        pieces = []
+        collected = 0
+        cursor = len(self.original)
+        for edit in reversed(self._ordered()):
+            for piece in (self.original[max(edit.end, cursor - size):cursor], edit.text):
+                pieces.append(piece)
+                collected += len(piece)
+            cursor = edit.start
+            if collected >= size:
+                break
+        else:
+            pieces.append(self.original[max(0, cursor - size):cursor])
+        return "".join(reversed(pieces))[-size:] if size > 0 else ""
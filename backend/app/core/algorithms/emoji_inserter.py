@@ -4,17 +4,21 @@
 import json
 import os
 import re
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 from pathlib import Path
 from sqlalchemy.orm import Session
 
+from app.core.algorithms.edit_log import EditLog
+from app.core.algorithms.parsed_document import ParsedDocument
+
 
 class EmojiInserter:
     """表情符号智能插入器"""
     
-    def __init__(self, db: Session = None):
+    def __init__(self, db: Session = None, emoji_data: Dict[str, Any] = None):
         self.db = db
-        self.emoji_data = self._load_emoji_data()
+        # 可直接传入已加载的表情数据（如词库制品中的），避免重复查询
+        self.emoji_data = emoji_data if emoji_data is not None else self._load_emoji_data()
         self.content_mapping = self._build_content_mapping()
     
     def _load_emoji_data(self) -> Dict[str, Any]:
@@ -124,10 +128,16 @@ class EmojiInserter:
         
         return content_mapping
     
-    def analyze_content_and_insert_emojis(self, content: str) -> Tuple[str, List[Dict]]:
-        """分析内容并智能插入表情符号"""
-        optimized_content = content
-        applied_changes = []
+    def analyze_content_and_insert_emojis(self, content: str, doc: Optional[ParsedDocument] = None) -> Tuple[str, List[Dict]]:
+        """分析内容并智能插入表情符号（doc为调用方已构建的解析文档，省略时现场解析）"""
+        edit_log = EditLog(content)
+        self.plan_emoji_insertions(ParsedDocument.of(content, doc), edit_log)
+        optimized_content = edit_log.apply()
+        return optimized_content, edit_log.changes()
+    
+    def plan_emoji_insertions(self, doc: ParsedDocument, edit_log: EditLog) -> int:
+        """分析内容，把要插入的表情登记到编辑日志（原文坐标），返回登记的变更数"""
+        content = doc.content
         
         # 检测内容类型
         content_type = self._detect_content_type(content)
@@ -139,19 +149,10 @@ class EmojiInserter:
         recommended_emojis = self._get_recommended_emojis(content_type, emotion_tone)
         
         if not recommended_emojis:
-            return optimized_content, applied_changes
+            return 0
         
         # 智能插入表情
-        optimized_content, changes = self._smart_insert_emojis(
-            optimized_content, 
-            recommended_emojis, 
-            content_type,
-            emotion_tone
-        )
-        
-        applied_changes.extend(changes)
-        
-        return optimized_content, applied_changes
+        return self._smart_insert_emojis(doc, edit_log, recommended_emojis, content_type, emotion_tone)
     
     def _detect_content_type(self, content: str) -> str:
         """检测内容类型"""
@@ -212,45 +213,52 @@ class EmojiInserter:
         
         return list(emojis)[:4]  # 最多4个表情
     
-    def _smart_insert_emojis(self, content: str, emojis: List[str], content_type: str, emotion_tone: str) -> Tuple[str, List[Dict]]:
+    def _smart_insert_emojis(self, doc: ParsedDocument, edit_log: EditLog, emojis: List[str],
+                             content_type: str, emotion_tone: str) -> int:
         """智能插入表情符号"""
         if not emojis:
-            return content, []
+            return 0
         
-        optimized_content = content
+        content = doc.content
         applied_changes = []
         
         # 策略1: 在标题或开头添加主题表情
         if len(content) > 0:
-            sentences = re.split(r'[。！？\n]', optimized_content)
-            if sentences and len(sentences[0]) < 30:  # 可能是标题
+            sentence_start, sentence_end = doc.sentences[0]
+            first_sentence = doc.text((sentence_start, sentence_end))
+            if len(first_sentence) < 30:  # 可能是标题
                 theme_emoji = self._get_theme_emoji(content_type, emojis)
                 if theme_emoji:
-                    first_sentence = sentences[0]
                     if not self._has_emoji_at_start(first_sentence):
-                        optimized_content = optimized_content.replace(
-                            first_sentence, 
-                            f"{theme_emoji} {first_sentence.strip()}",
-                            1
-                        )
-                        applied_changes.append({
+                        # 去掉首句首尾空白，在开头插入主题表情
+                        leading = len(first_sentence) - len(first_sentence.lstrip())
+                        trailing = len(first_sentence) - len(first_sentence.rstrip())
+                        edits = [
+                            edit_log.delete(sentence_start, sentence_start + leading),
+                            edit_log.insert(sentence_start, f"{theme_emoji} "),
+                            edit_log.delete(max(sentence_start + leading, sentence_end - trailing), sentence_end),
+                        ]
+                        applied_changes.append(edit_log.record({
                             "type": "emoji_insertion",
                             "position": "title",
                             "emoji": theme_emoji,
                             "reason": f"为{content_type}内容添加主题表情"
-                        })
+                        }, edits))
         
         # 策略2: 在结尾添加情感表情
-        if not self._has_emoji_at_end(optimized_content):
+        if not self._has_emoji_at_end(edit_log.tail(32)):
             emotion_emoji = self._get_emotion_emoji(emotion_tone, emojis)
             if emotion_emoji:
-                optimized_content = optimized_content.rstrip() + f" {emotion_emoji}"
-                applied_changes.append({
+                edits = [
+                    edit_log.delete(len(content.rstrip()), len(content)),
+                    edit_log.insert(len(content), f" {emotion_emoji}"),
+                ]
+                applied_changes.append(edit_log.record({
                     "type": "emoji_insertion",
                     "position": "ending",
                     "emoji": emotion_emoji,
                     "reason": f"添加{emotion_tone}情感表情"
-                })
+                }, edits))
         
         # 策略3: 在重点词汇后添加强调表情
         emphasis_patterns = [
@@ -261,22 +269,17 @@ class EmojiInserter:
         ]
         
         for pattern, emoji in emphasis_patterns:
-            if re.search(pattern, optimized_content) and emoji in emojis:
-                optimized_content = re.sub(
-                    pattern, 
-                    lambda m: f"{m.group()}{emoji}",
-                    optimized_content,
-                    count=1
-                )
-                applied_changes.append({
+            match = re.search(pattern, content)
+            if match and emoji in emojis:
+                applied_changes.append(edit_log.record({
                     "type": "emoji_insertion",
                     "position": "emphasis",
                     "emoji": emoji,
                     "reason": "强调重点内容"
-                })
+                }, [edit_log.insert(match.end(), emoji)]))
                 break
         
-        return optimized_content, applied_changes
+        return sum(1 for change in applied_changes if change is not None)
     
     def _get_theme_emoji(self, content_type: str, available_emojis: List[str]) -> str:
         """获取主题表情"""
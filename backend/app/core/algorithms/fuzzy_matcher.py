@@ -0,0 +1,118 @@
+"""
+模糊匹配 - SymSpell式删除邻域索引，查找与词条仅差一次编辑的近似写法
+"""
+from typing import Dict, List, Sequence, Set, Tuple
+
+
+def is_single_edit(a: str, b: str) -> bool:
+    """两个字符串是否恰好相差一次编辑（插入、删除、替换或相邻换位）"""
+    len_a, len_b = len(a), len(b)
+    if len_a > len_b:
+        a, b, len_a, len_b = b, a, len_b, len_a
+    if len_b - len_a > 1 or a == b:
+        return False
+
+    i = 0
+    while i < len_a and a[i] == b[i]:
+        i += 1
+
+    if len_a == len_b:
+        # 替换
+        if a[i + 1:] == b[i + 1:]:
+            return True
+        # 相邻换位
+        return i + 1 < len_a and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+    # 插入/删除
+    return a[i:] == b[i + 1:]
+
+
+class FuzzyMatcher:
+    """编辑距离为1的近似匹配
+
+    索引阶段为每个词条及其全部单字删除变体建立 键 -> 词条序号 的哈希表；
+    匹配阶段对每个起点只生成正文窗口及其内部单字删除变体作为键，查表后再校验编辑距离，
+    并用键的前三个字做剪枝，不需要把窗口与每个词条逐一比较。
+    """
+
+    def __init__(self, words: Sequence[str], min_length: int = 4):
+        # 键至少3个字才能用三字前缀剪枝；三字以下的词做编辑距离1匹配误报也过多
+        min_length = max(min_length, 4)
+        self.words = words
+        self._index: Dict[str, List[int]] = {}
+        self._prefixes: Set[str] = set()
+        self._first_chars: Set[str] = set()
+
+        word_lengths = set()
+        for index, word in enumerate(words):
+            if len(word) < min_length:
+                continue
+            word_lengths.add(len(word))
+            keys = {word}
+            keys.update(word[:i] + word[i + 1:] for i in range(len(word)))
+            for key in keys:
+                self._index.setdefault(key, []).append(index)
+                self._prefixes.add(key[:3])
+                self._first_chars.add(key[0])
+
+        # 键长为 词长 或 词长-1
+        self._key_lengths = sorted({n for length in word_lengths for n in (length - 1, length)})
+
+    @property
+    def key_count(self) -> int:
+        return len(self._index)
+
+    def find_all(self, text: str) -> List[Tuple[int, int, int]]:
+        """返回 (起始下标, 结束下标, 词条序号) 列表；精确命中及与词条互为子串的窗口不计入"""
+        if not self._index:
+            return []
+
+        index = self._index
+        prefixes = self._prefixes
+        first_chars = self._first_chars
+        key_lengths = self._key_lengths
+        text_length = len(text)
+
+        matches = []
+        seen = set()
+
+        def collect(key: str, start: int, end: int):
+            for word_index in index.get(key, ()):
+                if (start, end, word_index) in seen:
+                    continue
+                seen.add((start, end, word_index))
+                window = text[start:end]
+                word = self.words[word_index]
+                if window in word or word in window:
+                    continue
+                if is_single_edit(window, word):
+                    matches.append((start, end, word_index))
+
+        for start in range(text_length - key_lengths[0] + 1):
+            if text[start] not in first_chars:
+                continue
+            # 键的前三个字取决于删去的是窗口第几个字：不删或删第4个字之后为text[start:start+3]
+            head_ok = text[start:start + 3] in prefixes
+            gap2_ok = text[start:start + 2] + text[start + 3:start + 4] in prefixes
+            gap1_ok = text[start] + text[start + 2:start + 4] in prefixes
+            if not (head_ok or gap2_ok or gap1_ok):
+                continue
+
+            for key_length in key_lengths:
+                end = start + key_length
+                if end > text_length:
+                    break
+                if head_ok:
+                    collect(text[start:end], start, end)
+                if end + 1 > text_length:
+                    continue
+                # 窗口多一个字，删去其内部某个字后作为键（首尾字不删，否则等价于其他起点的连续窗口）
+                if gap1_ok:
+                    collect(text[start] + text[start + 2:end + 1], start, end + 1)
+                if gap2_ok:
+                    collect(text[start:start + 2] + text[start + 3:end + 1], start, end + 1)
+                if head_ok:
+                    for gap in range(start + 3, end):
+                        collect(text[start:gap] + text[gap + 1:end + 1], start, end + 1)
+
+        matches.sort()
+        return matches
@@ -0,0 +1,156 @@
+"""
+增量评分 - 由原文分析快照和编辑日志推算编辑后文本的评分，只复查编辑附近的区域
+
+评分只取决于各问题的风险等级、文本长度和段落数。违禁词命中由命中片段本身决定，评估结果只取决于
+命中片段、局部上下文和所在句子，因此：
+1. 与编辑相距较远的命中沿用原结果（上下文未变时连评估结果也沿用），坐标按编辑日志平移；
+2. 编辑附近的窗口在结果文本上重新匹配和评估；
+3. 谐音词出现位置同理，只在编辑附近重新查找。
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.algorithms.edit_log import EditLog
+from app.core.algorithms.parsed_document import ParsedDocument
+from app.core.algorithms.text_normalizer import extend_normalized
+
+
+class AnalysisSnapshot:
+    """一次完整分析的中间结果"""
+
+    def __init__(self, doc: ParsedDocument):
+        self.doc = doc
+        self.score: Optional[int] = None
+        # 违禁词命中及其评估结果（未构成违规为None）
+        self.matches: List[Tuple[Tuple[int, int, Dict, str], Optional[Dict]]] = []
+        # 谐音替换表中的全部原始词汇（都有可用替换）、各词的出现位置
+        self.homophone_words: Iterable[str] = ()
+        self.homophone_occurrences: Dict[str, List[Tuple[int, int]]] = {}
+
+
+def _overlaps(start: int, end: int, window_start: int, window_end: int) -> bool:
+    """区间 [start, end) 是否与窗口重叠（空窗口时须落在区间内部）"""
+    if window_start == window_end:
+        return start < window_start < end
+    return start < window_end and end > window_start
+
+
+@lru_cache(maxsize=4096)
+def _word_pattern(word: str) -> Tuple["re.Pattern", bool]:
+    """谐音词的查找模式（与完整分析相同，忽略大小写），以及该词是否有边界
+
+    词的某个真前缀（忽略大小写）等于其后缀时称有边界：相邻出现会互相重叠，非重叠查找的结果受远处文本影响。
+    长度为n的前缀与后缀相等，等价于把词的前n个字换成后n个字后仍能被整词模式匹配。
+    """
+    pattern = re.compile(re.escape(word), re.IGNORECASE)
+    has_border = any(
+        pattern.fullmatch(word[-length:] + word[length:])
+        for length in range(1, len(word))
+    )
+    return pattern, has_border
+
+
+class IncrementalScorer:
+    """增量评分器"""
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self.detector = analyzer.smart_detector
+
+    def score(self, snapshot: AnalysisSnapshot, edit_log: EditLog, final_doc: ParsedDocument) -> int:
+        if not edit_log.edits:
+            return snapshot.score
+        return self.analyzer._calculate_content_score(final_doc, self.risk_levels(snapshot, edit_log, final_doc))
+
+    def risk_levels(self, snapshot: AnalysisSnapshot, edit_log: EditLog, final_doc: ParsedDocument) -> List[int]:
+        """编辑后文本中全部问题的风险等级（与完整分析得到的问题一一对应，顺序不同）"""
+        risk_levels = self._prohibited_risk_levels(snapshot, edit_log, final_doc)
+        risk_levels.extend(self._homophone_risk_levels(snapshot, edit_log, final_doc))
+        return risk_levels
+
+    def _dirty_windows(self, final_text: str, edit_log: EditLog) -> List[Tuple[int, int, int, int]]:
+        """编辑附近需复查的窗口 (复查起点, 复查终点, 匹配起点, 匹配终点)，结果文本坐标
+
+        复查窗口向两侧各延伸一个最长命中（词长+1个规范化字符，近似匹配可多一个字），
+        覆盖所有与编辑重叠的命中；匹配窗口再延伸两个最长命中，覆盖与这些命中重叠、
+        影响其去重的其他命中。
+        """
+        reach = max((len(word) for word in self.detector.normalized_words), default=0) + 1
+        windows: List[List[int]] = []
+        for edit in edit_log.edits:
+            start = extend_normalized(final_text, edit.final_start, reach, -1)
+            end = extend_normalized(final_text, edit.final_end, reach, 1)
+            if windows and start <= windows[-1][1]:
+                windows[-1][1] = max(windows[-1][1], end)
+            else:
+                windows.append([start, end])
+        return [
+            (start, end,
+             extend_normalized(final_text, start, 2 * reach, -1), extend_normalized(final_text, end, 2 * reach, 1))
+            for start, end in windows
+        ]
+
+    def _prohibited_risk_levels(self, snapshot: AnalysisSnapshot, edit_log: EditLog,
+                                final_doc: ParsedDocument) -> List[int]:
+        detector = self.detector
+        original_doc = snapshot.doc
+        windows = self._dirty_windows(final_doc.content, edit_log)
+        risk_levels = []
+
+        # 窗口外的命中：沿用原命中，上下文未变时沿用原评估结果
+        for match, issue in snapshot.matches:
+            start, end, word_info, match_type = match
+            if edit_log.touches(start, end):
+                continue
+            final_start = edit_log.map_position(start)
+            final_end = final_start + (end - start)
+            if any(_overlaps(final_start, final_end, window[0], window[1]) for window in windows):
+                continue
+            if detector.evaluation_inputs(original_doc, start, end) != detector.evaluation_inputs(final_doc, final_start, final_end):
+                issue = detector.evaluate_match(final_doc, (final_start, final_end, word_info, match_type))
+            if issue is not None:
+                risk_levels.append(issue["risk_level"])
+
+        # 窗口内的命中：在结果文本上重新匹配和评估
+        # 相邻窗口的匹配范围可能重叠，同一命中只计一次（词条信息每次访问都会新建，按词去重）
+        seen: Set[Tuple[int, int, str, str]] = set()
+        for start, end, match_start, match_end in windows:
+            window_text = final_doc.content[match_start:match_end]
+            for window_match in detector.find_word_matches(window_text, ParsedDocument(window_text)):
+                match = (window_match[0] + match_start, window_match[1] + match_start, window_match[2], window_match[3])
+                key = (match[0], match[1], match[2]["word"], match[3])
+                if key in seen or not _overlaps(match[0], match[1], start, end):
+                    continue
+                seen.add(key)
+                issue = detector.evaluate_match(final_doc, match)
+                if issue is not None:
+                    risk_levels.append(issue["risk_level"])
+        return risk_levels
+
+    def _homophone_risk_levels(self, snapshot: AnalysisSnapshot, edit_log: EditLog,
+                               final_doc: ParsedDocument) -> List[int]:
+        final_text = final_doc.content
+        edits = edit_log.edits
+        risk_levels = []
+        for word in snapshot.homophone_words:
+            pattern, has_border = _word_pattern(word)
+            if has_border:
+                # 出现位置可能相互重叠，整段重新查找
+                count = sum(1 for _ in pattern.finditer(final_text))
+            else:
+                # 未被编辑改动的原出现位置，加上与编辑重叠的新出现位置（不会与原位置重复）
+                count = sum(
+                    1 for start, end in snapshot.homophone_occurrences.get(word, ())
+                    if not edit_log.touches(start, end)
+                )
+                found = set()
+                for edit in edits:
+                    window_start = max(0, edit.final_start - len(word) + 1)
+                    window_end = edit.final_end + len(word) - 1
+                    for match in pattern.finditer(final_text, window_start, window_end):
+                        if _overlaps(match.start(), match.end(), edit.final_start, edit.final_end):
+                            found.add(match.start())
+                count += len(found)
+            risk_levels.extend([1] * count)
+        return risk_levels
@@ -0,0 +1,233 @@
+"""
+词库匹配器 - Aho-Corasick多模式匹配，一次扫描找出全部词条命中
+
+LexiconMatcher 用字典表示转移，构建方便；flatten() 把它展开为若干定长数组，
+FlatLexiconMatcher 直接在这些数组（可以是内存映射文件上的memoryview）上匹配，无需重建。
+"""
+from array import array
+from collections import deque
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+# 转移哈希表的乘法散列常数（64位黄金分割）
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+class LexiconMatcher:
+    """Aho-Corasick自动机
+
+    模式和待匹配文本可以是字符串，也可以是任意可哈希元素的序列（如拼音音节列表）。
+    命中以 (起始下标, 结束下标, 模式序号) 返回，模式序号为构建时传入的顺序。
+    """
+
+    def __init__(self, patterns: Sequence[Sequence[Hashable]]):
+        self._goto: List[Dict[Hashable, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, int]]] = [[]]
+        self.pattern_count = len(patterns)
+
+        for index, pattern in enumerate(patterns):
+            if len(pattern) == 0:
+                continue
+            self._add_pattern(pattern, index)
+        self._build_failure_links()
+
+    def _add_pattern(self, pattern: Sequence[Hashable], index: int):
+        state = 0
+        for token in pattern:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][token] = next_state
+            state = next_state
+        self._output[state].append((index, len(pattern)))
+
+    def _build_failure_links(self):
+        """按层次构建失败指针，并把后缀模式的输出合并进来"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                if self._output[self._fail[next_state]]:
+                    self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    @property
+    def state_count(self) -> int:
+        return len(self._goto)
+
+    def find_all(self, text: Sequence[Hashable]) -> List[Tuple[int, int, int]]:
+        """扫描文本，返回全部命中（含重叠命中）"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        root = goto[0]
+
+        matches = []
+        state = 0
+        for position, token in enumerate(text):
+            transitions = goto[state]
+            while state and token not in transitions:
+                state = fail[state]
+                transitions = goto[state]
+            state = transitions.get(token, 0) if state else root.get(token, 0)
+            if output[state]:
+                end = position + 1
+                for index, length in output[state]:
+                    matches.append((end - length, end, index))
+        return matches
+
+    def contains_any(self, text: Sequence[Hashable]) -> bool:
+        """文本中是否存在任一模式"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        root = goto[0]
+
+        state = 0
+        for token in text:
+            transitions = goto[state]
+            while state and token not in transitions:
+                state = fail[state]
+                transitions = goto[state]
+            state = transitions.get(token, 0) if state else root.get(token, 0)
+            if output[state]:
+                return True
+        return False
+
+    def flatten(self) -> Dict:
+        """展开为定长数组
+
+        - alphabet: 全部转移元素（排序），元素编号为下标+1，0表示不在字母表中
+        - root: 根状态按元素编号直接索引的转移
+        - keys/values: 其余转移的开放寻址哈希表，键为 状态*(字母表大小+1)+编号+1，0为空槽
+        - fail: 失败指针
+        - output_starts/outputs: 各状态输出在outputs中的区间，outputs为 (模式序号, 长度) 平铺
+        """
+        alphabet = sorted({token for transitions in self._goto for token in transitions})
+        codes = {token: code for code, token in enumerate(alphabet, 1)}
+        stride = len(alphabet) + 1
+
+        root = array("I", [0]) * stride
+        for token, next_state in self._goto[0].items():
+            root[codes[token]] = next_state
+
+        edge_count = sum(len(transitions) for transitions in self._goto[1:])
+        size = 1
+        while size < 2 * edge_count + 1:
+            size *= 2
+        mask = size - 1
+        keys = array("Q", [0]) * size
+        values = array("I", [0]) * size
+        for state in range(1, len(self._goto)):
+            for token, next_state in self._goto[state].items():
+                key = state * stride + codes[token] + 1
+                slot = ((key * _HASH_MULTIPLIER) >> 32) & mask
+                while keys[slot]:
+                    slot = (slot + 1) & mask
+                keys[slot] = key
+                values[slot] = next_state
+
+        output_starts = array("I", [0])
+        outputs = array("I")
+        for state_output in self._output:
+            for index, length in state_output:
+                outputs.append(index)
+                outputs.append(length)
+            output_starts.append(len(outputs) // 2)
+
+        return {
+            "alphabet": alphabet,
+            "root": root,
+            "keys": keys,
+            "values": values,
+            "fail": array("I", self._fail),
+            "output_starts": output_starts,
+            "outputs": outputs,
+            "pattern_count": self.pattern_count
+        }
+
+
+class FlatLexiconMatcher:
+    """在 LexiconMatcher.flatten() 的数组上匹配，结果与原自动机一致"""
+
+    def __init__(self, alphabet: Sequence[Hashable], root, keys, values, fail,
+                 output_starts, outputs, pattern_count: int):
+        self._codes = {token: code for code, token in enumerate(alphabet, 1)}
+        self._stride = len(alphabet) + 1
+        self._root = root
+        self._keys = keys
+        self._values = values
+        self._mask = len(keys) - 1
+        self._fail = fail
+        self._output_starts = output_starts
+        self._outputs = outputs
+        self.pattern_count = pattern_count
+
+    @property
+    def state_count(self) -> int:
+        return len(self._fail)
+
+    def _next_state(self, state: int, code: int) -> int:
+        """沿失败指针找到可转移的状态"""
+        keys = self._keys
+        mask = self._mask
+        while state:
+            key = state * self._stride + code + 1
+            slot = ((key * _HASH_MULTIPLIER) >> 32) & mask
+            while True:
+                stored = keys[slot]
+                if stored == key:
+                    return self._values[slot]
+                if not stored:
+                    break
+                slot = (slot + 1) & mask
+            state = self._fail[state]
+        return self._root[code]
+
+    def find_all(self, text: Sequence[Hashable]) -> List[Tuple[int, int, int]]:
+        """扫描文本，返回全部命中（含重叠命中）"""
+        get_code = self._codes.get
+        next_state = self._next_state
+        output_starts = self._output_starts
+        outputs = self._outputs
+
+        matches = []
+        state = 0
+        for position, token in enumerate(text):
+            code = get_code(token, 0)
+            if not code:
+                # 不在字母表中的元素不可能出现在任何模式里
+                state = 0
+                continue
+            state = next_state(state, code)
+            first, last = output_starts[state], output_starts[state + 1]
+            if first != last:
+                end = position + 1
+                for item in range(first, last):
+                    matches.append((end - outputs[2 * item + 1], end, outputs[2 * item]))
+        return matches
+
+    def contains_any(self, text: Sequence[Hashable]) -> bool:
+        """文本中是否存在任一模式"""
+        get_code = self._codes.get
+        next_state = self._next_state
+        output_starts = self._output_starts
+
+        state = 0
+        for token in text:
+            code = get_code(token, 0)
+            if not code:
+                state = 0
+                continue
+            state = next_state(state, code)
+            if output_starts[state] != output_starts[state + 1]:
+                return True
+        return False
@@ -0,0 +1,152 @@
+"""
+词库预筛 - 用词条前缀的n元组集合一次判定文本不可能命中任何词条，干净内容跳过匹配、评估和谐音扫描
+
+判定只会多报、不会漏报（可能命中时才进入完整检测）。规范文本逐字转拼音后，字相同则音节相同，
+因此有拼音键的词条（全部为汉字）的字面、谐音和近似命中都可以在拼音序列上检查：
+1. 三字及以上的词条：命中处须出现拼音键的前三个音节；
+2. 双字词条：谐音命中须保留一个原字（见 is_plausible_homophone），字面命中两字都相同，
+   须出现 (首字, 第二个音节) 或 (首个音节, 第二个字)；
+3. 近似匹配：FuzzyMatcher 只在窗口的 第1、2、3 / 第1、2、4 / 第1、3、4 个字之一是某个查找键
+   （词条或其删去一个字的变体）的前三个字时查表，这里在拼音序列上检查同样的三元组；
+4. 没有拼音键的词条（含非汉字）：单字词条查字符集合，其余按首字索引，在首字出现处比对其后的字。
+谐音替换机会：原文中须出现有替换写法的原词（忽略大小写）；不含大小写字母的原词按首字分组后直接做子串查找，
+大小写字母都是ASCII的原词在转小写的原文中查找；忽略大小写时另有等价字符（如 ſ 与 s、开尔文符号与 k），
+原词或原文含非ASCII的大小写字母时总是列为候选。
+"""
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from app.core.algorithms.parsed_document import ParsedDocument
+from app.core.algorithms.pinyin_keys import pinyin_key, STRICT_HOMOPHONE_SYLLABLES
+
+
+def _is_cased(char: str) -> bool:
+    return char.lower() != char or char.upper() != char
+
+
+def _has_unicode_case(chars: Iterable[str]) -> bool:
+    return any(char > "\x7f" and _is_cased(char) for char in chars)
+
+
+def _fuzzy_prefixes(key) -> Tuple[Tuple, ...]:
+    """近似匹配查找键（词条及其删去一个字的变体）可能的前三个元素"""
+    return (
+        tuple(key[:3]),                 # 词条本身，或删去第四个及之后的字
+        tuple(key[1:4]),                # 删去第一个字
+        (key[0], key[2], key[3]),       # 删去第二个字
+        (key[0], key[1], key[3])        # 删去第三个字
+    )
+
+
+class LexiconPrefilter:
+    """词库预筛（随词库制品构建，只读，可在线程间共享）"""
+
+    def __init__(self, normalized_words: Iterable[str], homophone_originals: Iterable[str],
+                 fuzzy_min_length: Optional[int] = None):
+        # 近似匹配只对不短于4个字的词条进行（与 FuzzyMatcher 相同）
+        fuzzy_length = max(fuzzy_min_length, 4) if fuzzy_min_length is not None else None
+
+        # 拼音序列上的检查
+        self._triples: Set[Tuple[str, ...]] = set()
+        self._fuzzy_triples: Set[Tuple[str, ...]] = set()
+        self._syllable_pairs: Set[Tuple[str, ...]] = set()
+        self._mixed_pairs: Set[Tuple[str, ...]] = set()
+        # 没有拼音键的词条：单字，及 首字 -> 其后reach个字内可能出现的字
+        self._chars: Set[str] = set()
+        followers: Dict[str, Set[str]] = {}
+        fuzzy_followers: Dict[str, Set[str]] = {}
+
+        for word in normalized_words:
+            if not word:
+                continue
+            key = pinyin_key(word)
+            fuzzy = fuzzy_length is not None and len(word) >= fuzzy_length
+            if key is None:
+                if len(word) == 1:
+                    self._chars.add(word)
+                    continue
+                followers.setdefault(word[0], set()).add(word[1])
+                if fuzzy:
+                    # 查找键的首字为词条第一或第二个字，第二个字在窗口中其后两个字之内
+                    for prefix in _fuzzy_prefixes(word):
+                        fuzzy_followers.setdefault(prefix[0], set()).add(prefix[1])
+                continue
+            if len(key) >= 3:
+                self._triples.add(key[:3])
+            elif len(key) <= STRICT_HOMOPHONE_SYLLABLES:
+                self._mixed_pairs.add((word[0], key[1]))
+                self._mixed_pairs.add((key[0], word[1]))
+            else:
+                self._syllable_pairs.add(key)
+            if fuzzy:
+                self._fuzzy_triples.update(_fuzzy_prefixes(key))
+
+        # 窗口前三个音节与查找键前三个元素相同的情况并入三元组检查
+        self._triples |= self._fuzzy_triples
+        self._followers = {first: frozenset(chars) for first, chars in followers.items()}
+        self._fuzzy_followers = {first: frozenset(chars) for first, chars in fuzzy_followers.items()}
+
+        self._homophone_groups: Dict[str, List[str]] = {}
+        # 小写形式 -> 原词
+        self._ascii_cased_homophones: Dict[str, List[str]] = {}
+        self._unicode_cased_homophones: List[str] = []
+        for word in homophone_originals:
+            if not word:
+                continue
+            if _has_unicode_case(word):
+                self._unicode_cased_homophones.append(word)
+            elif any(map(_is_cased, word)):
+                self._ascii_cased_homophones.setdefault(word.lower(), []).append(word)
+            else:
+                self._homophone_groups.setdefault(word[0], []).append(word)
+
+    @staticmethod
+    def _has_follower(text: str, index: Dict[str, FrozenSet[str]], reach: int) -> bool:
+        """文本中是否有某个首字，其后reach个字之内出现它的后继字"""
+        for first in index.keys() & set(text):
+            followers = index[first]
+            position = text.find(first)
+            while position != -1:
+                if not followers.isdisjoint(text[position + 1:position + 1 + reach]):
+                    return True
+                position = text.find(first, position + 1)
+        return False
+
+    def may_match_prohibited(self, doc: ParsedDocument) -> bool:
+        """文本是否可能命中违禁词（字面、谐音或近似匹配）"""
+        text = doc.normalized.text
+        if self._chars and not self._chars.isdisjoint(text):
+            return True
+        if self._followers and self._has_follower(text, self._followers, 1):
+            return True
+        if self._fuzzy_followers and self._has_follower(text, self._fuzzy_followers, 2):
+            return True
+
+        # 拼音序列与规范文本逐字对应（非汉字为空串，不在任何键中）
+        pinyin = doc.pinyin
+        mixed = self._mixed_pairs
+        if mixed and not (mixed.isdisjoint(zip(text, pinyin[1:])) and mixed.isdisjoint(zip(pinyin, text[1:]))):
+            return True
+        if self._triples and not self._triples.isdisjoint(zip(pinyin, pinyin[1:], pinyin[2:])):
+            return True
+        if self._syllable_pairs and not self._syllable_pairs.isdisjoint(zip(pinyin, pinyin[1:])):
+            return True
+        fuzzy = self._fuzzy_triples
+        return bool(fuzzy) and not (fuzzy.isdisjoint(zip(pinyin, pinyin[1:], pinyin[3:]))
+                                    and fuzzy.isdisjoint(zip(pinyin, pinyin[2:], pinyin[3:])))
+
+    def homophone_candidates(self, content: str) -> Set[str]:
+        """原文中可能出现的有替换写法的原词"""
+        chars = set(content)
+        candidates = set(self._unicode_cased_homophones)
+        groups = self._homophone_groups
+        for first in groups.keys() & chars:
+            candidates.update(word for word in groups[first] if word in content)
+        if self._ascii_cased_homophones:
+            if _has_unicode_case(chars):
+                candidates.update(word for words in self._ascii_cased_homophones.values() for word in words)
+            else:
+                folded = content.lower()
+                for lowered, words in self._ascii_cased_homophones.items():
+                    if lowered in folded:
+                        candidates.update(words)
+        return candidates
@@ -0,0 +1,320 @@
+"""
+紧凑词库存储 - 词条连续存放、分类驻留编号、数值列用数组，命中时才还原为dict
+
+各表可导出为列（columns），也可由列重建（from_columns），列既可以是内存中的数组，
+也可以是内存映射文件上的memoryview。
+"""
+import io
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class StringPool(Sequence):
+    """字符串池：全部字符串拼接为一个str，按偏移数组切片取出"""
+
+    def __init__(self, strings: Iterable[str] = ()):
+        buffer = io.StringIO()
+        offsets = array("I", [0])
+        total = 0
+        for string in strings:
+            buffer.write(string)
+            total += len(string)
+            offsets.append(total)
+        self._text = buffer.getvalue()
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("StringPool index out of range")
+        return self._text[self._offsets[index]:self._offsets[index + 1]]
+
+    def __iter__(self) -> Iterator[str]:
+        text = self._text
+        offsets = self._offsets
+        for index in range(len(offsets) - 1):
+            yield text[offsets[index]:offsets[index + 1]]
+
+
+class MappedStringPool(Sequence):
+    """UTF-8字符串池：字节块 + 字节偏移数组（均可为memoryview），取出时才解码"""
+
+    def __init__(self, blob, offsets):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("MappedStringPool index out of range")
+        return str(self._blob[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        blob = self._blob
+        offsets = self._offsets
+        for index in range(len(offsets) - 1):
+            yield str(blob[offsets[index]:offsets[index + 1]], "utf-8")
+
+
+def encode_strings(strings: Iterable[str]) -> Tuple[bytes, array]:
+    """把字符串序列编码为 (UTF-8字节块, 字节偏移数组)，供MappedStringPool使用"""
+    buffer = io.BytesIO()
+    offsets = array("I", [0])
+    total = 0
+    for string in strings:
+        encoded = string.encode("utf-8")
+        buffer.write(encoded)
+        total += len(encoded)
+        offsets.append(total)
+    return buffer.getvalue(), offsets
+
+
+class CodeTable:
+    """字符串驻留表：相同取值只保存一份，按编号引用"""
+
+    def __init__(self):
+        self.labels: List[Optional[str]] = []
+        self._codes: Dict[Optional[str], int] = {}
+
+    def code(self, label: Optional[str]) -> int:
+        code = self._codes.get(label)
+        if code is None:
+            code = len(self.labels)
+            self.labels.append(label)
+            self._codes[label] = code
+        return code
+
+
+class ProhibitedLexicon(Sequence):
+    """违禁词库：按下标取出 {"word", "category", "risk_level"}，与原列表-字典结构兼容"""
+
+    def __init__(self, rows: Iterable[Tuple[str, Optional[str], Optional[int]]]):
+        self._categories = CodeTable()
+        self._category_codes = array("H")
+        self._risk_levels = array("B")
+
+        def columns():
+            # 逐行写入数值列，词条流式写入字符串池，构建时不保留逐行对象
+            for word, category, risk_level in rows:
+                self._category_codes.append(self._categories.code(category))
+                self._risk_levels.append(max(0, min(255, risk_level or 0)))
+                yield word
+
+        self._words = StringPool(columns())
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def __getitem__(self, index: int) -> Dict:
+        return {
+            "word": self._words[index],
+            "category": self.category(index),
+            "risk_level": self._risk_levels[index]
+        }
+
+    def word(self, index: int) -> str:
+        return self._words[index]
+
+    def words(self) -> Iterator[str]:
+        return iter(self._words)
+
+    def category(self, index: int) -> Optional[str]:
+        return self._categories.labels[self._category_codes[index]]
+
+    def risk_level(self, index: int) -> int:
+        return self._risk_levels[index]
+
+    def columns(self) -> Dict:
+        """导出列"""
+        return {
+            "words": self._words,
+            "category_labels": self._categories.labels,
+            "category_codes": self._category_codes,
+            "risk_levels": self._risk_levels
+        }
+
+    @classmethod
+    def from_columns(cls, words: Sequence, category_labels: List[Optional[str]],
+                     category_codes, risk_levels) -> "ProhibitedLexicon":
+        """由列重建（不复制数据）"""
+        lexicon = cls.__new__(cls)
+        lexicon._words = words
+        lexicon._categories = CodeTable()
+        for label in category_labels:
+            lexicon._categories.code(label)
+        lexicon._category_codes = category_codes
+        lexicon._risk_levels = risk_levels
+        return lexicon
+
+
+def replacement_weights(priorities: Sequence[int], confidences: Sequence[float]) -> List[float]:
+    """替换项的选择权重：有priority=1的替换项时只在其中等概率选择，否则按置信度加权（置信度全为0时等概率）"""
+    if any(priority == 1 for priority in priorities):
+        return [1.0 if priority == 1 else 0.0 for priority in priorities]
+    if sum(confidences) > 0:
+        return [max(0.0, confidence) for confidence in confidences]
+    return [1.0] * len(priorities)
+
+
+def alias_table(weights: Sequence[float]) -> Tuple[List[float], List[int]]:
+    """Vose别名法：把加权分布拆成n列，每列由自身（概率probs[i]）和一个别名（aliases[i]）组成"""
+    count = len(weights)
+    total = sum(weights)
+    if count == 0 or total <= 0:
+        return [1.0] * count, list(range(count))
+    scaled = [weight * count / total for weight in weights]
+    probs = [1.0] * count
+    aliases = list(range(count))
+    small = [i for i, value in enumerate(scaled) if value < 1.0]
+    large = [i for i, value in enumerate(scaled) if value >= 1.0]
+    while small and large:
+        less = small.pop()
+        more = large[-1]
+        probs[less] = scaled[less]
+        aliases[less] = more
+        scaled[more] -= 1.0 - scaled[less]
+        if scaled[more] < 1.0:
+            small.append(large.pop())
+    # 剩余各列（浮点误差导致的也在内）概率取1
+    return probs, aliases
+
+
+class ReplacementTable(Mapping):
+    """谐音替换表：原词 -> 替换项列表，替换项按原词分组连续存放，取出时还原为dict
+
+    rows须按原词分组排列（同一原词的替换项相邻），逐行流式构建，不保留中间结果。
+    构建时为每组预先生成别名表，按选择权重抽取替换项只需一个随机数、常数时间。
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, str, Optional[str], int, float, int, int]]):
+        self._group_index: Dict[str, int] = {}
+        self._group_starts = array("I", [0])
+        self._types = CodeTable()
+        self._type_codes = array("B")
+        self._priorities = array("b")
+        self._confidences = array("d")
+        self._usage_counts = array("I")
+        self._ids = array("I")
+
+        def columns():
+            current_word = None
+            for original_word, replacement, replacement_type, priority, confidence, usage_count, replacement_id in rows:
+                if original_word != current_word:
+                    if original_word in self._group_index:
+                        raise ValueError(f"谐音替换未按原词分组: {original_word}")
+                    if current_word is not None:
+                        self._group_starts.append(len(self._ids))
+                    self._group_index[original_word] = len(self._group_index)
+                    current_word = original_word
+                self._type_codes.append(self._types.code(replacement_type))
+                self._priorities.append(max(-128, min(127, priority or 0)))
+                self._confidences.append(confidence or 0.0)
+                self._usage_counts.append(usage_count or 0)
+                self._ids.append(replacement_id)
+                yield replacement
+            if current_word is not None:
+                self._group_starts.append(len(self._ids))
+
+        self._replacements = StringPool(columns())
+        self._originals = None
+
+        # 各组的别名表（与替换项逐项对应，别名为组内下标），采样时O(1)
+        self._alias_probs = array("d")
+        self._alias_targets = array("I")
+        for group in range(len(self)):
+            start, end = self._group_starts[group], self._group_starts[group + 1]
+            probs, targets = alias_table(replacement_weights(self._priorities[start:end], self._confidences[start:end]))
+            self._alias_probs.extend(probs)
+            self._alias_targets.extend(targets)
+
+    def _groups(self) -> Dict[str, int]:
+        """原词 -> 组号；由列重建时首次访问才构建"""
+        if self._group_index is None:
+            self._group_index = {word: group for group, word in enumerate(self._originals)}
+        return self._group_index
+
+    def __len__(self) -> int:
+        return len(self._group_starts) - 1
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._groups())
+
+    def __contains__(self, original_word) -> bool:
+        return original_word in self._groups()
+
+    def _entry(self, i: int) -> Dict:
+        return {
+            "replacement": self._replacements[i],
+            "type": self._types.labels[self._type_codes[i]],
+            "priority": self._priorities[i],
+            "confidence": self._confidences[i],
+            "usage_count": self._usage_counts[i],
+            "id": self._ids[i]
+        }
+
+    def __getitem__(self, original_word: str) -> List[Dict]:
+        group = self._groups()[original_word]
+        return [self._entry(i) for i in range(self._group_starts[group], self._group_starts[group + 1])]
+
+    def sample(self, original_word: str, u: float) -> Optional[Dict]:
+        """按选择权重（见replacement_weights）抽取一个替换项，u为[0, 1)均匀分布的随机数；原词不存在时返回None"""
+        group = self._groups().get(original_word)
+        if group is None:
+            return None
+        start = self._group_starts[group]
+        count = self._group_starts[group + 1] - start
+        if count == 0:
+            return None
+        # 一个随机数拆成两部分：整数部分选列，小数部分决定取该列还是其别名
+        scaled = u * count
+        column = min(int(scaled), count - 1)
+        if scaled - column >= self._alias_probs[start + column]:
+            column = self._alias_targets[start + column]
+        return self._entry(start + column)
+
+    def columns(self) -> Dict:
+        """导出列（原词按组号顺序排列）"""
+        return {
+            "originals": list(self._groups()),
+            "group_starts": self._group_starts,
+            "replacements": self._replacements,
+            "type_labels": self._types.labels,
+            "type_codes": self._type_codes,
+            "priorities": self._priorities,
+            "confidences": self._confidences,
+            "usage_counts": self._usage_counts,
+            "ids": self._ids,
+            "alias_probs": self._alias_probs,
+            "alias_targets": self._alias_targets
+        }
+
+    @classmethod
+    def from_columns(cls, originals: Sequence, group_starts, replacements: Sequence, type_labels: List[Optional[str]],
+                     type_codes, priorities, confidences, usage_counts, ids,
+                     alias_probs, alias_targets) -> "ReplacementTable":
+        """由列重建（不复制数据）"""
+        table = cls.__new__(cls)
+        table._originals = originals
+        table._group_index = None
+        table._group_starts = group_starts
+        table._replacements = replacements
+        table._types = CodeTable()
+        for label in type_labels:
+            table._types.code(label)
+        table._type_codes = type_codes
+        table._priorities = priorities
+        table._confidences = confidences
+        table._usage_counts = usage_counts
+        table._ids = ids
+        table._alias_probs = alias_probs
+        table._alias_targets = alias_targets
+        return table
@@ -0,0 +1,124 @@
+"""
+解析文档 - 每段文本只解析一次，分析、检测、优化和表情插入各阶段共用
+
+段落和句子以原文区间保存（不复制子串），表情、问号等计数以及规范化文本、拼音、分词
+都在首次用到时计算并缓存；文本被改写后构建新的解析文档。
+"""
+import re
+from bisect import bisect_right
+from functools import cached_property
+from typing import List, Optional, Tuple, Union
+
+from app.core.algorithms.text_normalizer import NormalizedText, normalize_text
+from app.core.algorithms.pinyin_keys import pinyin_sequence
+
+# 句子分隔符（句号、感叹号、问号、换行）
+SENTENCE_DELIMITERS = re.compile(r'[。！？\n]')
+# 句末标点（不含换行）
+SENTENCE_TERMINATORS = "。！？"
+# 计入表情数量的字符范围
+EMOJI_PATTERN = re.compile(r'[😀-🙏]')
+
+Span = Tuple[int, int]
+
+
+def _split_spans(content: str, delimiter: Union[str, "re.Pattern"]) -> List[Span]:
+    """按分隔符切分，返回各片段的原文区间（不含分隔符，与 str.split / re.split 的片段一一对应）"""
+    spans = []
+    start = 0
+    if isinstance(delimiter, str):
+        position = content.find(delimiter)
+        while position != -1:
+            spans.append((start, position))
+            start = position + len(delimiter)
+            position = content.find(delimiter, start)
+    else:
+        for match in delimiter.finditer(content):
+            spans.append((start, match.start()))
+            start = match.end()
+    spans.append((start, len(content)))
+    return spans
+
+
+class ParsedDocument:
+    """一段文本的解析结果"""
+
+    def __init__(self, content: str):
+        self.content = content
+
+    @classmethod
+    def of(cls, content: str, doc: Optional["ParsedDocument"] = None) -> "ParsedDocument":
+        """沿用调用方传入的解析结果（须对应同一文本），否则新建"""
+        if doc is not None and doc.content == content:
+            return doc
+        return cls(content)
+
+    def __len__(self) -> int:
+        return len(self.content)
+
+    def text(self, span: Span) -> str:
+        return self.content[span[0]:span[1]]
+
+    @cached_property
+    def paragraphs(self) -> List[Span]:
+        """段落区间（按换行切分）"""
+        return _split_spans(self.content, "\n")
+
+    @property
+    def paragraph_count(self) -> int:
+        return len(self.paragraphs)
+
+    @cached_property
+    def sentences(self) -> List[Span]:
+        """句子区间（按句末标点和换行切分，不含分隔符）"""
+        return _split_spans(self.content, SENTENCE_DELIMITERS)
+
+    @cached_property
+    def _sentence_starts(self) -> List[int]:
+        return [start for start, _ in self.sentences]
+
+    @cached_property
+    def _paragraph_starts(self) -> List[int]:
+        return [start for start, _ in self.paragraphs]
+
+    @staticmethod
+    def _span_at(spans: List[Span], starts: List[int], position: int) -> Optional[Span]:
+        index = bisect_right(starts, position) - 1
+        if index < 0:
+            return None
+        start, end = spans[index]
+        return (start, end) if start <= position < end else None
+
+    def sentence_at(self, position: int) -> str:
+        """包含该位置的句子（去除首尾空白）；位置落在分隔符上时为空串"""
+        span = self._span_at(self.sentences, self._sentence_starts, position)
+        return self.text(span).strip() if span else ""
+
+    def paragraph_at(self, position: int) -> str:
+        """包含该位置的段落（去除首尾空白）；位置落在换行上时为空串"""
+        span = self._span_at(self.paragraphs, self._paragraph_starts, position)
+        return self.text(span).strip() if span else ""
+
+    @cached_property
+    def emoji_count(self) -> int:
+        return len(EMOJI_PATTERN.findall(self.content))
+
+    @cached_property
+    def question_count(self) -> int:
+        return self.content.count('?') + self.content.count('？')
+
+    @cached_property
+    def normalized(self) -> NormalizedText:
+        """规范化文本（违禁词匹配用）"""
+        return normalize_text(self.content)
+
+    @cached_property
+    def pinyin(self) -> List[str]:
+        """规范化文本逐字拼音（谐音匹配用）"""
+        return pinyin_sequence(self.normalized.text)
+
+    @cached_property
+    def tokens(self) -> List[str]:
+        """jieba分词结果（可选，首次访问时才分词；jieba导入及词典加载约1秒）"""
+        import jieba
+        return list(jieba.cut(self.content))
@@ -0,0 +1,48 @@
+"""
+拼音键 - 汉字转无声调拼音，供谐音匹配使用
+"""
+from typing import Dict, List, Optional, Tuple
+
+# 谐音匹配的最少音节数，单字谐音误报过多
+MIN_HOMOPHONE_SYLLABLES = 2
+# 不超过该音节数的词条，谐音命中须至少有一个同位置字相同（全替换的双字谐音在正常文本中误报过多）
+STRICT_HOMOPHONE_SYLLABLES = 2
+
+# 单字拼音缓存（非汉字为空串）
+_pinyin_cache: Dict[str, str] = {}
+
+
+def char_pinyin(char: str) -> str:
+    """单字无声调拼音；多音字统一取默认读音，保证词条与正文口径一致"""
+    cached = _pinyin_cache.get(char)
+    if cached is not None:
+        return cached
+    # 延迟导入：pypinyin导入时加载词典，不放在启动路径上
+    from pypinyin import lazy_pinyin, Style
+    syllables = lazy_pinyin(char, style=Style.NORMAL, errors="ignore")
+    syllable = syllables[0] if syllables else ""
+    _pinyin_cache[char] = syllable
+    return syllable
+
+
+def pinyin_key(word: str) -> Optional[Tuple[str, ...]]:
+    """词条的拼音键；含非汉字或音节过少时返回None（不参与谐音匹配）"""
+    if len(word) < MIN_HOMOPHONE_SYLLABLES:
+        return None
+    key = tuple(char_pinyin(char) for char in word)
+    if not all(key):
+        return None
+    return key
+
+
+def is_plausible_homophone(span: str, word: str) -> bool:
+    """谐音命中是否可信：短词要求保留至少一个原字"""
+    if len(word) > STRICT_HOMOPHONE_SYLLABLES:
+        return True
+    return any(a == b for a, b in zip(span, word))
+
+
+def pinyin_sequence(text: str) -> List[str]:
+    """文本逐字转拼音，与原字符一一对应（非汉字为空串，不会命中任何词条）"""
+    cache = _pinyin_cache
+    return [cache[char] if char in cache else char_pinyin(char) for char in text]
@@ -0,0 +1,41 @@
+"""
+替换策略 - 优化时的随机选择（谐音替换项、结构优化表情）统一由策略提供随机数
+
+random 模式使用进程内随机数；seeded 模式的随机数由内容哈希和选择项的键导出，
+同一内容在同一词库下每次得到相同结果，优化结果可以缓存和复现；
+各选择项的随机数互相独立，词库中新增或删除其他原词不影响已有原词的选择。
+"""
+import hashlib
+import random
+from typing import Any, Dict, Optional, Sequence
+
+from app.core.algorithms.lexicon_store import ReplacementTable
+from app.core.config import REPLACEMENT_SAMPLING
+
+SAMPLING_RANDOM = "random"
+SAMPLING_SEEDED = "seeded"
+
+
+class ReplacementPolicy:
+    """一次优化的替换策略"""
+
+    def __init__(self, table: ReplacementTable, content: str, deterministic: Optional[bool] = None):
+        if deterministic is None:
+            deterministic = REPLACEMENT_SAMPLING == SAMPLING_SEEDED
+        self.table = table
+        self.mode = SAMPLING_SEEDED if deterministic else SAMPLING_RANDOM
+        self._seed = hashlib.sha256(content.encode("utf-8")).digest() if deterministic else None
+
+    def uniform(self, key: str) -> float:
+        """[0, 1) 均匀分布的随机数；seeded 模式下由内容哈希和key确定"""
+        if self._seed is None:
+            return random.random()
+        digest = hashlib.sha256(self._seed + key.encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+    def select_replacement(self, original_word: str) -> Optional[Dict]:
+        """按别名表抽取原词的替换项（有priority=1的替换项时只在其中选，否则按置信度加权）"""
+        return self.table.sample(original_word, self.uniform(f"homophone:{original_word}"))
+
+    def choice(self, key: str, options: Sequence) -> Any:
+        return options[min(int(self.uniform(key) * len(options)), len(options) - 1)]
@@ -2,56 +2,70 @@
 智能违禁词检测器 - 基于上下文语义分析
 """
 import re
-import jieba
-from typing import List, Dict, Any, Tuple, Set
+from typing import List, Dict, Any, Tuple, Set, Optional
 from sqlalchemy.orm import Session
 
-from app.models.database import ProhibitedWord, WhitelistPattern
+from app.core.algorithms.parsed_document import ParsedDocument
+from app.core.algorithms.pinyin_keys import is_plausible_homophone
+from app.core.config import FUZZY_MATCH_ENABLED, FUZZY_MATCH_MIN_LENGTH
+from app.core.lexicon_artifact import lexicon_artifacts
+from app.core.metrics import track_stage
+from app.core.profiling import traced
+
+
+def _compile_indicator_patterns(patterns: Dict[str, List[str]]) -> List[Tuple[str, "re.Pattern"]]:
+    """预编译上下文指示器模式（每个模式单独计数）"""
+    return [(category, re.compile(pattern, re.IGNORECASE)) for category, items in patterns.items() for pattern in items]
+
+
+# 风险指示器
+RISK_INDICATOR_PATTERNS = _compile_indicator_patterns({
+    "营销推广": [r"推荐", r"安利", r"种草", r"必买", r"限时", r"特价", r"优惠", r"我家的", r"我们的产品", r"这款产品"],
+    "绝对化表达": [r"绝对", r"100%", r"百分百", r"完全", r"彻底", r"世界第一", r"全球第一", r"行业第一", r"没人敢说"],
+    "医疗承诺": [r"治疗", r"治愈", r"康复", r"根治", r"药效", r"疗效"],
+    "夸大宣传": [r"神奇", r"奇迹", r"秘密", r"独家", r"专利", r"权威"],
+    "紧迫感营销": [r"马上", r"立即", r"赶紧", r"抓紧", r"仅限", r"名额有限"],
+    "产品宣传": [r"产品是", r"品牌是", r"效果是", r"质量是"]
+})
+
+# 安全指示器
+SAFETY_INDICATOR_PATTERNS = _compile_indicator_patterns({
+    "客观描述": [r"介绍", r"分享", r"体验", r"感受", r"记录"],
+    "时间表达": [r"最近", r"昨天", r"今天", r"明天", r"第一次", r"第一天"],
+    "否定用法": [r"不是", r"并非", r"没有", r"不会", r"拒绝"],
+    "疑问表达": [r"是否", r"会不会", r"有没有", r"？", r"\?"],
+    "比较表达": [r"相比", r"比较", r"对比", r"差别", r"区别"]
+})
+
+# 局部上下文半径（命中前后各取的字符数）
+LOCAL_CONTEXT_RADIUS = 20
 
 
 class SmartProhibitedDetector:
     """智能违禁词检测器"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, lexicon=None):
         self.db = db
-        self.prohibited_words = self._load_prohibited_words()
-        self.whitelist_patterns = self._load_whitelist_patterns()
+        with track_stage("lexicon_load"):
+            # 词库来自内存映射的编译制品：词条、规范化结果和两个自动机均已预先构建
+            # （也可传入接口相同的其他词库，例如影响预览中的候选词库）
+            if lexicon is None:
+                lexicon = lexicon_artifacts.current()
+            self.lexicon = lexicon
+            self.prohibited_words = lexicon.prohibited_words
+            self.whitelist_patterns = lexicon.whitelist_patterns
+            self.normalized_words = lexicon.normalized_words
+            self.word_matcher = lexicon.word_matcher
+            # 谐音索引：词条按无声调拼音建自动机，正文转拼音后一次扫描
+            self.pinyin_matcher = lexicon.pinyin_matcher
+            # 可选的近似匹配（插入、缺失、替换或换位一个字）
+            self.fuzzy_matcher = lexicon.fuzzy_matcher(FUZZY_MATCH_MIN_LENGTH) if FUZZY_MATCH_ENABLED else None
+            self.approved_spellings = lexicon.approved_spellings
+            # 干净内容预筛（候选词库等未提供预筛的词库为None，总是完整检测）
+            prefilter = getattr(lexicon, "prefilter", None)
+            self.prefilter = prefilter(FUZZY_MATCH_MIN_LENGTH if FUZZY_MATCH_ENABLED else None) if prefilter else None
         self.context_rules = self._build_context_rules()
     
-    def _load_prohibited_words(self) -> List[Dict]:
-        """加载违禁词库"""
-        words = self.db.query(ProhibitedWord).filter(ProhibitedWord.status == 1).all()
-        return [
-            {
-                "word": word.word,
-                "category": word.category,
-                "risk_level": word.risk_level
-            }
-            for word in words
-        ]
-    
-    def _load_whitelist_patterns(self) -> Dict[str, List[str]]:
-        """从数据库加载白名单模式"""
-        try:
-            # 查询启用的白名单模式
-            patterns = self.db.query(WhitelistPattern).filter(
-                WhitelistPattern.is_active == 1
-            ).order_by(WhitelistPattern.priority.desc()).all()
-            
-            # 按违禁词分组
-            whitelist_dict = {}
-            for pattern in patterns:
-                word = pattern.prohibited_word
-                if word not in whitelist_dict:
-                    whitelist_dict[word] = []
-                whitelist_dict[word].append(pattern.pattern)
-            
-            return whitelist_dict
-        except Exception as e:
-            # 如果数据库查询失败，返回空字典并记录错误
-            print(f"加载白名单模式失败: {e}")
-            return {}
-    
     def _build_context_rules(self) -> Dict[str, Dict]:
         """构建上下文规则"""
         return {
@@ -88,94 +102,168 @@ class SmartProhibitedDetector:
             }
         }
     
-    def detect_prohibited_words(self, content: str) -> List[Dict]:
-        """智能检测违禁词"""
-        issues = []
+    def detect_prohibited_words(self, content: str, doc: Optional[ParsedDocument] = None) -> List[Dict]:
+        """智能检测违禁词（doc为调用方已构建的解析文档，省略时现场解析）"""
+        return [issue for _, issue in self.detect_with_matches(content, doc) if issue is not None]
+    
+    @traced("detect_prohibited_words")
+    def detect_with_matches(self, content: str, doc: Optional[ParsedDocument] = None) -> List[Tuple[Tuple[int, int, Dict, str], Optional[Dict]]]:
+        """匹配并逐个评估，返回 (命中, 问题或None) 列表；未构成违规的命中也保留，供增量评分沿用"""
+        doc = ParsedDocument.of(content, doc)
         
-        # 分词处理
-        words = list(jieba.cut(content))
-        
-        for word_info in self.prohibited_words:
-            prohibited_word = word_info["word"]
-            
-            # 查找所有匹配位置
-            matches = list(re.finditer(re.escape(prohibited_word), content, re.IGNORECASE))
-            
-            for match in matches:
-                start_pos = match.start()
-                end_pos = match.end()
-                
-                # 提取上下文
-                context = self._extract_context(content, start_pos, end_pos)
-                
-                # 检查是否在白名单中
-                if self._is_in_whitelist(prohibited_word, context):
-                    continue
-                
-                # 进行上下文语义分析
-                risk_assessment = self._analyze_context_risk(
-                    prohibited_word, 
-                    context, 
-                    word_info
-                )
-                
-                if risk_assessment["is_violation"]:
-                    # 生成唯一ID
-                    import uuid
-                    issue_id = str(uuid.uuid4())
-                    
-                    # 确定严重程度
-                    severity_mapping = {1: "low", 2: "medium", 3: "high"}
-                    severity = severity_mapping.get(risk_assessment["adjusted_risk_level"], "medium")
-                    
-                    issues.append({
-                        "id": issue_id,
-                        "type": "prohibited_word",
-                        "word": prohibited_word,
-                        "start_pos": start_pos,
-                        "end_pos": end_pos,
-                        "position": start_pos,  # 保持向后兼容
-                        "risk_level": risk_assessment["adjusted_risk_level"],
-                        "category": word_info["category"],
-                        "reason": risk_assessment["analysis"],
-                        "context": context["sentence_context"],
-                        "analysis": risk_assessment["analysis"],
-                        "confidence": risk_assessment["confidence"],
-                        "severity": severity,
-                        "suggestions": self._get_contextual_suggestions(prohibited_word, context)
-                    })
+        # 规范化后一次扫描找出全部命中（位置为原文坐标）
+        with track_stage("prohibited_match"):
+            matches = self.find_word_matches(content, doc)
         
+        return [(match, self.evaluate_match(doc, match)) for match in matches]
+    
+    def evaluate_matches(self, content: str, matches: List[Tuple[int, int, Dict, str]],
+                         doc: Optional[ParsedDocument] = None) -> List[Dict]:
+        """对命中逐个做白名单过滤和上下文风险分析，返回违规问题列表"""
+        if not matches:
+            return []
+        doc = ParsedDocument.of(content, doc)
+        issues = []
+        for match in matches:
+            issue = self.evaluate_match(doc, match)
+            if issue is not None:
+                issues.append(issue)
         return issues
     
-    def _extract_context(self, content: str, start_pos: int, end_pos: int) -> Dict[str, str]:
-        """提取上下文信息"""
-        # 提取前后各20个字符作为局部上下文
-        local_start = max(0, start_pos - 20)
-        local_end = min(len(content), end_pos + 20)
-        local_context = content[local_start:local_end]
+    def evaluation_inputs(self, doc: ParsedDocument, start_pos: int, end_pos: int) -> Tuple[str, str, str]:
+        """单个命中的评估结果只取决于命中片段、局部上下文和所在句子（增量评分据此判断能否沿用原结果）"""
+        context = self._extract_context(doc, start_pos, end_pos)
+        return doc.content[start_pos:end_pos], context["local_context"], context["sentence_context"]
+    
+    def evaluate_match(self, doc: ParsedDocument, match: Tuple[int, int, Dict, str]) -> Optional[Dict]:
+        """评估单个命中：白名单过滤和上下文风险分析，违规时返回问题，否则返回None"""
+        content = doc.content
+        start_pos, end_pos, word_info, match_type = match
+        prohibited_word = word_info["word"]
+        matched_text = content[start_pos:end_pos]
+        is_variation = matched_text.lower() != prohibited_word.lower()
+        
+        # 提取上下文
+        with track_stage("context_extraction"):
+            context = self._extract_context(doc, start_pos, end_pos)
+        
+        # 检查是否在白名单中
+        with track_stage("whitelist_filter"):
+            in_whitelist = self._is_in_whitelist(prohibited_word, context)
+        if in_whitelist:
+            return None
         
-        # 提取句子级别的上下文
-        sentences = re.split(r'[。！？\n]', content)
-        current_sentence = ""
+        # 进行上下文语义分析
+        with track_stage("risk_analysis"):
+            risk_assessment = self._analyze_context_risk(
+                prohibited_word, 
+                context, 
+                word_info
+            )
         
-        for sentence in sentences:
-            if start_pos >= content.find(sentence) and start_pos < content.find(sentence) + len(sentence):
-                current_sentence = sentence.strip()
-                break
+        if match_type == "homophone":
+            risk_assessment["analysis"] = f"谐音匹配：「{matched_text}」读音同「{prohibited_word}」；{risk_assessment['analysis']}"
+            risk_assessment["confidence"] = max(0.5, risk_assessment["confidence"] - 0.1)
+        elif match_type == "fuzzy":
+            risk_assessment["analysis"] = f"近似匹配：「{matched_text}」与「{prohibited_word}」仅差一字；{risk_assessment['analysis']}"
+            risk_assessment["confidence"] = max(0.5, risk_assessment["confidence"] - 0.15)
         
-        # 提取段落级别的上下文
-        paragraphs = content.split('\n')
-        current_paragraph = ""
+        if not risk_assessment["is_violation"]:
+            return None
         
-        for paragraph in paragraphs:
-            if start_pos >= content.find(paragraph) and start_pos < content.find(paragraph) + len(paragraph):
-                current_paragraph = paragraph.strip()
-                break
+        # 生成唯一ID
+        import uuid
+        issue_id = str(uuid.uuid4())
         
+        # 确定严重程度
+        severity_mapping = {1: "low", 2: "medium", 3: "high"}
+        severity = severity_mapping.get(risk_assessment["adjusted_risk_level"], "medium")
+        
+        issue = {
+            "id": issue_id,
+            "type": "prohibited_word",
+            "word": matched_text if is_variation else prohibited_word,
+            "start_pos": start_pos,
+            "end_pos": end_pos,
+            "position": start_pos,  # 保持向后兼容
+            "risk_level": risk_assessment["adjusted_risk_level"],
+            "category": word_info["category"],
+            "reason": risk_assessment["analysis"],
+            "context": context["sentence_context"],
+            "analysis": risk_assessment["analysis"],
+            "confidence": risk_assessment["confidence"],
+            "severity": severity,
+            "suggestions": self._get_contextual_suggestions(prohibited_word, context)
+        }
+        if is_variation:
+            # 变形写法（空格/符号分隔、全角、繁体、谐音、近似等）保留原文片段，并注明对应词条
+            issue["original_word"] = prohibited_word
+        return issue
+    
+    def find_word_matches(self, content: str, doc: Optional[ParsedDocument] = None) -> List[Tuple[int, int, Dict, str]]:
+        """匹配词库，返回 (原文起点, 原文终点, 词条信息, 匹配方式) 列表，按位置排序
+
+        匹配方式为 literal（字面及规范化变形）、homophone（谐音）或 fuzzy（近似）。
+        """
+        doc = ParsedDocument.of(content, doc)
+        normalized = doc.normalized
+        matches = []
+        # 已命中区间（规范文本坐标），谐音和近似匹配不重复报告
+        matched_spans = set()
+        
+        # 字面匹配（规范化文本）
+        for start, end, index in self.word_matcher.find_all(normalized.text):
+            matched_spans.add((start, end, index))
+            start_pos, end_pos = normalized.original_span(start, end)
+            word_info = self.prohibited_words[index]
+            surface = content[start_pos:end_pos]
+            if surface.lower() != word_info["word"].lower() and self._is_approved_spelling(surface):
+                continue
+            matches.append((start_pos, end_pos, word_info, "literal"))
+        
+        # 谐音匹配（规范化文本逐字转拼音，位置与规范文本一一对应）
+        literal_spans = {(start, end) for start, end, _ in matched_spans}
+        for start, end, index in self.pinyin_matcher.find_all(doc.pinyin):
+            if (start, end) in literal_spans:
+                continue
+            if not is_plausible_homophone(normalized.text[start:end], self.normalized_words[index]):
+                continue
+            matched_spans.add((start, end, index))
+            start_pos, end_pos = normalized.original_span(start, end)
+            if self._is_approved_spelling(content[start_pos:end_pos]):
+                continue
+            matches.append((start_pos, end_pos, self.prohibited_words[index], "homophone"))
+        
+        # 近似匹配（与同一词条已命中区间重叠的不再报告）
+        if self.fuzzy_matcher is not None:
+            for start, end, index in self.fuzzy_matcher.find_all(normalized.text):
+                if any(i == index and s < end and start < e for s, e, i in matched_spans):
+                    continue
+                start_pos, end_pos = normalized.original_span(start, end)
+                if self._is_approved_spelling(content[start_pos:end_pos]):
+                    continue
+                matches.append((start_pos, end_pos, self.prohibited_words[index], "fuzzy"))
+        
+        matches.sort(key=lambda match: (match[0], match[1]))
+        return matches
+    
+    def _is_approved_spelling(self, surface: str) -> bool:
+        """变形命中的原文片段是否包含谐音词库收录的替换写法"""
+        return any(spelling in surface for spelling in self.approved_spellings)
+    
+    def _extract_context(self, doc: ParsedDocument, start_pos: int, end_pos: int) -> Dict[str, str]:
+        """提取上下文信息"""
+        content = doc.content
+        # 提取前后各20个字符作为局部上下文
+        local_start = max(0, start_pos - LOCAL_CONTEXT_RADIUS)
+        local_end = min(len(content), end_pos + LOCAL_CONTEXT_RADIUS)
+        local_context = content[local_start:local_end]
+        
+        # 句子、段落级别的上下文（按命中位置在解析文档中二分定位）
         return {
             "local_context": local_context,
-            "sentence_context": current_sentence,
-            "paragraph_context": current_paragraph,
+            "sentence_context": doc.sentence_at(start_pos),
+            "paragraph_context": doc.paragraph_at(start_pos),
             "full_context": content
         }
     
@@ -239,45 +327,22 @@ class SmartProhibitedDetector:
     
     def _get_risk_indicators(self, word: str, sentence: str, local_context: str) -> Dict:
         """获取风险指示器"""
-        risk_patterns = {
-            "营销推广": [r"推荐", r"安利", r"种草", r"必买", r"限时", r"特价", r"优惠", r"我家的", r"我们的产品", r"这款产品"],
-            "绝对化表达": [r"绝对", r"100%", r"百分百", r"完全", r"彻底", r"世界第一", r"全球第一", r"行业第一", r"没人敢说"],
-            "医疗承诺": [r"治疗", r"治愈", r"康复", r"根治", r"药效", r"疗效"],
-            "夸大宣传": [r"神奇", r"奇迹", r"秘密", r"独家", r"专利", r"权威"],
-            "紧迫感营销": [r"马上", r"立即", r"赶紧", r"抓紧", r"仅限", r"名额有限"],
-            "产品宣传": [r"产品是", r"品牌是", r"效果是", r"质量是"]
-        }
-        
-        indicators = []
-        for category, patterns in risk_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, sentence + local_context, re.IGNORECASE):
-                    indicators.append(category)
+        text = sentence + local_context
+        indicators = [category for category, pattern in RISK_INDICATOR_PATTERNS if pattern.search(text)]
         
         return {
             "count": len(indicators),
-            "details": "、".join(set(indicators)) if indicators else "无特定风险指示器"
+            "details": "、".join(dict.fromkeys(indicators)) if indicators else "无特定风险指示器"
         }
     
     def _get_safety_indicators(self, word: str, sentence: str, local_context: str) -> Dict:
         """获取安全指示器"""
-        safety_patterns = {
-            "客观描述": [r"介绍", r"分享", r"体验", r"感受", r"记录"],
-            "时间表达": [r"最近", r"昨天", r"今天", r"明天", r"第一次", r"第一天"],
-            "否定用法": [r"不是", r"并非", r"没有", r"不会", r"拒绝"],
-            "疑问表达": [r"是否", r"会不会", r"有没有", r"？", r"\?"],
-            "比较表达": [r"相比", r"比较", r"对比", r"差别", r"区别"]
-        }
-        
-        indicators = []
-        for category, patterns in safety_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, sentence + local_context, re.IGNORECASE):
-                    indicators.append(category)
+        text = sentence + local_context
+        indicators = [category for category, pattern in SAFETY_INDICATOR_PATTERNS if pattern.search(text)]
         
         return {
             "count": len(indicators),
-            "details": "、".join(set(indicators)) if indicators else "无特定安全指示器"
+            "details": "、".join(dict.fromkeys(indicators)) if indicators else "无特定安全指示器"
         }
     
     def _get_contextual_suggestions(self, word: str, context: Dict[str, str]) -> List[str]:
@@ -0,0 +1,103 @@
+"""
+文本规范化 - 一次扫描生成规范文本及其到原文的偏移映射
+"""
+import unicodedata
+from typing import Dict, List, Tuple
+
+# 常见规避用分隔符（全角形式经NFKC后已折叠为半角）
+SEPARATOR_CHARS = frozenset(" \t\r*.·•‧∙-_~|/\\+#@^=`'\"")
+# 零宽及不可见格式字符
+INVISIBLE_CHARS = frozenset("\u200b\u200c\u200d\u200e\u200f\u2060\u2061\u2062\u2063\u2064\ufeff\u180e\u00ad")
+# 跳过的Unicode类别：格式字符、组合符号、变体选择符、表情及其他符号
+SKIPPED_CATEGORIES = frozenset(("Cf", "Mn", "Me", "So", "Sk"))
+
+# 常见繁体字 -> 简体字（覆盖营销、医疗、金融类违禁词常用字）
+TRADITIONAL_CHARS = (
+    "廣告銷減藥療癒絕對國際級頂權威獨專優惠價買賣錢貸款賭博彩體醫產質發財賺機會關與為這們來說時點經過還進開問"
+    "題電話號碼網絡聯繫壓顏臉膚斑瘡補腎陽陰癥狀傳統證書實驗訊貨幣險銀餘額舊換現紅歲齡夢歡遊戲禮贈誠信譽靈確稱"
+    "讚認準營業鋪線總務費標檢測儀器顯導頭條議論戰勝敗競爭壞氣隨動寶貝愛戀憂鬱腦練習學課貓狗雞鴨魚鳥龍鳳麗飾髮"
+    "髒亂輕鬆從眾純淨濃蟲殺滅紀錄監護養"
+)
+SIMPLIFIED_CHARS = (
+    "广告销减药疗愈绝对国际级顶权威独专优惠价买卖钱贷款赌博彩体医产质发财赚机会关与为这们来说时点经过还进开问"
+    "题电话号码网络联系压颜脸肤斑疮补肾阳阴症状传统证书实验讯货币险银余额旧换现红岁龄梦欢游戏礼赠诚信誉灵确称"
+    "赞认准营业铺线总务费标检测仪器显导头条议论战胜败竞争坏气随动宝贝爱恋忧郁脑练习学课猫狗鸡鸭鱼鸟龙凤丽饰发"
+    "脏乱轻松从众纯净浓虫杀灭纪录监护养"
+)
+TRADITIONAL_TO_SIMPLIFIED = dict(zip(TRADITIONAL_CHARS, SIMPLIFIED_CHARS))
+
+# 单字符规范化结果缓存（空串表示该字符被跳过）
+_char_cache: Dict[str, str] = {}
+
+
+def _normalize_char(char: str) -> str:
+    """规范化单个字符：NFKC折叠全角/兼容字符、去除分隔符、繁转简、小写"""
+    cached = _char_cache.get(char)
+    if cached is not None:
+        return cached
+
+    result = []
+    for folded in unicodedata.normalize("NFKC", char):
+        if folded in SEPARATOR_CHARS or folded in INVISIBLE_CHARS:
+            continue
+        if unicodedata.category(folded) in SKIPPED_CATEGORIES:
+            continue
+        folded = TRADITIONAL_TO_SIMPLIFIED.get(folded, folded)
+        result.append(folded.lower())
+
+    normalized = "".join(result)
+    _char_cache[char] = normalized
+    return normalized
+
+
+class NormalizedText:
+    """规范化后的文本，offsets[i] 为规范文本第i个字符在原文中的下标"""
+
+    __slots__ = ("original", "text", "offsets")
+
+    def __init__(self, original: str, text: str, offsets: List[int]):
+        self.original = original
+        self.text = text
+        self.offsets = offsets
+
+    def original_span(self, start: int, end: int) -> Tuple[int, int]:
+        """把规范文本中的 [start, end) 映射回原文区间"""
+        return self.offsets[start], self.offsets[end - 1] + 1
+
+
+def normalize_text(content: str) -> NormalizedText:
+    """规范化文本并记录偏移映射（换行及句读标点保留，避免跨句误匹配）"""
+    chars = []
+    offsets = []
+    cache = _char_cache
+    for index, char in enumerate(content):
+        normalized = cache.get(char)
+        if normalized is None:
+            normalized = _normalize_char(char)
+        if not normalized:
+            continue
+        chars.append(normalized)
+        if len(normalized) == 1:
+            offsets.append(index)
+        else:
+            offsets.extend([index] * len(normalized))
+    return NormalizedText(content, "".join(chars), offsets)
+
+
+def normalize_word(word: str) -> str:
+    """按与正文相同的规则规范化词条"""
+    return "".join(_normalize_char(char) for char in word)
+
+
+def extend_normalized(text: str, position: int, count: int, step: int) -> int:
+    """从position向左（step=-1）或向右（step=1）越过count个规范化字符，返回到达的位置"""
+    seen = 0
+    if step < 0:
+        while position > 0 and seen < count:
+            position -= 1
+            seen += len(_normalize_char(text[position]))
+        return position
+    while position < len(text) and seen < count:
+        seen += len(_normalize_char(text[position]))
+        position += 1
+    return position
@@ -0,0 +1,173 @@
+"""
+二进制制品文件 - 按名称存放定长数组、字符串池和JSON的只读容器，以内存映射方式打开
+
+文件布局（小端）：
+    8字节魔数 | uint32格式版本 | uint32元数据长度 | 元数据JSON | 按8字节对齐的各数据段
+
+元数据记录每个数据段的类型、偏移和长度，以及全部数据段的SHA-256（内容相同则摘要相同，可作版本号）。
+数组段打开后直接以memoryview访问，不复制、不解析，因此打开耗时与文件大小无关。
+写入先落到临时文件再原子替换，读者要么看到旧文件、要么看到新文件。
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, List
+
+from app.core.algorithms.lexicon_store import MappedStringPool, encode_strings
+
+MAGIC = b"XHSART\x00\x00"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sII")
+_ALIGNMENT = 8
+
+
+class ArtifactFormatError(ValueError):
+    """制品文件格式错误（魔数、版本、字节序不符或文件损坏）"""
+
+
+def _aligned(size: int) -> int:
+    return (size + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+class ArtifactWriter:
+    """制品写入器：add_* 登记数据段，write 一次性原子写出"""
+
+    def __init__(self, metadata: Dict = None):
+        self.metadata = dict(metadata or {})
+        self._sections: List = []
+        self._names = set()
+
+    def _add(self, name: str, kind: str, payload: bytes, **extra):
+        if name in self._names:
+            raise ValueError(f"数据段重复: {name}")
+        self._names.add(name)
+        self._sections.append((name, kind, payload, extra))
+
+    def add_array(self, name: str, values: array):
+        """登记定长数组（array.array）"""
+        self._add(name, "array", values.tobytes(), typecode=values.typecode, itemsize=values.itemsize)
+
+    def add_bytes(self, name: str, payload: bytes):
+        self._add(name, "bytes", bytes(payload))
+
+    def add_strings(self, name: str, strings: Iterable[str]):
+        """登记字符串序列，存为UTF-8字节块 + 字节偏移数组"""
+        blob, offsets = encode_strings(strings)
+        self.add_bytes(f"{name}.blob", blob)
+        self.add_array(f"{name}.offsets", offsets)
+
+    def add_json(self, name: str, value):
+        self._add(name, "json", json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    def write(self, path: str) -> str:
+        """写出到path：先写同目录临时文件并fsync，再原子替换；返回内容摘要"""
+        sections = {}
+        offset = 0
+        digest = hashlib.sha256()
+        for name, kind, payload, extra in self._sections:
+            digest.update(name.encode("utf-8") + b"\x00" + len(payload).to_bytes(8, "little"))
+            digest.update(payload)
+            sections[name] = dict(kind=kind, offset=offset, length=len(payload), **extra)
+            offset = _aligned(offset + len(payload))
+
+        meta = json.dumps(
+            {"byteorder": sys.byteorder, "content_hash": digest.hexdigest(),
+             "metadata": self.metadata, "sections": sections},
+            ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        data_start = _aligned(_HEADER.size + len(meta))
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(meta)))
+                f.write(meta)
+                f.write(b"\x00" * (data_start - _HEADER.size - len(meta)))
+                position = 0
+                for name, kind, payload, extra in self._sections:
+                    f.write(b"\x00" * (sections[name]["offset"] - position))
+                    f.write(payload)
+                    position = sections[name]["offset"] + len(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return digest.hexdigest()
+
+
+class ArtifactFile:
+    """只读打开制品文件（内存映射）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size < _HEADER.size:
+                raise ArtifactFormatError(f"制品文件过短: {path}")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # 记录打开时的文件身份，用于判断是否已被替换
+        self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        magic, version, meta_length = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ArtifactFormatError(f"不是制品文件: {path}")
+        if version != FORMAT_VERSION:
+            raise ArtifactFormatError(f"制品格式版本不支持: {version}")
+        try:
+            meta = json.loads(self._mmap[_HEADER.size:_HEADER.size + meta_length])
+        except ValueError as e:
+            raise ArtifactFormatError(f"制品元数据损坏: {e}")
+        if meta.get("byteorder") != sys.byteorder:
+            raise ArtifactFormatError("制品字节序与本机不一致")
+
+        self.content_hash: str = meta.get("content_hash", "")
+        self.metadata: Dict = meta.get("metadata", {})
+        self._sections: Dict[str, Dict] = meta.get("sections", {})
+        self._data_start = _aligned(_HEADER.size + meta_length)
+        self._view = memoryview(self._mmap)
+        for name, section in self._sections.items():
+            if self._data_start + section["offset"] + section["length"] > len(self._mmap):
+                raise ArtifactFormatError(f"制品数据段越界: {name}")
+
+    def _section(self, name: str, kind: str) -> Dict:
+        section = self._sections.get(name)
+        if section is None or section["kind"] != kind:
+            raise ArtifactFormatError(f"制品缺少数据段: {name}")
+        return section
+
+    def _slice(self, section: Dict) -> memoryview:
+        start = self._data_start + section["offset"]
+        return self._view[start:start + section["length"]]
+
+    def has(self, name: str) -> bool:
+        return name in self._sections or f"{name}.blob" in self._sections
+
+    def array(self, name: str) -> memoryview:
+        """数组段，返回指向映射内存的memoryview（只读）"""
+        section = self._section(name, "array")
+        view = self._slice(section)
+        if view.nbytes == 0:
+            # 空数组无法cast到多字节格式，返回同类型空数组
+            return memoryview(array(section["typecode"]))
+        view = view.cast(section["typecode"])
+        if view.itemsize != section["itemsize"]:
+            raise ArtifactFormatError(f"数组元素宽度与本机不一致: {name}")
+        return view
+
+    def bytes(self, name: str) -> memoryview:
+        return self._slice(self._section(name, "bytes"))
+
+    def strings(self, name: str) -> MappedStringPool:
+        """字符串段，按需解码"""
+        return MappedStringPool(self.bytes(f"{name}.blob"), self.array(f"{name}.offsets"))
+
+    def json(self, name: str):
+        return json.loads(bytes(self._slice(self._section(name, "json"))))
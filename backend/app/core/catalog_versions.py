@@ -0,0 +1,168 @@
+"""
+词库/目录版本号管理 - 为只读为主的目录数据维护单调递增的版本号
+
+版本号存放在数据库 catalog_versions 表中，与数据变更在同一事务中递增；
+各进程内保存一份副本（ETag等直接读取，不查询数据库），由后台线程定期轮询同步，
+其他工作进程的变更在一个轮询周期内生效。
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import case, event
+from sqlalchemy.orm import Session
+
+from app.models.database import CatalogVersion
+from app.core.config import CATALOG_POLL_INTERVAL_MS
+
+# 目录名称
+CATALOG_EMOJI = "emoji"
+CATALOG_EMOJI_CATEGORY = "emoji_category"
+CATALOG_PROHIBITED_WORD = "prohibited_word"
+CATALOG_WHITELIST = "whitelist"
+CATALOG_HOMOPHONE = "homophone"
+CATALOG_ADMIN_USER = "admin_user"
+
+ALL_CATALOGS = (
+    CATALOG_EMOJI, CATALOG_EMOJI_CATEGORY, CATALOG_PROHIBITED_WORD, CATALOG_WHITELIST, CATALOG_HOMOPHONE,
+    CATALOG_ADMIN_USER
+)
+
+# 会话中待提交的版本号（提交后写入进程内副本，回滚则丢弃）
+_PENDING_KEY = "pending_catalog_versions"
+
+
+class CatalogVersions:
+    """目录版本登记表（进程内副本）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        self._listeners: List[Callable[[Dict[str, int]], None]] = []
+
+    def get(self, catalog: str) -> int:
+        """获取目录当前版本号"""
+        return self._versions.get(catalog, 0)
+
+    def update(self, versions: Dict[str, int]) -> Dict[str, int]:
+        """用数据库中的版本号更新副本，返回发生变化的目录"""
+        with self._lock:
+            changed = {
+                catalog: version for catalog, version in versions.items()
+                if self._versions.get(catalog) != version
+            }
+            self._versions.update(changed)
+        return changed
+
+    def add_listener(self, listener: Callable[[Dict[str, int]], None]):
+        """注册版本变化回调（参数为全部目录的版本号），在轮询线程中调用"""
+        self._listeners.append(listener)
+
+    def notify(self, versions: Dict[str, int]):
+        for listener in self._listeners:
+            try:
+                listener(versions)
+            except Exception as e:
+                print(f"❌ 目录版本变化处理失败: {e}")
+
+    def token(self, catalog: str) -> str:
+        """生成目录版本标识（用于ETag）；版本号存放在数据库中且单调递增，各进程、重启前后一致"""
+        return f"{catalog}-{self.get(catalog)}"
+
+
+catalog_versions = CatalogVersions()
+
+
+def load_catalog_versions(db: Session) -> Dict[str, int]:
+    """读取数据库中全部目录的版本号（一次查询）"""
+    return {catalog: version for catalog, version in db.query(CatalogVersion.catalog, CatalogVersion.version)}
+
+
+def bump_catalog_version(db: Session, catalog: str) -> int:
+    """在当前事务中递增目录版本号，须在提交数据变更之前调用，与变更一同提交；
+    提交后本进程立即生效，其他进程由轮询感知"""
+    # 新版本号取 max(当前+1, 当前毫秒时间戳)：重建数据库后也不会与旧版本号重复
+    now_ms = int(time.time() * 1000)
+    next_version = case((CatalogVersion.version + 1 > now_ms, CatalogVersion.version + 1), else_=now_ms)
+    updated = db.query(CatalogVersion).filter(CatalogVersion.catalog == catalog).update(
+        {CatalogVersion.version: next_version}, synchronize_session=False
+    )
+    if not updated:
+        db.add(CatalogVersion(catalog=catalog, version=now_ms))
+        db.flush()
+    version = db.query(CatalogVersion.version).filter(CatalogVersion.catalog == catalog).scalar()
+    db.info.setdefault(_PENDING_KEY, {})[catalog] = version
+    return version
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_versions(session: Session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        catalog_versions.update(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_versions(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_catalog_versions(db: Session):
+    """为尚无记录的目录写入初始版本号（避免多个进程首次递增时并发插入）"""
+    existing = load_catalog_versions(db)
+    now_ms = int(time.time() * 1000)
+    for catalog in ALL_CATALOGS:
+        if catalog not in existing:
+            db.add(CatalogVersion(catalog=catalog, version=now_ms))
+
+
+class CatalogVersionWatcher:
+    """后台轮询线程：每个周期查询一次版本表，同步进程内副本，有变化时通知监听者"""
+
+    def __init__(self, interval: float, session_factory: Optional[Callable[[], Session]] = None):
+        self.interval = interval
+        self._session_factory = session_factory
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _open_session(self) -> Session:
+        if self._session_factory is None:
+            from app.database.connection import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def poll_once(self) -> Dict[str, int]:
+        """同步一次，返回发生变化的目录"""
+        db = self._open_session()
+        try:
+            versions = load_catalog_versions(db)
+        finally:
+            db.close()
+        changed = catalog_versions.update(versions)
+        if changed:
+            catalog_versions.notify(versions)
+        return changed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"❌ 轮询目录版本失败: {e}")
+
+    def start(self):
+        """启动轮询（每个工作进程各自启动；fork前的线程不会带入子进程）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="catalog-version-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+
+catalog_watcher = CatalogVersionWatcher(CATALOG_POLL_INTERVAL_MS / 1000)
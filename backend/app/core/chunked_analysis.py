@@ -0,0 +1,169 @@
+"""
+长文档分块检测 - 超长文本按段落切成带重叠的块，在进程池中并行做违禁词匹配和评估，按原文坐标合并
+
+违禁词的命中只取决于命中片段附近的规范化文本，评估只取决于命中片段、前后各20字的局部上下文和
+所在句子（句子不跨换行），因此：
+1. 块的核心区间在段落边界切分（段落过长时在句子边界），句子不会跨越核心区间；
+2. 核心区间两侧各加重叠区：两个最长词条的规范化字符数（含近似匹配多出的一个字）再加局部上下文半径，
+   覆盖起点在核心区间内的全部命中、与其重叠而影响去重的命中，以及它们的局部上下文；
+3. 每个命中只由起点所在核心区间的块报告，依次拼接后与整篇检测的结果及顺序相同。
+文本按并行进程数均分成块，耗时约为单块的检测时间。子进程映射同一份词库制品；
+制品已被替换（版本不一致）或进程池不可用时退回整篇检测。
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from app.core.algorithms.parsed_document import ParsedDocument, SENTENCE_DELIMITERS
+from app.core.algorithms.smart_prohibited_detector import SmartProhibitedDetector, LOCAL_CONTEXT_RADIUS
+from app.core.algorithms.text_normalizer import extend_normalized
+from app.core.config import CHUNKED_ANALYSIS_MIN_CHARS, CHUNKED_ANALYSIS_WORKERS, CHUNKED_ANALYSIS_CHUNK_CHARS
+from app.core.lexicon_artifact import CompiledLexicon
+from app.core.metrics import track_stage, untracked_stages
+
+# (块起点, 核心起点, 核心终点, 块终点)，原文坐标
+ChunkSpan = Tuple[int, int, int, int]
+
+
+class LexiconVersionMismatch(Exception):
+    """子进程映射到的词库制品与请求所用的版本不同"""
+
+
+_max_word_lengths: Dict[str, int] = {}
+
+
+def max_word_length(lexicon: CompiledLexicon) -> int:
+    """最长词条的规范化字符数（按词库版本缓存）"""
+    length = _max_word_lengths.get(lexicon.version)
+    if length is None:
+        length = max((len(word) for word in lexicon.normalized_words), default=0)
+        _max_word_lengths[lexicon.version] = length
+    return length
+
+
+def _core_end(content: str, target: int, slack: int) -> int:
+    """target之后最近的段落边界；slack字内没有换行时取最近的句子边界，都没有时到文末"""
+    newline = content.find("\n", target, target + slack)
+    if newline != -1:
+        return newline + 1
+    match = SENTENCE_DELIMITERS.search(content, target)
+    return match.end() if match else len(content)
+
+
+def chunk_size(length: int) -> int:
+    """核心区间字数：按并行进程数均分，不小于配置的最少字数"""
+    return max(CHUNKED_ANALYSIS_CHUNK_CHARS, -(-length // CHUNKED_ANALYSIS_WORKERS))
+
+
+def plan_chunks(content: str, reach: int, chunk_chars: int) -> List[ChunkSpan]:
+    """切分核心区间并加上两侧重叠区；reach为一个最长命中的规范化字符数"""
+    length = len(content)
+    chunks = []
+    start = 0
+    while start < length:
+        end = length
+        if start + chunk_chars < length:
+            end = _core_end(content, start + chunk_chars, chunk_chars // 2)
+            # 剩余部分不足半块时并入本块
+            if length - end < chunk_chars // 2:
+                end = length
+        text_start = max(0, extend_normalized(content, start, 2 * reach, -1) - LOCAL_CONTEXT_RADIUS)
+        text_end = min(length, extend_normalized(content, end, 2 * reach, 1) + LOCAL_CONTEXT_RADIUS)
+        chunks.append((text_start, start, end, text_end))
+        start = end
+    return chunks
+
+
+# 子进程内按制品版本缓存的检测器
+_worker_detector: Optional[SmartProhibitedDetector] = None
+
+
+def _detector_for(path: str, version: str) -> SmartProhibitedDetector:
+    global _worker_detector
+    if _worker_detector is None or _worker_detector.lexicon.version != version:
+        lexicon = CompiledLexicon(path)
+        if lexicon.version != version:
+            raise LexiconVersionMismatch(f"词库制品版本 {lexicon.version}，请求使用 {version}")
+        _worker_detector = SmartProhibitedDetector(None, lexicon=lexicon)
+    return _worker_detector
+
+
+def _init_worker():
+    """子进程启动时预热拼音库（首次使用约0.15秒）"""
+    from app.core.algorithms.pinyin_keys import char_pinyin
+    char_pinyin("广")
+
+
+def _detect_chunk(spec: Dict, chunk: Tuple[int, int, int, str]) -> List[Tuple[Tuple[int, int, Dict, str], Optional[Dict]]]:
+    """检测一块，返回起点在核心区间内的 (命中, 问题或None)，坐标已换算为原文坐标"""
+    offset, core_start, core_end, text = chunk
+    detector = _detector_for(spec["artifact_path"], spec["version"])
+    with untracked_stages():
+        results = detector.detect_with_matches(text)
+    owned = []
+    for (start, end, word_info, match_type), issue in results:
+        start += offset
+        if not core_start <= start < core_end:
+            continue
+        if issue is not None:
+            issue["start_pos"] += offset
+            issue["end_pos"] += offset
+            issue["position"] += offset
+        owned.append(((start, end + offset, word_info, match_type), issue))
+    return owned
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """分块检测用的进程池（首次使用时创建；spawn方式启动，不继承服务进程中的线程和连接）"""
+    global _pool
+    if CHUNKED_ANALYSIS_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=CHUNKED_ANALYSIS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+        return _pool
+
+
+def shutdown_pool():
+    """关闭进程池（应用退出时调用）"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+async def detect_matches(detector: SmartProhibitedDetector,
+                         doc: ParsedDocument) -> List[Tuple[Tuple[int, int, Dict, str], Optional[Dict]]]:
+    """与 detector.detect_with_matches 结果相同；长文本在进程池中分块并行检测，等待期间不占用事件循环"""
+    content = doc.content
+    lexicon = detector.lexicon
+    if len(content) < CHUNKED_ANALYSIS_MIN_CHARS or not isinstance(lexicon, CompiledLexicon):
+        return detector.detect_with_matches(content, doc)
+    pool = _get_pool()
+    if pool is None:
+        return detector.detect_with_matches(content, doc)
+
+    reach = max_word_length(lexicon) + 1
+    spec = {"artifact_path": lexicon.artifact.path, "version": lexicon.version}
+    loop = asyncio.get_running_loop()
+    try:
+        with track_stage("chunked_detection"):
+            results = await asyncio.gather(*[
+                loop.run_in_executor(pool, _detect_chunk, spec, (start, core_start, core_end, content[start:end]))
+                for start, core_start, core_end, end in plan_chunks(content, reach, chunk_size(len(content)))
+            ])
+    except Exception as e:
+        print(f"❌ 分块检测失败，改为整篇检测: {e}")
+        return detector.detect_with_matches(content, doc)
+    return [item for chunk_results in results for item in chunk_results]
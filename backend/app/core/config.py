@@ -0,0 +1,83 @@
+"""
+运行配置 - 从环境变量读取，未设置时使用默认值
+"""
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    """读取整数型环境变量"""
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"环境变量 {name}={value} 不是有效整数，使用默认值 {default}")
+        return default
+
+
+# 响应压缩：超过该字节数的JSON响应才压缩
+RESPONSE_COMPRESSION_MIN_BYTES = _env_int("RESPONSE_COMPRESSION_MIN_BYTES", 1024)
+# gzip压缩级别（1-9）
+RESPONSE_GZIP_LEVEL = _env_int("RESPONSE_GZIP_LEVEL", 6)
+# brotli压缩质量（0-11）
+RESPONSE_BROTLI_QUALITY = _env_int("RESPONSE_BROTLI_QUALITY", 5)
+
+# 近似匹配（编辑距离1）：1开启，0关闭
+FUZZY_MATCH_ENABLED = _env_int("FUZZY_MATCH_ENABLED", 0)
+# 参与近似匹配的最短词长（不小于4）
+FUZZY_MATCH_MIN_LENGTH = _env_int("FUZZY_MATCH_MIN_LENGTH", 4)
+
+# 编译后的词库制品文件（违禁词、白名单、谐音替换、表情），各进程内存映射打开
+LEXICON_ARTIFACT_PATH = os.getenv("LEXICON_ARTIFACT_PATH") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "lexicon.bin"
+)
+
+# 启动模式：development 每次启动建表并检查初始化数据；production 数据库结构已是最新时跳过
+STARTUP_MODE = os.getenv("STARTUP_MODE", "development")
+# 启动耗时预算（毫秒），超出时输出警告
+STARTUP_BUDGET_MS = _env_int("STARTUP_BUDGET_MS", 1000)
+# 启动后在后台预热拼音库：1开启，0关闭（首次用到时再加载）
+STARTUP_WARMUP = _env_int("STARTUP_WARMUP", 1)
+
+# 目录版本轮询间隔（毫秒）：其他工作进程的词库/目录变更在这个时间内生效
+CATALOG_POLL_INTERVAL_MS = _env_int("CATALOG_POLL_INTERVAL_MS", 2000)
+
+# 表情列表中使用次数及按使用次数排序的刷新周期（秒）：使用记录不递增目录版本号，列表的ETag按此周期更新
+EMOJI_USAGE_REFRESH_S = _env_int("EMOJI_USAGE_REFRESH_S", 300)
+
+# 管理员令牌校验结果缓存时间（秒），0关闭；账号被禁用、删除或重置密码时立即失效（其他进程在一个轮询周期内失效）
+ADMIN_AUTH_CACHE_TTL = _env_int("ADMIN_AUTH_CACHE_TTL", 30)
+
+# 词库变更影响预览：并行进程数（1为在请求线程内串行），以及缓存切分结果的历史笔记数（每篇约1KB）
+IMPACT_PREVIEW_WORKERS = _env_int("IMPACT_PREVIEW_WORKERS", min(os.cpu_count() or 1, 4))
+IMPACT_PREVIEW_CACHE_NOTES = _env_int("IMPACT_PREVIEW_CACHE_NOTES", 100000)
+# 影响预览最多回放的历史笔记数
+IMPACT_PREVIEW_MAX_NOTES = _env_int("IMPACT_PREVIEW_MAX_NOTES", 100000)
+
+# 历史记录分区：热分区（主库）保留的天数，更早的记录由后台任务滚动到压缩归档；0关闭归档
+HISTORY_HOT_DAYS = _env_int("HISTORY_HOT_DAYS", 30)
+# 归档任务执行间隔（秒），以及每个归档分段最多包含的记录数
+HISTORY_ARCHIVE_INTERVAL_S = _env_int("HISTORY_ARCHIVE_INTERVAL_S", 3600)
+HISTORY_ARCHIVE_BATCH = _env_int("HISTORY_ARCHIVE_BATCH", 5000)
+# 历史归档库文件
+HISTORY_ARCHIVE_PATH = os.getenv("HISTORY_ARCHIVE_PATH") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "history_archive.db"
+)
+
+# 谐音替换和结构优化表情的选择方式：random 每次随机；seeded 以内容哈希为种子，同一内容在同一词库下结果固定（可缓存）
+# 请求可用 deterministic 字段单独指定
+REPLACEMENT_SAMPLING = os.getenv("REPLACEMENT_SAMPLING", "random")
+
+# 准入控制（每个工作进程）：内容分析/优化同时处理的请求数上限（0关闭）、等待队列长度，
+# 以及排队超过多少毫秒仍未开始处理即返回503
+ADMISSION_MAX_CONCURRENT = _env_int("ADMISSION_MAX_CONCURRENT", 4)
+ADMISSION_MAX_QUEUE = _env_int("ADMISSION_MAX_QUEUE", 32)
+ADMISSION_QUEUE_TIMEOUT_MS = _env_int("ADMISSION_QUEUE_TIMEOUT_MS", 2000)
+
+# 长文档分块并行检测：超过该字数的文本按段落切成带重叠的块，在进程池中并行检测违禁词；
+# 并行进程数不大于1时关闭（每个工作进程各有一个进程池）
+CHUNKED_ANALYSIS_MIN_CHARS = _env_int("CHUNKED_ANALYSIS_MIN_CHARS", 20000)
+CHUNKED_ANALYSIS_WORKERS = _env_int("CHUNKED_ANALYSIS_WORKERS", min(os.cpu_count() or 1, 4))
+# 每块核心区间的最少字数（文本按并行进程数均分，块不小于该值）
+CHUNKED_ANALYSIS_CHUNK_CHARS = _env_int("CHUNKED_ANALYSIS_CHUNK_CHARS", 5000)
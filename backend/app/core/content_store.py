@@ -0,0 +1,97 @@
+"""
+内容寻址存储 - 笔记正文按SHA-256存入 content_blobs 表，历史记录只保存哈希
+
+相同正文只存一份，重复提交只递增提交次数；/optimize 按 (会话, 正文哈希) 的索引查找最近记录，
+不再比较整段TEXT。旧记录的正文仍在 original_content/optimized_content 列中，读取时哈希为空则用旧列。
+"""
+import hashlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import or_, select, union
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.models.database import ContentBlob, UserContentHistory
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def store_content(db: Session, content: str, count_submission: bool = True) -> str:
+    """在当前事务中写入正文（已存在则只递增提交次数），返回哈希"""
+    digest = content_hash(content)
+    now = datetime.utcnow()
+    increment = 1 if count_submission else 0
+    db.execute(insert(ContentBlob).values(
+        hash=digest,
+        content=content,
+        length=len(content),
+        submission_count=increment,
+        first_seen_at=now,
+        last_seen_at=now
+    ).on_conflict_do_update(
+        index_elements=[ContentBlob.hash],
+        set_={
+            "submission_count": ContentBlob.submission_count + increment,
+            "last_seen_at": now
+        }
+    ))
+    return digest
+
+
+def load_contents(db: Session, hashes: Iterable[Optional[str]]) -> Dict[str, str]:
+    """按哈希批量读取正文（一次查询）"""
+    wanted = {digest for digest in hashes if digest}
+    if not wanted:
+        return {}
+    return dict(db.query(ContentBlob.hash, ContentBlob.content).filter(ContentBlob.hash.in_(wanted)).all())
+
+
+def history_texts(db: Session, histories: List[UserContentHistory]) -> List[Tuple[str, Optional[str]]]:
+    """历史记录的 (原文, 优化后正文)；新记录从内容表批量读取，旧记录用原有的列"""
+    contents = load_contents(
+        db, [h.original_hash for h in histories] + [h.optimized_hash for h in histories]
+    )
+    return [
+        (
+            contents.get(h.original_hash, h.original_content) if h.original_hash else h.original_content,
+            contents.get(h.optimized_hash, h.optimized_content) if h.optimized_hash else h.optimized_content
+        )
+        for h in histories
+    ]
+
+
+def delete_unreferenced(db: Session) -> int:
+    """删除已没有历史记录引用的正文（历史记录归档后调用，归档分段中保存有正文副本），返回删除数"""
+    referenced = union(
+        select(UserContentHistory.original_hash).where(UserContentHistory.original_hash.isnot(None)),
+        select(UserContentHistory.optimized_hash).where(UserContentHistory.optimized_hash.isnot(None))
+    )
+    deleted = db.query(ContentBlob).filter(ContentBlob.hash.notin_(referenced)).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def backfill_content_blobs(db: Session, batch_size: int = 1000) -> int:
+    """把旧记录的正文移入内容表（写入哈希并清空旧列），按批提交，返回迁移的记录数"""
+    migrated = 0
+    while True:
+        histories = db.query(UserContentHistory).filter(
+            or_(
+                UserContentHistory.original_hash.is_(None),
+                UserContentHistory.optimized_hash.is_(None) & UserContentHistory.optimized_content.isnot(None)
+            )
+        ).order_by(UserContentHistory.id).limit(batch_size).all()
+        if not histories:
+            return migrated
+        for history in histories:
+            if history.original_hash is None:
+                history.original_hash = store_content(db, history.original_content or "")
+                history.original_content = ""
+            if history.optimized_hash is None and history.optimized_content is not None:
+                history.optimized_hash = store_content(db, history.optimized_content, count_submission=False)
+                history.optimized_content = None
+        db.commit()
+        migrated += len(histories)
@@ -0,0 +1,404 @@
+"""
+历史记录分区 - 用户内容历史按时间分为热分区和压缩归档
+
+热分区：主库 user_content_history 表，只保留最近 HISTORY_HOT_DAYS 天，/history 和统计接口默认只读这里；
+归档：更早的记录（连同内容表中的正文）按月分区，每批压缩为一个分段（zstd，未安装zstandard时gzip），存放在独立的归档库文件中；
+      分段带有行数和逐日汇总，统计接口合并归档数据时不解压，导出时按时间范围逐段解压。
+滚动：后台线程定期执行，跨进程文件锁保证同一时刻只有一个进程在归档；
+      分段先以"写入中"状态写入归档库，热分区删除提交后再标记完成，中途失败时下次执行先核对修复。
+"""
+import gzip
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models.database import ArchiveBase, HistoryArchiveSegment, UserContentHistory
+from app.core.content_store import delete_unreferenced, history_texts
+from app.core.config import (
+    HISTORY_HOT_DAYS, HISTORY_ARCHIVE_INTERVAL_S, HISTORY_ARCHIVE_BATCH, HISTORY_ARCHIVE_PATH
+)
+
+try:
+    import zstandard
+except ImportError:  # 未安装zstandard时用gzip
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Windows：单进程开发环境，不需要跨进程文件锁
+    fcntl = None
+
+SEGMENT_PENDING = 0
+SEGMENT_COMMITTED = 1
+
+# 归档的列（与UserContentHistory一致；正文从内容表取出，分段自包含）
+HISTORY_COLUMNS = (
+    "id", "user_session", "original_hash", "optimized_hash", "original_content", "optimized_content",
+    "detected_issues", "applied_optimizations", "content_score_before", "content_score_after", "processing_time",
+    "is_optimized", "created_at"
+)
+
+
+def _compress(data: bytes) -> Tuple[bytes, str]:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(data), "zstd"
+    return gzip.compress(data, compresslevel=6), "gzip"
+
+
+def _decompress(payload: bytes, codec: str) -> bytes:
+    if codec == "gzip":
+        return gzip.decompress(payload)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("归档分段为zstd压缩，需要安装zstandard")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise ValueError(f"未知的归档压缩格式: {codec}")
+
+
+def history_record(row: UserContentHistory, texts: Tuple[str, Optional[str]]) -> Dict:
+    """历史记录转为归档/导出格式：正文取自texts=(原文, 优化后正文)，创建时间为ISO格式字符串"""
+    record = {column: getattr(row, column) for column in HISTORY_COLUMNS}
+    record["original_content"], record["optimized_content"] = texts
+    record["created_at"] = row.created_at.isoformat()
+    return record
+
+
+def _summarize(records: List[Dict]) -> Dict:
+    """分段汇总：逐日检测数、优化数、处理耗时，以及评分提升（与统计接口的口径一致）"""
+    days: Dict[str, Dict] = {}
+    improvement_sum = 0
+    improvement_count = 0
+    for record in records:
+        day = days.setdefault(record["created_at"][:10], {
+            "detections": 0, "optimizations": 0, "processing_time_sum": 0.0, "processing_time_count": 0
+        })
+        day["detections"] += 1
+        day["optimizations"] += record["is_optimized"] or 0
+        if record["processing_time"] is not None:
+            day["processing_time_sum"] += record["processing_time"]
+            day["processing_time_count"] += 1
+        if record["content_score_before"] is not None and record["content_score_after"] is not None:
+            improvement = record["content_score_after"] - record["content_score_before"]
+            if improvement:
+                improvement_sum += improvement
+                improvement_count += 1
+    return {"days": days, "improvement_sum": improvement_sum, "improvement_count": improvement_count}
+
+
+def build_segment(partition: str, records: List[Dict]) -> HistoryArchiveSegment:
+    """把同一月份的一批记录（按id升序）压缩为分段（写入中状态）"""
+    raw = "\n".join(json.dumps(record, ensure_ascii=False) for record in records).encode("utf-8")
+    payload, codec = _compress(raw)
+    created = [record["created_at"] for record in records]
+    return HistoryArchiveSegment(
+        partition=partition,
+        status=SEGMENT_PENDING,
+        codec=codec,
+        row_count=len(records),
+        optimized_count=sum(record["is_optimized"] or 0 for record in records),
+        first_id=records[0]["id"],
+        last_id=records[-1]["id"],
+        start_at=datetime.fromisoformat(min(created)),
+        end_at=datetime.fromisoformat(max(created)),
+        summary=json.dumps(_summarize(records), ensure_ascii=False),
+        raw_bytes=len(raw),
+        payload=payload
+    )
+
+
+class HistoryArchive:
+    """历史归档库（独立的SQLite文件，首次使用时建表）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._engine = None
+        self._session_factory: Optional[Callable[[], Session]] = None
+
+    def configure(self, path: str):
+        """切换归档库文件（基准测试等使用临时文件）"""
+        with self._lock:
+            if self._engine is not None:
+                self._engine.dispose()
+            self.path = path
+            self._engine = None
+            self._session_factory = None
+
+    def session(self) -> Session:
+        with self._lock:
+            if self._engine is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._engine = create_engine(
+                    f"sqlite:///{self.path}", connect_args={"check_same_thread": False}
+                )
+                ArchiveBase.metadata.create_all(bind=self._engine)
+                self._session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self._engine)
+            return self._session_factory()
+
+    def _committed(self, db: Session, start: Optional[datetime], end: Optional[datetime]):
+        query = db.query(HistoryArchiveSegment).filter(HistoryArchiveSegment.status == SEGMENT_COMMITTED)
+        if start is not None:
+            query = query.filter(HistoryArchiveSegment.end_at >= start)
+        if end is not None:
+            query = query.filter(HistoryArchiveSegment.start_at < end)
+        return query
+
+    def summaries(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict]:
+        """已完成分段的汇总（只读汇总列，不读取压缩数据）"""
+        db = self.session()
+        try:
+            rows = self._committed(db, start, end).with_entities(HistoryArchiveSegment.summary).all()
+        finally:
+            db.close()
+        return [json.loads(row.summary) for row in rows if row.summary]
+
+    def totals(self) -> Dict:
+        """归档中的检测数、优化数和评分提升合计"""
+        db = self.session()
+        try:
+            row_count, optimized_count = self._committed(db, None, None).with_entities(
+                func.coalesce(func.sum(HistoryArchiveSegment.row_count), 0),
+                func.coalesce(func.sum(HistoryArchiveSegment.optimized_count), 0)
+            ).one()
+        finally:
+            db.close()
+        summaries = self.summaries()
+        return {
+            "detections": row_count,
+            "optimizations": optimized_count,
+            "improvement_sum": sum(summary["improvement_sum"] for summary in summaries),
+            "improvement_count": sum(summary["improvement_count"] for summary in summaries)
+        }
+
+    def daily_stats(self, start_date: str, end_date: str) -> Dict[str, Dict]:
+        """[start_date, end_date] 内逐日合并的归档汇总（日期为ISO格式字符串）"""
+        start = datetime.fromisoformat(start_date)
+        end = datetime.fromisoformat(end_date) + timedelta(days=1)
+        merged: Dict[str, Dict] = {}
+        for summary in self.summaries(start, end):
+            for date, day in summary["days"].items():
+                if start_date <= date <= end_date:
+                    total = merged.setdefault(date, dict.fromkeys(day, 0))
+                    for key, value in day.items():
+                        total[key] += value
+        return merged
+
+    def iter_rows(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  user_session: Optional[str] = None, newest_first: bool = False) -> Iterator[Dict]:
+        """逐段解压，按创建时间 [start, end) 和会话过滤；分段按时间排序，段内按创建时间排序"""
+        db = self.session()
+        try:
+            order = HistoryArchiveSegment.end_at.desc() if newest_first else HistoryArchiveSegment.start_at
+            segment_ids = [row.id for row in self._committed(db, start, end).with_entities(
+                HistoryArchiveSegment.id
+            ).order_by(order).all()]
+            for segment_id in segment_ids:
+                segment = db.query(HistoryArchiveSegment).filter(HistoryArchiveSegment.id == segment_id).first()
+                lines = _decompress(segment.payload, segment.codec).decode("utf-8").split("\n")
+                db.expunge(segment)
+                records = [json.loads(line) for line in lines if line]
+                records.sort(key=lambda record: (record["created_at"], record["id"]), reverse=newest_first)
+                for record in records:
+                    created_at = datetime.fromisoformat(record["created_at"])
+                    if start is not None and created_at < start:
+                        continue
+                    if end is not None and created_at >= end:
+                        continue
+                    if user_session is not None and record["user_session"] != user_session:
+                        continue
+                    yield record
+        finally:
+            db.close()
+
+    def status(self) -> Dict:
+        """归档概况：各月分区的分段数、记录数、原始/压缩字节数"""
+        db = self.session()
+        try:
+            rows = db.query(
+                HistoryArchiveSegment.partition,
+                func.count(HistoryArchiveSegment.id),
+                func.sum(HistoryArchiveSegment.row_count),
+                func.sum(HistoryArchiveSegment.raw_bytes),
+                func.sum(func.length(HistoryArchiveSegment.payload))
+            ).filter(
+                HistoryArchiveSegment.status == SEGMENT_COMMITTED
+            ).group_by(HistoryArchiveSegment.partition).order_by(HistoryArchiveSegment.partition).all()
+        finally:
+            db.close()
+        partitions = [
+            {"partition": partition, "segments": segments, "rows": count, "raw_bytes": raw, "compressed_bytes": compressed}
+            for partition, segments, count, raw, compressed in rows
+        ]
+        return {
+            "path": self.path,
+            "partitions": partitions,
+            "rows": sum(p["rows"] for p in partitions),
+            "raw_bytes": sum(p["raw_bytes"] for p in partitions),
+            "compressed_bytes": sum(p["compressed_bytes"] for p in partitions)
+        }
+
+
+history_archive = HistoryArchive(HISTORY_ARCHIVE_PATH)
+
+
+class HistoryRetention:
+    """归档任务：把热分区中超过保留天数的记录滚动到归档库"""
+
+    def __init__(self, archive: HistoryArchive, hot_days: int, interval: float, batch_size: int,
+                 session_factory: Optional[Callable[[], Session]] = None):
+        self.archive = archive
+        self.hot_days = hot_days
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _open_session(self) -> Session:
+        if self._session_factory is None:
+            from app.database.connection import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def cutoff(self, now: Optional[datetime] = None) -> datetime:
+        """热分区的起点：早于该时刻创建的记录应归档"""
+        return (now or datetime.utcnow()) - timedelta(days=self.hot_days)
+
+    @contextmanager
+    def _try_lock(self):
+        """进程内锁加跨进程文件锁（非阻塞）：已有进程在归档时返回False，本轮跳过"""
+        if not self._lock.acquire(blocking=False):
+            yield False
+            return
+        try:
+            if fcntl is None:
+                yield True
+                return
+            os.makedirs(os.path.dirname(self.archive.path), exist_ok=True)
+            with open(self.archive.path + ".lock", "a") as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    yield False
+                    return
+                try:
+                    yield True
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            self._lock.release()
+
+    def _recover(self, db: Session, archive_db: Session) -> int:
+        """核对上次中断时遗留的写入中分段：热分区删除已提交则标记完成，否则丢弃（记录仍在热分区）"""
+        pending = archive_db.query(HistoryArchiveSegment).filter(
+            HistoryArchiveSegment.status == SEGMENT_PENDING
+        ).all()
+        for segment in pending:
+            # 同一批记录在一个事务中删除，核对一条即可
+            still_hot = db.query(UserContentHistory.id).filter(UserContentHistory.id == segment.first_id).first()
+            if still_hot:
+                archive_db.delete(segment)
+            else:
+                segment.status = SEGMENT_COMMITTED
+        archive_db.commit()
+        return len(pending)
+
+    def _archive_batch(self, db: Session, archive_db: Session, cutoff: datetime) -> Tuple[int, int]:
+        """归档一批（按id升序最多batch_size条），返回 (记录数, 分段数)"""
+        rows = db.query(UserContentHistory).filter(
+            UserContentHistory.created_at < cutoff
+        ).order_by(UserContentHistory.id).limit(self.batch_size).all()
+        if not rows:
+            return 0, 0
+
+        partitions: Dict[str, List[Dict]] = {}
+        for row, texts in zip(rows, history_texts(db, rows)):
+            partitions.setdefault(row.created_at.strftime("%Y-%m"), []).append(history_record(row, texts))
+        segments = [build_segment(partition, records) for partition, records in partitions.items()]
+        archive_db.add_all(segments)
+        archive_db.commit()
+
+        # 本批是满足条件的记录中id最小的一段，按id范围删除（不逐条绑定参数）
+        db.query(UserContentHistory).filter(
+            UserContentHistory.id >= rows[0].id,
+            UserContentHistory.id <= rows[-1].id,
+            UserContentHistory.created_at < cutoff
+        ).delete(synchronize_session=False)
+        db.commit()
+        db.expunge_all()
+
+        for segment in segments:
+            segment.status = SEGMENT_COMMITTED
+        archive_db.commit()
+        return len(rows), len(segments)
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict:
+        """执行一轮归档，返回归档的记录数和分段数"""
+        if self.hot_days <= 0:
+            return {"archived": 0, "segments": 0, "skipped": "disabled"}
+        with self._try_lock() as acquired:
+            if not acquired:
+                return {"archived": 0, "segments": 0, "skipped": "busy"}
+            cutoff = self.cutoff(now)
+            db = self._open_session()
+            archive_db = self.archive.session()
+            archived = segments = 0
+            try:
+                recovered = self._recover(db, archive_db)
+                while True:
+                    count, segment_count = self._archive_batch(db, archive_db, cutoff)
+                    if count == 0:
+                        break
+                    archived += count
+                    segments += segment_count
+                if archived:
+                    # 归档分段中有正文副本，热分区不再引用的正文可以删除
+                    delete_unreferenced(db)
+            except Exception:
+                db.rollback()
+                archive_db.rollback()
+                raise
+            finally:
+                db.close()
+                archive_db.close()
+        if archived:
+            print(f"✅ 历史记录归档 {archived} 条（{segments} 个分段，早于 {cutoff.isoformat()}）")
+        return {"archived": archived, "segments": segments, "recovered": recovered, "cutoff": cutoff.isoformat()}
+
+    def _run(self):
+        # 首轮在启动后不久执行，之后按间隔执行
+        wait = min(60, self.interval)
+        while not self._stop.wait(wait):
+            wait = self.interval
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"❌ 历史记录归档失败: {e}")
+
+    def start(self):
+        """启动归档线程（每个工作进程各自启动，由文件锁保证只有一个进程在执行）"""
+        if self.hot_days <= 0:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="history-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+history_retention = HistoryRetention(
+    history_archive, HISTORY_HOT_DAYS, HISTORY_ARCHIVE_INTERVAL_S, HISTORY_ARCHIVE_BATCH
+)
@@ -0,0 +1,60 @@
+"""
+HTTP缓存 - 基于目录版本号的ETag/304协商缓存
+"""
+import time
+from typing import Optional
+from fastapi import Request, Response
+
+from app.core.catalog_versions import catalog_versions
+from app.core.metrics import record_cache
+
+# 公开目录：允许浏览器和CDN短时缓存，过期后用ETag重新验证
+PUBLIC_CACHE_CONTROL = "public, max-age=60, must-revalidate"
+# 需要认证的目录：只允许浏览器缓存，每次使用前重新验证
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def catalog_etag(catalog: str, refresh_seconds: Optional[int] = None) -> str:
+    """根据目录版本号生成ETag；refresh_seconds 为不递增版本号的数据（如使用次数）的刷新周期，
+    ETag另按该周期的时间段变化（各进程按同一时钟分段，结果一致）"""
+    token = catalog_versions.token(catalog)
+    if refresh_seconds:
+        token = f"{token}-{int(time.time() // refresh_seconds)}"
+    return f'W/"{token}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """判断If-None-Match是否命中当前ETag（弱比较）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    current = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == current:
+            return True
+    return False
+
+
+def check_catalog_cache(request: Request, response: Response, catalog: str,
+                        cache_control: str = PUBLIC_CACHE_CONTROL,
+                        refresh_seconds: Optional[int] = None) -> Optional[Response]:
+    """设置缓存响应头；客户端缓存仍有效时返回304响应
+
+    版本号在查询数据库之前读取，查询期间发生的变更只会让ETag偏旧，
+    下一次请求会重新获取，不会把新数据标成旧版本。
+    """
+    etag = catalog_etag(catalog, refresh_seconds)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        record_cache("http_etag", True)
+        return Response(status_code=304, headers=headers)
+
+    record_cache("http_etag", False)
+
+    response.headers.update(headers)
+    return None
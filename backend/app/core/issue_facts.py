@@ -0,0 +1,122 @@
+"""
+问题事实表 - 每个检测到的问题另写一行窄记录（词条id、类型、分类、风险等级、日期、会话哈希）
+
+detected_issues 仍以JSON保存在历史记录中供回看；违规统计（某段时间违规最多的词、各分类分布、
+某词的逐日趋势）改在事实表上按索引聚合，不再全表扫描并在Python中解析JSON。
+写入：与历史记录在同一事务中，一次 executemany 批量插入该请求的全部问题；
+词条id按词查询，映射表按目录版本缓存，新词条在版本同步前按单词补查。
+"""
+import hashlib
+import json
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, exists
+from sqlalchemy.orm import Session
+
+from app.models.database import IssueFact, OriginalWord, ProhibitedWord, UserContentHistory
+from app.core.catalog_versions import catalog_versions, CATALOG_PROHIBITED_WORD, CATALOG_HOMOPHONE
+
+# 问题类型编码
+ISSUE_TYPE_CODES = {"prohibited_word": 1, "homophone_word": 2}
+ISSUE_TYPE_NAMES = {code: name for name, code in ISSUE_TYPE_CODES.items()}
+
+# 各问题类型对应的词条表及其目录
+_WORD_SOURCES = {
+    ISSUE_TYPE_CODES["prohibited_word"]: (ProhibitedWord, CATALOG_PROHIBITED_WORD),
+    ISSUE_TYPE_CODES["homophone_word"]: (OriginalWord, CATALOG_HOMOPHONE),
+}
+
+
+def session_hash(user_session: Optional[str]) -> Optional[str]:
+    if not user_session:
+        return None
+    return hashlib.sha256(user_session.encode("utf-8")).hexdigest()[:16]
+
+
+class WordIdResolver:
+    """词 -> 词条id，每种问题类型一张映射表，目录版本变化后重新加载"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._maps: Dict[int, Tuple[int, Dict[str, int]]] = {}
+
+    def resolve(self, db: Session, issue_type: int, word: str) -> Optional[int]:
+        model, catalog = _WORD_SOURCES[issue_type]
+        version = catalog_versions.get(catalog)
+        with self._lock:
+            cached = self._maps.get(issue_type)
+        if cached is None or cached[0] != version:
+            cached = (version, {row.word: row.id for row in db.query(model.id, model.word)})
+            with self._lock:
+                self._maps[issue_type] = cached
+        word_id = cached[1].get(word)
+        if word_id is None:
+            # 其他进程刚新增的词条，本进程的版本号尚未同步
+            row = db.query(model.id).filter(model.word == word).first()
+            if row is not None:
+                word_id = row.id
+                with self._lock:
+                    cached[1][word] = word_id
+        return word_id
+
+
+word_id_resolver = WordIdResolver()
+
+
+def issue_fact_rows(db: Session, issues: List[Dict], history_id: Optional[int], user_session: Optional[str],
+                    day: date) -> List[Dict]:
+    """把检测结果转为事实表行（不属于统计范围的问题类型忽略）"""
+    hashed = session_hash(user_session)
+    rows = []
+    for issue in issues:
+        issue_type = ISSUE_TYPE_CODES.get(issue.get("type"))
+        if issue_type is None:
+            continue
+        # 变形写法按其对应的词条统计
+        word = issue.get("original_word") or issue["word"]
+        rows.append({
+            "history_id": history_id,
+            "day": day,
+            "issue_type": issue_type,
+            "word_id": word_id_resolver.resolve(db, issue_type, word),
+            "category": issue.get("category"),
+            "risk_level": issue.get("risk_level", 1),
+            "session_hash": hashed,
+        })
+    return rows
+
+
+def record_issue_facts(db: Session, issues: List[Dict], history_id: Optional[int], user_session: Optional[str],
+                       created_at: Optional[datetime] = None) -> int:
+    """在当前事务中批量写入问题事实（由调用方提交），返回写入行数"""
+    rows = issue_fact_rows(db, issues, history_id, user_session, (created_at or datetime.utcnow()).date())
+    if rows:
+        db.execute(insert(IssueFact), rows)
+    return len(rows)
+
+
+def backfill_issue_facts(db: Session, batch_size: int = 1000) -> int:
+    """为尚无事实行的历史记录（事实表上线前的记录）补写事实，按批提交，返回写入行数"""
+    written = 0
+    last_id = 0
+    while True:
+        histories = db.query(
+            UserContentHistory.id, UserContentHistory.user_session,
+            UserContentHistory.detected_issues, UserContentHistory.created_at
+        ).filter(
+            UserContentHistory.id > last_id,
+            UserContentHistory.detected_issues.isnot(None),
+            ~exists().where(IssueFact.history_id == UserContentHistory.id)
+        ).order_by(UserContentHistory.id).limit(batch_size).all()
+        if not histories:
+            return written
+        for history in histories:
+            try:
+                issues = json.loads(history.detected_issues)
+            except ValueError:
+                continue
+            written += record_issue_facts(db, issues, history.id, history.user_session, history.created_at)
+        db.commit()
+        last_id = histories[-1].id
@@ -0,0 +1,400 @@
+"""
+词库制品 - 把违禁词、白名单、谐音替换和表情数据编译为一个版本化的二进制文件，各进程内存映射打开
+
+编译：从数据库读取词库，预先完成规范化、拼音键和两个Aho-Corasick自动机的构建，写成ArtifactFile；
+打开：只映射文件、读取元数据，词条和自动机数组按需访问，冷启动不再解析词库；
+更新：重新编译后原子替换文件，各进程在下次取用时发现文件已变化，自动重新映射；
+      制品记录编译时的目录版本号，其他进程轮询发现版本变化而制品尚未更新时（写入方编译失败或已退出）由其补编。
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.database import (
+    ProhibitedWord, WhitelistPattern, OriginalWord, HomophoneReplacement, XiaohongshuEmoji
+)
+from app.core.artifact_file import ArtifactFile, ArtifactFormatError, ArtifactWriter
+from app.core.algorithms.fuzzy_matcher import FuzzyMatcher
+from app.core.algorithms.lexicon_matcher import FlatLexiconMatcher, LexiconMatcher
+from app.core.algorithms.lexicon_prefilter import LexiconPrefilter
+from app.core.algorithms.lexicon_store import ProhibitedLexicon, ReplacementTable
+from app.core.algorithms.pinyin_keys import pinyin_key
+from app.core.algorithms.text_normalizer import normalize_word
+from app.core.catalog_versions import (
+    catalog_versions, load_catalog_versions, CATALOG_PROHIBITED_WORD, CATALOG_WHITELIST, CATALOG_HOMOPHONE
+)
+from app.core.config import LEXICON_ARTIFACT_PATH
+
+try:
+    import fcntl
+except ImportError:  # Windows：单进程开发环境，不需要跨进程文件锁
+    fcntl = None
+
+# 词库制品结构版本，结构变化时递增（旧文件自动重新编译）
+LEXICON_FORMAT = 2
+
+# 词库来源表
+SOURCE_TABLES = (ProhibitedWord, WhitelistPattern, OriginalWord, HomophoneReplacement, XiaohongshuEmoji)
+
+# 影响制品内容的目录；表情的使用次数变化频繁且不进入制品，表情增删改由写入方直接重新编译
+LEXICON_CATALOGS = (CATALOG_PROHIBITED_WORD, CATALOG_WHITELIST, CATALOG_HOMOPHONE)
+
+MATCHER_ARRAYS = ("root", "keys", "values", "fail", "output_starts", "outputs")
+HOMOPHONE_ARRAYS = (
+    "group_starts", "type_codes", "priorities", "confidences", "usage_counts", "ids", "alias_probs", "alias_targets"
+)
+
+
+def load_prohibited_words(db: Session) -> ProhibitedLexicon:
+    """加载启用的违禁词"""
+    rows = db.query(
+        ProhibitedWord.word, ProhibitedWord.category, ProhibitedWord.risk_level
+    ).filter(ProhibitedWord.status == 1).all()
+    return ProhibitedLexicon(rows)
+
+
+def load_whitelist_patterns(db: Session) -> Dict[str, List[str]]:
+    """加载启用的白名单模式，按违禁词分组（组内按优先级降序）"""
+    try:
+        patterns = db.query(WhitelistPattern.prohibited_word, WhitelistPattern.pattern).filter(
+            WhitelistPattern.is_active == 1
+        ).order_by(WhitelistPattern.priority.desc()).all()
+
+        whitelist_dict = {}
+        for word, pattern in patterns:
+            whitelist_dict.setdefault(word, []).append(pattern)
+        return whitelist_dict
+    except Exception as e:
+        print(f"加载白名单模式失败: {e}")
+        return {}
+
+
+def load_approved_spellings(db: Session) -> List[str]:
+    """加载谐音词库中已收录的替换写法（优化器推荐的写法不按谐音违禁处理）"""
+    try:
+        rows = db.query(HomophoneReplacement.replacement_word).filter(
+            HomophoneReplacement.status == 1
+        ).all()
+        return sorted({row[0] for row in rows if row[0]})
+    except Exception as e:
+        print(f"加载谐音替换写法失败: {e}")
+        return []
+
+
+def load_homophone_mappings(db: Session) -> ReplacementTable:
+    """加载谐音词映射（按原词分组）"""
+    rows = db.query(
+        OriginalWord.word,
+        HomophoneReplacement.replacement_word,
+        HomophoneReplacement.replacement_type,
+        HomophoneReplacement.priority,
+        HomophoneReplacement.confidence_score,
+        HomophoneReplacement.usage_count,
+        HomophoneReplacement.id
+    ).join(OriginalWord, HomophoneReplacement.original_word_id == OriginalWord.id).filter(
+        HomophoneReplacement.status == 1,
+        OriginalWord.status == 1
+    ).order_by(HomophoneReplacement.original_word_id, HomophoneReplacement.id).all()
+    return ReplacementTable(rows)
+
+
+def load_emoji_data(db: Session) -> Dict:
+    """加载表情数据（结构与EmojiInserter一致）"""
+    from app.core.algorithms.emoji_inserter import EmojiInserter
+    return EmojiInserter(db).emoji_data
+
+
+def source_fingerprint(db: Session) -> str:
+    """来源表指纹（各表行数和最大id），用于启动时发现绕过管理接口新增或删除的词条"""
+    parts = []
+    for model in SOURCE_TABLES:
+        count, max_id = db.query(func.count(model.id), func.max(model.id)).one()
+        parts.append(f"{model.__tablename__}:{count}:{max_id or 0}")
+    return ";".join(parts)
+
+
+def _add_matcher(writer: ArtifactWriter, name: str, matcher: LexiconMatcher):
+    flat = matcher.flatten()
+    writer.add_strings(f"{name}.alphabet", flat["alphabet"])
+    for key in MATCHER_ARRAYS:
+        writer.add_array(f"{name}.{key}", flat[key])
+    writer.add_json(f"{name}.pattern_count", flat["pattern_count"])
+
+
+def _open_matcher(artifact: ArtifactFile, name: str) -> FlatLexiconMatcher:
+    return FlatLexiconMatcher(
+        list(artifact.strings(f"{name}.alphabet")),
+        *(artifact.array(f"{name}.{key}") for key in MATCHER_ARRAYS),
+        pattern_count=artifact.json(f"{name}.pattern_count")
+    )
+
+
+def compile_lexicon(db: Session, path: str) -> Dict:
+    """从数据库编译词库制品并原子写出到path，返回元数据"""
+    start = time.perf_counter()
+    # 先读版本号再读数据：期间若有新的变更，制品记录的版本偏旧，只会多一次重新编译
+    versions = load_catalog_versions(db)
+    prohibited_words = load_prohibited_words(db)
+    normalized_words = [normalize_word(word) for word in prohibited_words.words()]
+    homophone_mappings = load_homophone_mappings(db)
+    whitelist_patterns = load_whitelist_patterns(db)
+    approved_spellings = load_approved_spellings(db)
+
+    writer = ArtifactWriter()
+    columns = prohibited_words.columns()
+    writer.add_strings("prohibited.words", columns["words"])
+    writer.add_json("prohibited.category_labels", columns["category_labels"])
+    writer.add_array("prohibited.category_codes", columns["category_codes"])
+    writer.add_array("prohibited.risk_levels", columns["risk_levels"])
+    writer.add_strings("prohibited.normalized", normalized_words)
+    _add_matcher(writer, "word_matcher", LexiconMatcher(normalized_words))
+    # 谐音索引：词条按无声调拼音建自动机
+    _add_matcher(writer, "pinyin_matcher", LexiconMatcher([pinyin_key(w) or () for w in normalized_words]))
+
+    columns = homophone_mappings.columns()
+    writer.add_strings("homophone.originals", columns["originals"])
+    writer.add_strings("homophone.replacements", columns["replacements"])
+    writer.add_json("homophone.type_labels", columns["type_labels"])
+    for key in HOMOPHONE_ARRAYS:
+        writer.add_array(f"homophone.{key}", columns[key])
+
+    writer.add_json("whitelist_patterns", whitelist_patterns)
+    writer.add_strings("approved_spellings", approved_spellings)
+    writer.add_json("emoji_data", load_emoji_data(db))
+
+    writer.metadata.update({
+        "lexicon_format": LEXICON_FORMAT,
+        "built_at": datetime.utcnow().isoformat(),
+        "source_fingerprint": source_fingerprint(db),
+        "catalog_versions": {catalog: versions.get(catalog, 0) for catalog in LEXICON_CATALOGS},
+        "prohibited_words": len(prohibited_words),
+        "homophone_originals": len(homophone_mappings),
+        "whitelist_words": len(whitelist_patterns),
+        "compile_ms": round((time.perf_counter() - start) * 1000, 1)
+    })
+    writer.write(path)
+    return writer.metadata
+
+
+class CompiledLexicon:
+    """内存映射打开的词库制品（只读，可在线程间共享）"""
+
+    def __init__(self, path: str):
+        artifact = ArtifactFile(path)
+        if artifact.metadata.get("lexicon_format") != LEXICON_FORMAT:
+            raise ArtifactFormatError(f"词库制品结构版本不符: {artifact.metadata.get('lexicon_format')}")
+        self.artifact = artifact
+        self.identity = artifact.identity
+        self.metadata = artifact.metadata
+        # 内容摘要作为词库版本号，内容相同的制品在各进程中版本号一致
+        self.version = artifact.content_hash[:16]
+
+        self.prohibited_words = ProhibitedLexicon.from_columns(
+            artifact.strings("prohibited.words"),
+            artifact.json("prohibited.category_labels"),
+            artifact.array("prohibited.category_codes"),
+            artifact.array("prohibited.risk_levels")
+        )
+        self.normalized_words = artifact.strings("prohibited.normalized")
+        self.word_matcher = _open_matcher(artifact, "word_matcher")
+        self.pinyin_matcher = _open_matcher(artifact, "pinyin_matcher")
+        self.homophone_mappings = ReplacementTable.from_columns(
+            artifact.strings("homophone.originals"),
+            artifact.array("homophone.group_starts"),
+            artifact.strings("homophone.replacements"),
+            artifact.json("homophone.type_labels"),
+            artifact.array("homophone.type_codes"),
+            artifact.array("homophone.priorities"),
+            artifact.array("homophone.confidences"),
+            artifact.array("homophone.usage_counts"),
+            artifact.array("homophone.ids"),
+            artifact.array("homophone.alias_probs"),
+            artifact.array("homophone.alias_targets")
+        )
+
+        # 以下数据首次使用时才解码
+        self._whitelist_patterns = None
+        self._approved_spellings = None
+        self._emoji_data = None
+        self._fuzzy_matchers: Dict[int, FuzzyMatcher] = {}
+        self._prefilters: Dict[Optional[int], LexiconPrefilter] = {}
+
+    @property
+    def whitelist_patterns(self) -> Dict[str, List[str]]:
+        if self._whitelist_patterns is None:
+            self._whitelist_patterns = self.artifact.json("whitelist_patterns")
+        return self._whitelist_patterns
+
+    @property
+    def approved_spellings(self) -> List[str]:
+        if self._approved_spellings is None:
+            self._approved_spellings = list(self.artifact.strings("approved_spellings"))
+        return self._approved_spellings
+
+    @property
+    def emoji_data(self) -> Dict:
+        if self._emoji_data is None:
+            self._emoji_data = self.artifact.json("emoji_data")
+        return self._emoji_data
+
+    def fuzzy_matcher(self, min_length: int) -> FuzzyMatcher:
+        """近似匹配索引（删除邻域哈希表不适合映射存放，首次使用时在进程内构建）"""
+        matcher = self._fuzzy_matchers.get(min_length)
+        if matcher is None:
+            matcher = FuzzyMatcher(self.normalized_words, min_length)
+            self._fuzzy_matchers[min_length] = matcher
+        return matcher
+
+    def prefilter(self, fuzzy_min_length: Optional[int] = None) -> LexiconPrefilter:
+        """干净内容的预筛索引（首次使用时在进程内构建）；fuzzy_min_length 为None表示未启用近似匹配"""
+        prefilter = self._prefilters.get(fuzzy_min_length)
+        if prefilter is None:
+            prefilter = LexiconPrefilter(self.normalized_words, self.homophone_mappings, fuzzy_min_length)
+            self._prefilters[fuzzy_min_length] = prefilter
+        return prefilter
+
+
+def _is_stale(lexicon: CompiledLexicon, versions: Dict[str, int]) -> bool:
+    """制品编译时记录的目录版本落后于数据库"""
+    compiled = lexicon.metadata.get("catalog_versions", {})
+    return any(versions.get(catalog, 0) > compiled.get(catalog, 0) for catalog in LEXICON_CATALOGS)
+
+
+def _file_identity(path: str):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class LexiconArtifactStore:
+    """进程内的词库制品入口：按需打开，文件被替换后自动重新映射，缺失或损坏时从数据库编译"""
+
+    def __init__(self, path: str, session_factory: Optional[Callable[[], Session]] = None):
+        self.path = path
+        self._session_factory = session_factory
+        self._lock = threading.RLock()
+        self._lexicon: Optional[CompiledLexicon] = None
+
+    def configure(self, path: str = None, session_factory: Callable[[], Session] = None):
+        """切换制品路径或数据库（基准测试等场景）"""
+        with self._lock:
+            if path:
+                self.path = path
+            if session_factory:
+                self._session_factory = session_factory
+            self._lexicon = None
+
+    def _open_session(self) -> Session:
+        if self._session_factory is None:
+            from app.database.connection import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    @contextmanager
+    def _build_lock(self):
+        """进程内锁加跨进程文件锁：同一时刻只有一个进程在编译"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.path + ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _mapped(self) -> Optional[CompiledLexicon]:
+        """已映射的制品（文件被替换则重新映射）；文件缺失或损坏时返回None"""
+        lexicon = self._lexicon
+        if lexicon is not None and lexicon.identity == _file_identity(self.path):
+            return lexicon
+        with self._lock:
+            lexicon = self._lexicon
+            if lexicon is not None and lexicon.identity == _file_identity(self.path):
+                return lexicon
+            try:
+                self._lexicon = CompiledLexicon(self.path)
+            except (OSError, ArtifactFormatError) as e:
+                print(f"词库制品不可用: {e}")
+                return None
+            return self._lexicon
+
+    def _compile(self) -> CompiledLexicon:
+        """从数据库编译并切换（调用方持有编译锁）"""
+        db = self._open_session()
+        try:
+            compile_lexicon(db, self.path)
+        finally:
+            db.close()
+        self._lexicon = CompiledLexicon(self.path)
+        return self._lexicon
+
+    def current(self) -> CompiledLexicon:
+        """当前词库；每次取用比对文件身份（一次stat），文件被替换则重新映射"""
+        lexicon = self._mapped()
+        return lexicon if lexicon is not None else self.rebuild()
+
+    def rebuild(self) -> CompiledLexicon:
+        """从数据库重新编译并切换到新制品"""
+        with self._build_lock():
+            return self._compile()
+
+    def refresh(self, versions: Dict[str, int]) -> CompiledLexicon:
+        """目录版本变化时调用：制品已包含这些版本则只需（重新）映射，否则重新编译；
+        多个进程同时发现时，只有先拿到文件锁的进程编译，其余进程等待后直接映射新文件"""
+        lexicon = self._mapped()
+        if lexicon is not None and not _is_stale(lexicon, versions):
+            return lexicon
+        with self._build_lock():
+            lexicon = self._mapped()
+            if lexicon is not None and not _is_stale(lexicon, versions):
+                return lexicon
+            return self._compile()
+
+    def ensure_fresh(self) -> CompiledLexicon:
+        """启动时调用：制品缺失、不可读或来源表指纹不一致时重新编译，否则直接映射（已映射且文件未变时沿用）"""
+        with self._build_lock():
+            lexicon = self._mapped()
+            if lexicon is None:
+                return self._compile()
+            db = self._open_session()
+            try:
+                fingerprint = source_fingerprint(db)
+            finally:
+                db.close()
+            if lexicon.metadata.get("source_fingerprint") != fingerprint:
+                return self._compile()
+            return lexicon
+
+
+lexicon_artifacts = LexiconArtifactStore(LEXICON_ARTIFACT_PATH)
+
+
+def rebuild_lexicon_artifact() -> bool:
+    """词库数据变更后重新编译制品；失败时保留旧制品继续服务"""
+    try:
+        lexicon_artifacts.rebuild()
+        return True
+    except Exception as e:
+        print(f"重新编译词库制品失败: {e}")
+        return False
+
+
+def _on_catalog_change(versions: Dict[str, int]):
+    """其他进程修改了词库：确保制品已包含新版本（通常写入方已重新编译，这里只需重新映射）"""
+    previous = lexicon_artifacts.current().version
+    lexicon = lexicon_artifacts.refresh(versions)
+    if lexicon.version != previous:
+        print(f"✅ 词库制品已同步: 版本 {lexicon.version}")
+
+
+catalog_versions.add_listener(_on_catalog_change)
@@ -0,0 +1,319 @@
+"""
+词库变更影响预览 - 在最近的历史笔记上回放一个候选变更（新增/删除违禁词、新增/删除白名单模式），
+统计会新增或消除多少笔记的该词违规，并给出示例
+
+只有被变更的那个词条的结果会变化，因此不对每篇笔记做完整检测：
+1. 切分：笔记的规范化文本和逐字拼音串按历史记录id和原文哈希缓存，只读取未缓存笔记的正文，分块流式读取并并行计算；
+2. 预筛：在缓存上用字符串查找（C实现）筛出可能命中该词的笔记，与自动机结果相比只多不少；
+3. 评估：仅对预筛命中的笔记重新读取正文，用只含该词的候选词库分别按变更前后做匹配、白名单和上下文分析，分块并行。
+"""
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import desc, func, select
+from sqlalchemy.orm import Session
+
+from app.core.algorithms.fuzzy_matcher import FuzzyMatcher
+from app.core.algorithms.parsed_document import ParsedDocument
+from app.core.algorithms.pinyin_keys import pinyin_key
+from app.core.algorithms.smart_prohibited_detector import SmartProhibitedDetector
+from app.core.algorithms.text_normalizer import normalize_word
+from app.core.metrics import untracked_stages
+from app.models.database import ContentBlob, UserContentHistory
+from app.core.config import (
+    FUZZY_MATCH_ENABLED, FUZZY_MATCH_MIN_LENGTH, IMPACT_PREVIEW_WORKERS, IMPACT_PREVIEW_CACHE_NOTES
+)
+
+# 每个并行任务处理的笔记数
+CHUNK_SIZE = 2000
+# 拼音串中的音节分隔符（音节只含小写字母）
+SYLLABLE_SEPARATOR = "|"
+
+
+class SinglePatternMatcher:
+    """只有一个模式的匹配器，接口同LexiconMatcher（含重叠命中）：
+    文本直接用str.find，音节序列先以分隔符拼接再查找，比逐元素走自动机快一个数量级"""
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self._joined = (
+            f"{SYLLABLE_SEPARATOR}{SYLLABLE_SEPARATOR.join(pattern)}{SYLLABLE_SEPARATOR}"
+            if pattern and not isinstance(pattern, str) else None
+        )
+
+    def find_all(self, text) -> List[Tuple[int, int, int]]:
+        if not self.pattern:
+            return []
+        length = len(self.pattern)
+        if isinstance(text, str):
+            matches = []
+            position = text.find(self.pattern)
+            while position != -1:
+                matches.append((position, position + length, 0))
+                position = text.find(self.pattern, position + 1)
+            return matches
+        if self._joined is None:
+            return []
+        joined = f"{SYLLABLE_SEPARATOR}{SYLLABLE_SEPARATOR.join(text)}{SYLLABLE_SEPARATOR}"
+        matches = []
+        position = joined.find(self._joined)
+        while position != -1:
+            # 命中前的分隔符个数即起始音节下标
+            start = joined.count(SYLLABLE_SEPARATOR, 0, position)
+            matches.append((start, start + length, 0))
+            position = joined.find(self._joined, position + 1)
+        return matches
+
+
+class CandidateLexicon:
+    """只含一个词条的词库，接口与编译制品相同，供检测器按变更前/后的白名单评估该词"""
+
+    def __init__(self, word_info: Dict, whitelist: List[str], approved_spellings: List[str]):
+        normalized = normalize_word(word_info["word"])
+        self.prohibited_words = [word_info]
+        self.normalized_words = [normalized]
+        self.whitelist_patterns = {word_info["word"]: whitelist} if whitelist else {}
+        self.approved_spellings = approved_spellings
+        self.word_matcher = SinglePatternMatcher(normalized)
+        self.pinyin_matcher = SinglePatternMatcher(pinyin_key(normalized))
+
+    def fuzzy_matcher(self, min_length: int) -> FuzzyMatcher:
+        return FuzzyMatcher(self.normalized_words, min_length)
+
+
+def segment(content: str) -> Tuple[str, str]:
+    """规范化文本和逐字拼音串（音节以分隔符连接，首尾也加分隔符，便于整音节查找）"""
+    doc = ParsedDocument(content)
+    syllables = SYLLABLE_SEPARATOR.join(doc.pinyin)
+    return doc.normalized.text, f"{SYLLABLE_SEPARATOR}{syllables}{SYLLABLE_SEPARATOR}"
+
+
+def _segment_chunk(rows: Sequence[Tuple[int, str]]) -> List[Tuple[int, str, str]]:
+    return [(note_id, *segment(content)) for note_id, content in rows]
+
+
+class SegmentationCache:
+    """历史笔记切分结果缓存（LRU，按记录id；同时核对记录的原文哈希，id被复用时不会误用旧结果）
+
+    命中时不必读取正文；尚未迁移到内容表的旧记录没有原文哈希，不缓存。
+    """
+
+    def __init__(self, max_notes: int):
+        self.max_notes = max_notes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Tuple[str, str, str]]" = OrderedDict()
+
+    def get(self, note_id: int, digest: Optional[str]) -> Optional[Tuple[str, str]]:
+        if digest is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(note_id)
+            if entry is None or entry[0] != digest:
+                return None
+            self._entries.move_to_end(note_id)
+            return entry[1], entry[2]
+
+    def put(self, note_id: int, digest: Optional[str], text: str, syllables: str):
+        if self.max_notes <= 0 or digest is None:
+            return
+        with self._lock:
+            self._entries[note_id] = (digest, text, syllables)
+            self._entries.move_to_end(note_id)
+            while len(self._entries) > self.max_notes:
+                self._entries.popitem(last=False)
+
+
+segmentation_cache = SegmentationCache(IMPACT_PREVIEW_CACHE_NOTES)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """并行评估用的进程池（首次使用时创建；spawn方式启动，不继承服务进程中的线程和连接）"""
+    global _pool
+    if IMPACT_PREVIEW_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=IMPACT_PREVIEW_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown_pool():
+    """关闭进程池（应用退出时调用）"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _map_batches(func, spec, batches: Iterable[List], parallel: bool) -> Iterator:
+    """逐块执行func(spec, batch)并依次产出结果；parallel且有进程池时提交到进程池，
+    同时在途的块不超过进程数（读取下一块与计算重叠，正文不会全部堆积在内存中），否则在当前线程依次执行"""
+    pool = _get_pool() if parallel else None
+    if pool is None:
+        for batch in batches:
+            yield from func(spec, batch)
+        return
+    pending = deque()
+    for batch in batches:
+        pending.append(pool.submit(func, spec, batch))
+        if len(pending) >= IMPACT_PREVIEW_WORKERS:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+def _read_contents(db: Session, note_ids: Sequence[int]) -> Iterator[List[Tuple[int, str]]]:
+    """按块读取历史笔记原文 (id, 原文)，每块一次查询、流式取回"""
+    for i in range(0, len(note_ids), CHUNK_SIZE):
+        stmt = select(
+            UserContentHistory.id,
+            func.coalesce(ContentBlob.content, UserContentHistory.original_content)
+        ).outerjoin(
+            ContentBlob, ContentBlob.hash == UserContentHistory.original_hash
+        ).where(
+            UserContentHistory.id.in_(note_ids[i:i + CHUNK_SIZE])
+        ).execution_options(yield_per=CHUNK_SIZE)
+        yield [(note_id, content) for note_id, content in db.execute(stmt)]
+
+
+def _segment_task(spec, rows):
+    return _segment_chunk(rows)
+
+
+def _prefilter(word: str, texts: List[Tuple[int, str, str]]) -> List[int]:
+    """可能命中该词的笔记id（字面、谐音、近似匹配的必要条件）"""
+    normalized = normalize_word(word)
+    key = pinyin_key(normalized)
+    syllables = f"{SYLLABLE_SEPARATOR}{SYLLABLE_SEPARATOR.join(key)}{SYLLABLE_SEPARATOR}" if key else None
+    # 近似匹配（编辑距离1）的命中片段至少包含该词除一个字以外的全部字
+    fuzzy_chars = None
+    if FUZZY_MATCH_ENABLED and len(normalized) >= max(FUZZY_MATCH_MIN_LENGTH, 4):
+        fuzzy_chars = set(normalized)
+
+    note_ids = []
+    for note_id, text, note_syllables in texts:
+        if normalized in text or (syllables is not None and syllables in note_syllables):
+            note_ids.append(note_id)
+        elif fuzzy_chars is not None and sum(char in text for char in fuzzy_chars) >= len(fuzzy_chars) - 1:
+            note_ids.append(note_id)
+    return note_ids
+
+
+def _compact_issue(issue: Dict) -> Dict:
+    return {
+        "word": issue["word"],
+        "start_pos": issue["start_pos"],
+        "end_pos": issue["end_pos"],
+        "severity": issue["severity"],
+        "context": issue["context"],
+    }
+
+
+def _detector(word_info: Dict, whitelist: Optional[List[str]], approved_spellings: List[str]):
+    if whitelist is None:
+        return None
+    return SmartProhibitedDetector(None, lexicon=CandidateLexicon(word_info, whitelist, approved_spellings))
+
+
+def _evaluate_task(spec: Dict, rows: Sequence[Tuple[int, str]]) -> List[Tuple[int, List[Dict], List[Dict]]]:
+    """按变更前后分别评估该词，返回结果有差异的笔记 (id, 变更前问题, 变更后问题)"""
+    before = _detector(spec["word_info"], spec["whitelist_before"], spec["approved_spellings"])
+    after = _detector(spec["word_info"], spec["whitelist_after"], spec["approved_spellings"])
+
+    def evaluate(detector, doc: ParsedDocument, matches) -> List[Dict]:
+        if detector is None:
+            return []
+        return [_compact_issue(issue) for issue in detector.evaluate_matches(doc.content, matches, doc)]
+
+    # 两个候选词库的词条相同、只有白名单不同，匹配结果可以共用
+    matcher = before or after
+    changed = []
+    with untracked_stages():
+        for note_id, content in rows:
+            doc = ParsedDocument(content)
+            matches = matcher.find_word_matches(content, doc)
+            issues_before = evaluate(before, doc, matches)
+            issues_after = evaluate(after, doc, matches)
+            if issues_before != issues_after:
+                changed.append((note_id, issues_before, issues_after))
+    return changed
+
+
+def preview_impact(db: Session, limit: int, word_info: Dict,
+                   whitelist_before: Optional[List[str]], whitelist_after: Optional[List[str]],
+                   approved_spellings: List[str], sample_size: int = 5) -> Dict:
+    """在最近limit条历史笔记上回放对词条word_info的变更（同步执行，调用方放到线程池中）
+
+    whitelist_before/whitelist_after 为变更前/后该词的白名单模式，None 表示该词不在词库中（新增前/删除后）。
+    """
+    start = time.perf_counter()
+    # 只取记录id、原文哈希和创建时间，流式读取；正文只读取未缓存的笔记
+    stmt = select(
+        UserContentHistory.id, UserContentHistory.original_hash, UserContentHistory.created_at
+    ).order_by(desc(UserContentHistory.id)).limit(limit).execution_options(yield_per=CHUNK_SIZE)
+
+    # 1. 切分（优先取缓存）
+    created, digests = {}, {}
+    texts, missing = [], []
+    for note_id, digest, created_at in db.execute(stmt):
+        created[note_id] = created_at
+        cached = segmentation_cache.get(note_id, digest)
+        if cached is None:
+            digests[note_id] = digest
+            missing.append(note_id)
+        else:
+            texts.append((note_id, *cached))
+    segmented = _map_batches(_segment_task, None, _read_contents(db, missing), len(missing) > CHUNK_SIZE)
+    for note_id, text, syllables in segmented:
+        segmentation_cache.put(note_id, digests[note_id], text, syllables)
+        texts.append((note_id, text, syllables))
+    segmented_at = time.perf_counter()
+
+    # 2. 预筛
+    candidates = _prefilter(word_info["word"], texts)
+
+    # 3. 评估
+    spec = {
+        "word_info": word_info,
+        "whitelist_before": whitelist_before,
+        "whitelist_after": whitelist_after,
+        "approved_spellings": approved_spellings,
+    }
+    changed = list(_map_batches(_evaluate_task, spec, _read_contents(db, candidates), len(candidates) > CHUNK_SIZE))
+    changed.sort(key=lambda item: item[0], reverse=True)
+
+    flagged = sum(1 for _, before, after in changed if not before and after)
+    unflagged = sum(1 for _, before, after in changed if before and not after)
+    samples = []
+    for note_id, before, after in changed[:sample_size]:
+        created_at = created[note_id]
+        samples.append({
+            "history_id": note_id,
+            "created_at": created_at.isoformat() if created_at else None,
+            "change": "flagged" if not before else ("unflagged" if not after else "changed"),
+            "before": before,
+            "after": after,
+        })
+
+    return {
+        "notes_scanned": len(created),
+        "notes_matched": len(candidates),
+        "notes_changed": len(changed),
+        "flagged": flagged,
+        "unflagged": unflagged,
+        "issue_delta": sum(len(after) - len(before) for _, before, after in changed),
+        "samples": samples,
+        "segmentation_cache_hits": len(created) - len(missing),
+        "segmentation_ms": round((segmented_at - start) * 1000, 1),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
@@ -0,0 +1,345 @@
+"""
+运行指标 - 分阶段耗时直方图与计数器，按Prometheus文本格式导出
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core.profiling import current_profile
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+DB_QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    """格式化标签（转义反斜杠、引号和换行）"""
+    parts = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    """格式化数值"""
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """单调递增计数器"""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        """计数增加"""
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        """导出为Prometheus文本行"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """可增可减的即时值"""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self) -> List[str]:
+        """导出为Prometheus文本行"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """分桶直方图"""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签: [各桶计数..., 总和, 总数]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        """记录一次观测值"""
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0] * (len(self.buckets) + 2)
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self) -> List[str]:
+        """导出为Prometheus文本行"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            for i, bound in enumerate(self.buckets):
+                le = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {_format_value(state[i])}")
+            le = _format_labels(self.label_names, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {_format_value(state[-1])}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(state[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: List = []
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        metric = Gauge(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """导出全部指标"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_LATENCY = registry.histogram(
+    "content_pipeline_stage_seconds",
+    "Latency of each analysis pipeline stage per request",
+    ["stage"]
+)
+REQUEST_LATENCY = registry.histogram(
+    "content_request_seconds",
+    "End-to-end latency of content processing requests",
+    ["endpoint"]
+)
+CLEAN_REQUEST_LATENCY = registry.histogram(
+    "content_clean_request_seconds",
+    "End-to-end latency of content processing requests whose text the prefilter proved clean",
+    ["endpoint"]
+)
+REQUESTS_TOTAL = registry.counter(
+    "content_requests_total",
+    "Content processing requests",
+    ["endpoint", "status"]
+)
+ISSUES_FOUND_TOTAL = registry.counter(
+    "content_issues_found_total",
+    "Issues reported by content analysis",
+    ["type"]
+)
+PREFILTER_TOTAL = registry.counter(
+    "content_prefilter_total",
+    "Lexicon prefilter results (clean: no possible match, analysis short-circuited)",
+    ["result"]
+)
+CACHE_REQUESTS_TOTAL = registry.counter(
+    "cache_requests_total",
+    "Cache lookups by cache name and result",
+    ["cache", "result"]
+)
+DB_QUERIES_PER_REQUEST = registry.histogram(
+    "content_db_queries_per_request",
+    "Database queries issued per content processing request",
+    ["endpoint"],
+    buckets=DB_QUERY_BUCKETS
+)
+STARTUP_PHASE_SECONDS = registry.gauge(
+    "app_startup_phase_seconds",
+    "Duration of each startup phase (including background warm-up)",
+    ["phase"]
+)
+
+
+class RequestMetrics:
+    """单次请求内的指标收集（同一阶段多次进入时累加耗时）"""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.stage_durations: Dict[str, float] = {}
+        self.db_queries = 0
+        # 请求内每次分析都经预筛判定为干净时为True（未经预筛为None）
+        self.clean: Optional[bool] = None
+
+    def add_stage_time(self, stage: str, seconds: float):
+        self.stage_durations[stage] = self.stage_durations.get(stage, 0.0) + seconds
+
+
+_current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request_metrics", default=None)
+
+
+@contextmanager
+def track_stage(stage: str):
+    """记录流水线阶段耗时；在请求内累加到该请求，否则直接记入直方图
+
+    调试模式下同时记入请求的耗时树。
+    """
+    profile = current_profile()
+    node = profile.push(stage) if profile is not None else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if node is not None:
+            profile.pop(node, elapsed)
+        current = _current_request.get()
+        if current is not None:
+            current.add_stage_time(stage, elapsed)
+        else:
+            STAGE_LATENCY.observe(elapsed, stage=stage)
+
+
+@contextmanager
+def untracked_stages():
+    """批量离线执行流水线（如词库影响预览）时，阶段耗时不记入请求直方图"""
+    token = _current_request.set(RequestMetrics("untracked"))
+    try:
+        yield
+    finally:
+        _current_request.reset(token)
+
+
+@contextmanager
+def track_request(endpoint: str):
+    """收集一次内容处理请求的指标"""
+    current = RequestMetrics(endpoint)
+    token = _current_request.set(current)
+    start = time.perf_counter()
+    status = "error"
+    try:
+        yield current
+        status = "ok"
+    finally:
+        _current_request.reset(token)
+        elapsed = time.perf_counter() - start
+        REQUEST_LATENCY.observe(elapsed, endpoint=endpoint)
+        if current.clean:
+            CLEAN_REQUEST_LATENCY.observe(elapsed, endpoint=endpoint)
+        REQUESTS_TOTAL.inc(endpoint=endpoint, status=status)
+        DB_QUERIES_PER_REQUEST.observe(current.db_queries, endpoint=endpoint)
+        for stage, seconds in current.stage_durations.items():
+            STAGE_LATENCY.observe(seconds, stage=stage)
+
+
+def record_issues(issues: List[Dict]):
+    """按类型统计检测到的问题数"""
+    counts: Dict[str, int] = {}
+    for issue in issues:
+        issue_type = issue.get("type", "unknown")
+        counts[issue_type] = counts.get(issue_type, 0) + 1
+    for issue_type, count in counts.items():
+        ISSUES_FOUND_TOTAL.inc(count, type=issue_type)
+
+
+def record_prefilter(clean: bool):
+    """记录预筛结果；干净内容请求的延迟另外记入 content_clean_request_seconds"""
+    PREFILTER_TOTAL.inc(result="clean" if clean else "candidate")
+    current = _current_request.get()
+    if current is not None:
+        current.clean = clean and current.clean is not False
+
+
+def record_cache(cache: str, hit: bool):
+    """记录缓存命中/未命中"""
+    CACHE_REQUESTS_TOTAL.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def instrument_engine(engine):
+    """在数据库引擎上统计每个请求发出的查询数（调试模式下记录每条查询耗时）"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count_query(conn, cursor, statement, parameters, context, executemany):
+        current = _current_request.get()
+        if current is not None:
+            current.db_queries += 1
+        if current_profile() is not None:
+            conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _time_query(conn, cursor, statement, parameters, context, executemany):
+        profile = current_profile()
+        starts = conn.info.get("profile_query_start")
+        if profile is None or not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        summary = " ".join(statement.split())[:100]
+        profile.record(f"db: {summary}", elapsed)
+
+
+def instrumented(endpoint: str):
+    """装饰器：为内容处理接口收集请求级指标"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with track_request(endpoint):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
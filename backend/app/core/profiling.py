@@ -0,0 +1,236 @@
+"""
+请求剖析 - 管理员调试模式下记录分阶段耗时树和采样剖析摘要
+"""
+import asyncio
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, List, Optional, Tuple
+
+# 采样剖析摘要保留的函数条数
+PROFILE_TOP_FUNCTIONS = 25
+# 采样间隔（秒）；请求线程持有GIL时采样线程要等到切换间隔（默认5ms）才能运行，
+# 因此每个样本按距上一次采样的实际时间加权
+PROFILE_SAMPLE_INTERVAL_S = 0.001
+
+
+class TimingNode:
+    """耗时树节点（同名兄弟节点合并，记录调用次数和累计耗时）"""
+
+    __slots__ = ("name", "count", "total", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.children: Dict[str, "TimingNode"] = {}
+
+    def child(self, name: str) -> "TimingNode":
+        node = self.children.get(name)
+        if node is None:
+            node = TimingNode(name)
+            self.children[name] = node
+        return node
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "children": [child.to_dict() for child in self.children.values()]
+        }
+
+
+class StackSampler:
+    """按固定间隔采样请求所在线程的调用栈，只统计本请求的任务正在执行时的样本
+
+    事件循环线程上交替运行多个请求，本请求在await处挂起时线程上执行的是别的任务。
+    采样时从栈顶沿f_back向上查找本请求任务最外层协程的帧：找到才计入，且只统计该帧之上的部分，
+    因此挂起等待的时间、其他请求的代码和事件循环本身都不计入。
+    与确定性的cProfile相比没有调用次数、短函数的耗时是估计值，但不会给每次函数调用加上开销，
+    可以同时剖析多个请求；在进程池中执行的分片检测不在本线程上，只体现在耗时树中。
+    """
+
+    def __init__(self, anchor=None, interval: float = PROFILE_SAMPLE_INTERVAL_S):
+        self._thread_id = threading.get_ident()
+        # 本请求任务最外层协程的帧（不在任务中时为None，统计整个线程）
+        self._anchor = anchor
+        self._interval = interval
+        # (文件, 行号, 函数名) -> [自身耗时, 累计耗时]
+        self._functions: Dict[Tuple[str, int, str], List[float]] = {}
+        self.samples = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profile-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop_event.wait(self._interval):
+            now = time.perf_counter()
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self._sample(frame, now - last)
+            last = now
+
+    def _sample(self, frame, weight: float):
+        """记录一个样本；栈上没有本请求的帧（请求挂起中）时丢弃"""
+        stack = []
+        while frame is not None and frame is not self._anchor:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        if self._anchor is not None and frame is None:
+            return
+        if self._anchor is not None:
+            stack.append(frame.f_code)
+        if not stack:
+            return
+
+        self.samples += 1
+        seen = set()
+        for depth, code in enumerate(stack):
+            key = (code.co_filename, code.co_firstlineno, code.co_name)
+            entry = self._functions.get(key)
+            if entry is None:
+                entry = [0.0, 0.0]
+                self._functions[key] = entry
+            if depth == 0:
+                entry[0] += weight
+            # 递归调用在同一个样本里只计一次累计耗时
+            if key not in seen:
+                seen.add(key)
+                entry[1] += weight
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+
+    def summarize(self) -> List[Dict[str, Any]]:
+        """按累计耗时汇总采样结果"""
+        rows = []
+        for (filename, lineno, func_name), (own, cumulative) in self._functions.items():
+            rows.append({
+                "function": f"{filename}:{lineno}({func_name})",
+                "self_ms": round(own * 1000, 3),
+                "cumulative_ms": round(cumulative * 1000, 3)
+            })
+        rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+        return rows[:PROFILE_TOP_FUNCTIONS]
+
+
+def _task_frame():
+    """当前任务最外层协程的帧；不在任务中时返回None"""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        return None
+    if task is None:
+        return None
+    return getattr(task.get_coro(), "cr_frame", None)
+
+
+class RequestProfile:
+    """单次请求的剖析结果"""
+
+    def __init__(self, enable_sampling: bool = True):
+        self.root = TimingNode("request")
+        self._stack: List[TimingNode] = [self.root]
+        self._start = time.perf_counter()
+        self._sampler = StackSampler(_task_frame()) if enable_sampling else None
+        self._stopped = False
+
+    def push(self, name: str) -> TimingNode:
+        node = self._stack[-1].child(name)
+        self._stack.append(node)
+        return node
+
+    def pop(self, node: TimingNode, elapsed: float):
+        node.count += 1
+        node.total += elapsed
+        if self._stack[-1] is node:
+            self._stack.pop()
+
+    def record(self, name: str, elapsed: float):
+        """记录一个叶子节点"""
+        node = self._stack[-1].child(name)
+        node.count += 1
+        node.total += elapsed
+
+    def stop(self):
+        """停止计时和采样"""
+        if self._stopped:
+            return
+        self._stopped = True
+        self.root.count = 1
+        self.root.total = time.perf_counter() - self._start
+        if self._sampler is not None:
+            self._sampler.stop()
+
+    def report(self) -> Dict[str, Any]:
+        """停止剖析并生成报告"""
+        self.stop()
+        return {
+            "timing": self.root.to_dict(),
+            "profile": self._sampler.summarize() if self._sampler is not None else [],
+            "profile_samples": self._sampler.samples if self._sampler is not None else 0
+        }
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_request_profile", default=None)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    """获取当前请求的剖析对象（未开启调试时为None）"""
+    return _current_profile.get()
+
+
+@contextmanager
+def profile_request(enabled: bool):
+    """在调试模式下剖析一次请求；未开启时不做任何记录"""
+    if not enabled:
+        yield None
+        return
+
+    profile = RequestProfile()
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        profile.stop()
+
+
+@contextmanager
+def trace_span(name: str):
+    """在耗时树中记录一个步骤"""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+
+    node = profile.push(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.pop(node, time.perf_counter() - start)
+
+
+def traced(name: str):
+    """装饰器：将函数调用记录为耗时树中的一个步骤"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with trace_span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
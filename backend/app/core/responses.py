@@ -0,0 +1,83 @@
+"""
+快速JSON响应 - orjson序列化 + 按阈值gzip/brotli压缩
+"""
+import gzip
+import json
+from typing import Any, Optional
+from fastapi import Request, Response
+
+from app.core.config import (
+    RESPONSE_COMPRESSION_MIN_BYTES,
+    RESPONSE_GZIP_LEVEL,
+    RESPONSE_BROTLI_QUALITY,
+)
+
+try:
+    import orjson
+except ImportError:  # 未安装orjson时退回标准库
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # 未安装brotli时只提供gzip
+    brotli = None
+
+
+def dumps_json(content: Any) -> bytes:
+    """序列化为UTF-8 JSON字节串"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _accepted_encodings(accept_encoding: Optional[str]) -> set:
+    """解析Accept-Encoding中可接受的编码"""
+    encodings = set()
+    for item in (accept_encoding or "").split(","):
+        parts = item.strip().split(";")
+        name = parts[0].strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            param = param.strip()
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            encodings.add(name)
+    return encodings
+
+
+def compress_body(body: bytes, accept_encoding: Optional[str]) -> tuple[bytes, Optional[str]]:
+    """按客户端支持的编码压缩响应体，返回 (响应体, Content-Encoding)"""
+    if len(body) < RESPONSE_COMPRESSION_MIN_BYTES:
+        return body, None
+
+    encodings = _accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in encodings:
+        return brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY), "br"
+    if "gzip" in encodings:
+        return gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0), "gzip"
+    return body, None
+
+
+def fast_json_response(request: Request, content: Any, status_code: int = 200) -> Response:
+    """构建快速JSON响应
+
+    content 必须是已经由服务端整理好的dict/list，这里不再经过Pydantic校验。
+    """
+    body, encoding = compress_body(dumps_json(content), request.headers.get("accept-encoding"))
+
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers
+    )
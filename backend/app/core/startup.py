@@ -0,0 +1,116 @@
+"""
+启动管理 - 分阶段记录启动耗时、与预算比较，并在后台预热首次使用时才加载的重型模块；
+多进程部署时在主进程中预加载，工作进程fork后写时复制共享
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.metrics import STARTUP_PHASE_SECONDS
+
+
+class StartupTimer:
+    """启动耗时记录"""
+
+    def __init__(self, budget_ms: int, started_at: Optional[float] = None):
+        self.budget_ms = budget_ms
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+        self.pid = os.getpid()
+
+    def restart_if_forked(self):
+        """预加载后fork的工作进程：导入已在主进程完成，从当前时刻重新计时"""
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.started_at = time.perf_counter()
+            self.phases = []
+
+    def record(self, phase: str, seconds: float):
+        self.phases.append((phase, seconds))
+        STARTUP_PHASE_SECONDS.set(round(seconds, 6), phase=phase)
+
+    @contextmanager
+    def phase(self, name: str):
+        """计时一个启动阶段"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def finish(self) -> float:
+        """启动完成：输出各阶段耗时，超出预算时警告；返回总耗时（毫秒）"""
+        total_ms = (time.perf_counter() - self.started_at) * 1000
+        STARTUP_PHASE_SECONDS.set(round(total_ms / 1000, 6), phase="total")
+        breakdown = "，".join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in self.phases)
+        print(f"⏱️ 启动耗时 {total_ms:.0f}ms（{breakdown}）")
+        if total_ms > self.budget_ms:
+            print(f"⚠️ 启动耗时超出预算 {self.budget_ms}ms")
+        return total_ms
+
+
+def _warm_pinyin():
+    from app.core.algorithms.pinyin_keys import char_pinyin
+    char_pinyin("广")
+
+
+# 首次使用时才加载的重型模块：pypinyin（词典导入约0.15秒）；
+# jieba只在访问解析文档的分词结果时才导入，检测和优化流程都不需要，不预热
+WARMUP_TASKS: Dict[str, Callable[[], None]] = {
+    "pypinyin": _warm_pinyin,
+}
+
+
+def warm_up_in_background(tasks: Dict[str, Callable[[], None]] = None) -> threading.Thread:
+    """在后台线程中依次预热，不阻塞启动；预热完成前到达的请求在首次使用处等待加载"""
+    tasks = WARMUP_TASKS if tasks is None else tasks
+
+    def run():
+        timings = []
+        for name, task in tasks.items():
+            start = time.perf_counter()
+            try:
+                task()
+            except Exception as e:
+                print(f"❌ 预热 {name} 失败: {e}")
+                continue
+            seconds = time.perf_counter() - start
+            STARTUP_PHASE_SECONDS.set(round(seconds, 6), phase=f"warmup_{name}")
+            timings.append(f"{name} {seconds * 1000:.0f}ms")
+        print(f"✅ 后台预热完成（{'，'.join(timings)}）")
+
+    thread = threading.Thread(target=run, name="startup-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def _release_connections():
+    """fork前关闭主进程持有的数据库连接，工作进程各自重新建立"""
+    from app.database.connection import engine
+    engine.dispose()
+
+
+def preload_for_workers():
+    """在主进程中同步完成：必要时初始化数据库、映射词库、加载拼音库；返回词库"""
+    import asyncio
+    from app.database.init_db import init_database, schema_is_current
+    from app.core.lexicon_artifact import lexicon_artifacts
+
+    if not schema_is_current():
+        asyncio.run(init_database())
+    lexicon = lexicon_artifacts.ensure_fresh()
+    for task in WARMUP_TASKS.values():
+        task()
+    _release_connections()
+    return lexicon
+
+
+def reload_lexicon_for_workers():
+    """重载信号：主进程从数据库重新编译词库并切换，之后fork的工作进程直接使用"""
+    from app.core.lexicon_artifact import lexicon_artifacts
+
+    lexicon = lexicon_artifacts.rebuild()
+    _release_connections()
+    return lexicon
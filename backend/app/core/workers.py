@@ -0,0 +1,37 @@
+"""
+gunicorn工作进程 - 在uvicorn工作进程基础上，优雅退出时先排空已接受的连接
+"""
+import asyncio
+import sys
+
+from gunicorn.arbiter import Arbiter
+from uvicorn.server import Server
+from uvicorn.workers import UvicornWorker
+
+# 停止接收新连接后等待的秒数：已被本进程accept、但请求尚未读入的连接在此期间进入处理流程
+SHUTDOWN_DRAIN_SECONDS = 0.5
+
+
+class DrainingServer(Server):
+    """uvicorn在关闭监听后立即关闭尚无请求周期的连接，刚accept的连接会被重置；这里先等待其请求读入"""
+
+    async def shutdown(self, sockets=None):
+        for server in self.servers:
+            server.close()
+        for sock in sockets or []:
+            sock.close()
+        await asyncio.sleep(SHUTDOWN_DRAIN_SECONDS)
+        await super().shutdown()
+
+
+class DrainingUvicornWorker(UvicornWorker):
+    """重载（HUP）或达到max_requests回收时，进行中的请求和已接受的连接都正常完成"""
+
+    async def _serve(self) -> None:
+        # 与 UvicornWorker._serve (uvicorn 0.24) 相同，仅替换Server类
+        self.config.app = self.wsgi
+        server = DrainingServer(config=self.config)
+        self._install_sigquit_handler()
+        await server.serve(sockets=self.sockets)
+        if not server.started:
+            sys.exit(Arbiter.WORKER_BOOT_ERROR)
@@ -3,15 +3,77 @@
 """
 import os
 import json
-from sqlalchemy import text
+from sqlalchemy import inspect, text
 from passlib.context import CryptContext
 
 from app.database.connection import engine, create_database_directory, SessionLocal
-from app.models.database import Base, AdminUser, ProhibitedWord, OriginalWord, HomophoneReplacement
+from app.models.database import Base, AdminUser, ProhibitedWord, OriginalWord, HomophoneReplacement, SystemSetting
+from app.core.catalog_versions import init_catalog_versions
 
 # 密码加密
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# 数据库结构版本：模型或初始化数据变化时递增，生产模式启动时据此判断是否需要建表和初始化
+SCHEMA_VERSION = "6"
+SCHEMA_VERSION_KEY = "schema_version"
+
+
+def schema_is_current() -> bool:
+    """数据库结构是否已是当前版本（一次查询；库或表不存在时视为需要初始化）"""
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(
+                text("SELECT setting_value FROM system_settings WHERE setting_key = :key"),
+                {"key": SCHEMA_VERSION_KEY}
+            ).first()
+    except Exception:
+        return False
+    return row is not None and row[0] == SCHEMA_VERSION
+
+
+def record_schema_version():
+    """记录当前数据库结构版本"""
+    db = SessionLocal()
+    try:
+        setting = db.query(SystemSetting).filter(SystemSetting.setting_key == SCHEMA_VERSION_KEY).first()
+        if setting is None:
+            db.add(SystemSetting(
+                setting_key=SCHEMA_VERSION_KEY,
+                setting_value=SCHEMA_VERSION,
+                description="数据库结构版本",
+                updated_by="system"
+            ))
+        elif setting.setting_value != SCHEMA_VERSION:
+            setting.setting_value = SCHEMA_VERSION
+        db.commit()
+    finally:
+        db.close()
+
+
+def add_missing_columns():
+    """为已存在的表补加模型中新增的列（SQLite只能追加列；新增列须可为空，旧行取NULL）"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable:
+                    raise RuntimeError(f"无法为已有的表 {table.name} 补加非空列 {column.name}")
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                print(f"✅ 补加列 {table.name}.{column.name}")
+
+
+def create_missing_indexes():
+    """为已存在的表补建模型中新增的索引（create_all 只建缺失的表）"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
 
 async def init_database():
     """初始化数据库"""
@@ -19,12 +81,15 @@ async def init_database():
         # 创建数据库目录
         create_database_directory()
         
-        # 创建所有表
+        # 创建所有表，并为已有的表补加新增的列和索引
         Base.metadata.create_all(bind=engine)
+        add_missing_columns()
+        create_missing_indexes()
         
         # 初始化数据
         await init_default_data()
         
+        record_schema_version()
         print("✅ 数据库初始化完成")
     except Exception as e:
         print(f"❌ 数据库初始化失败: {e}")
@@ -129,6 +194,9 @@ async def init_default_data():
             
             print("✅ 初始化基础谐音词库")
         
+        # 目录版本号
+        init_catalog_versions(db)
+        
         db.commit()
         
     except Exception as e:
@@ -1,12 +1,27 @@
 """
 小红书内容优化工具 - FastAPI主应用
 """
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 
-from app.database.init_db import init_database
+from app.database.init_db import init_database, schema_is_current
+from app.database.connection import engine
+from app.core.metrics import registry as metrics_registry, instrument_engine
+from app.core.lexicon_artifact import lexicon_artifacts
+from app.core.catalog_versions import catalog_watcher
+from app.core.lexicon_impact import shutdown_pool as shutdown_impact_pool
+from app.core.chunked_analysis import shutdown_pool as shutdown_chunk_pool
+from app.core.history_archive import history_retention
+from app.core.admission import AdmissionMiddleware, content_admission
+from app.core.config import STARTUP_MODE, STARTUP_BUDGET_MS, STARTUP_WARMUP
+from app.core.startup import StartupTimer, warm_up_in_background
 from app.api.auth import router as auth_router
 from app.api.content import router as content_router
 from app.api.admin import router as admin_router
@@ -15,14 +30,46 @@ from app.api.emoji import router as emoji_router
 from app.api.emoji_recommendation import router as emoji_recommendation_router
 from app.api.whitelist import router as whitelist_router
 
+# 启动耗时从导入本模块开始计算
+startup_timer = StartupTimer(STARTUP_BUDGET_MS, started_at=_IMPORT_STARTED)
+startup_timer.record("imports", time.perf_counter() - _IMPORT_STARTED)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
-    # 启动时初始化数据库
-    await init_database()
+    startup_timer.restart_if_forked()
+    # 启动时初始化数据库（生产模式下结构已是最新则跳过建表和初始化数据）
+    with startup_timer.phase("database"):
+        if STARTUP_MODE == "production" and schema_is_current():
+            print("✅ 数据库结构已是最新，跳过初始化")
+        else:
+            await init_database()
+    # 映射词库制品（缺失或与数据库不一致时重新编译）
+    with startup_timer.phase("lexicon"):
+        try:
+            lexicon = lexicon_artifacts.ensure_fresh()
+            print(f"✅ 词库制品已加载: 版本 {lexicon.version}")
+        except Exception as e:
+            print(f"❌ 词库制品加载失败: {e}")
+    # 同步目录版本号，之后在后台轮询其他工作进程的变更
+    try:
+        catalog_watcher.poll_once()
+    except Exception as e:
+        print(f"❌ 读取目录版本失败: {e}")
+    catalog_watcher.start()
+    # 后台把超过保留天数的历史记录滚动到压缩归档
+    history_retention.start()
+    # pypinyin在首次使用时才加载，这里在后台提前预热
+    if STARTUP_WARMUP:
+        warm_up_in_background()
+    startup_timer.finish()
     yield
     # 关闭时清理资源
+    catalog_watcher.stop()
+    history_retention.stop()
+    shutdown_impact_pool()
+    shutdown_chunk_pool()
 
 
 # 创建FastAPI应用
@@ -33,6 +80,15 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# 统计每个请求的数据库查询数
+instrument_engine(engine)
+
+# 内容分析/优化接口的准入控制（在CORS之内，503响应同样带CORS头）
+app.add_middleware(AdmissionMiddleware, routes={
+    "/api/content/analyze": content_admission,
+    "/api/content/optimize": content_admission,
+})
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -64,6 +120,15 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus指标"""
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
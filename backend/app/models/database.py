@@ -1,7 +1,7 @@
 """
 数据库模型定义
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Float, LargeBinary, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -84,7 +84,10 @@ class UserContentHistory(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_session = Column(String(100))
-    original_content = Column(Text, nullable=False)
+    # 正文存于内容表（content_blobs），这里保存SHA-256；旧记录哈希为空，正文仍在下面两列中（新记录为空串/空）
+    original_hash = Column(String(64), index=True)
+    optimized_hash = Column(String(64), index=True)
+    original_content = Column(Text, nullable=False, default="")
     optimized_content = Column(Text)
     detected_issues = Column(Text)  # JSON格式
     applied_optimizations = Column(Text)  # JSON格式
@@ -92,7 +95,12 @@ class UserContentHistory(Base):
     content_score_after = Column(Integer)
     processing_time = Column(Float)
     is_optimized = Column(Integer, default=0)  # 是否已优化
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        # /optimize 按会话和原文哈希查找最近的分析记录
+        Index("ix_user_content_history_session_hash", "user_session", "original_hash"),
+    )
 
 
 class AdminLog(Base):
@@ -200,4 +208,70 @@ class WhitelistPattern(Base):
     priority = Column(Integer, default=1, comment="优先级")
     created_by = Column(String(50), comment="创建者")
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class CatalogVersion(Base):
+    """目录版本表（与数据变更在同一事务中递增，各进程轮询感知）"""
+    __tablename__ = "catalog_versions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    catalog = Column(String(50), unique=True, nullable=False, comment="目录名称")
+    version = Column(Integer, nullable=False, default=0, comment="版本号（毫秒时间戳起，单调递增）")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ContentBlob(Base):
+    """内容表：笔记正文按SHA-256只存一份（见 app.core.content_store）"""
+    __tablename__ = "content_blobs"
+
+    hash = Column(String(64), primary_key=True)
+    content = Column(Text, nullable=False)
+    length = Column(Integer, nullable=False)
+    submission_count = Column(Integer, nullable=False, default=1, index=True)  # 作为原文提交的次数
+    first_seen_at = Column(DateTime, default=datetime.utcnow)
+    last_seen_at = Column(DateTime, default=datetime.utcnow)
+
+
+class IssueFact(Base):
+    """问题事实表：每个检测到的问题一行（见 app.core.issue_facts），违规统计按索引聚合"""
+    __tablename__ = "issue_facts"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    history_id = Column(Integer, index=True)  # 对应的用户内容历史记录
+    day = Column(Date, nullable=False)  # 检测日期（UTC）
+    issue_type = Column(Integer, nullable=False)  # 1-违禁词, 2-谐音词
+    word_id = Column(Integer)  # 违禁词为prohibited_words.id，谐音词为original_words.id
+    category = Column(String(50))
+    risk_level = Column(Integer, nullable=False)
+    session_hash = Column(String(16))  # 用户会话的SHA-256前16位
+
+    __table_args__ = (
+        # 覆盖索引：按日期范围统计词条/分类/风险等级时不回表
+        Index("ix_issue_facts_day_type_word", "day", "issue_type", "word_id", "category", "risk_level"),
+        Index("ix_issue_facts_word_day", "word_id", "issue_type", "day"),
+    )
+
+
+# 历史归档库（独立的数据库文件，见 app.core.history_archive）
+ArchiveBase = declarative_base()
+
+
+class HistoryArchiveSegment(ArchiveBase):
+    """历史归档分段表：同一月份的一批历史记录压缩为一个分段"""
+    __tablename__ = "history_archive_segments"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    partition = Column(String(7), nullable=False, index=True)  # 月份分区，如 2024-05
+    status = Column(Integer, nullable=False, default=0)  # 0-写入中, 1-已完成
+    codec = Column(String(10), nullable=False)  # zstd 或 gzip
+    row_count = Column(Integer, nullable=False)
+    optimized_count = Column(Integer, nullable=False, default=0)
+    first_id = Column(Integer, nullable=False)  # 原记录id范围
+    last_id = Column(Integer, nullable=False)
+    start_at = Column(DateTime, nullable=False)  # 记录创建时间范围
+    end_at = Column(DateTime, nullable=False)
+    summary = Column(Text)  # JSON格式，逐日汇总（统计接口合并归档数据时不解压）
+    raw_bytes = Column(Integer, nullable=False)
+    payload = Column(LargeBinary, nullable=False)  # 压缩后的JSON Lines
+    created_at = Column(DateTime, default=datetime.utcnow)
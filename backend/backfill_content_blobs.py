@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+迁移历史正文到内容表（旧记录的正文按SHA-256去重存入content_blobs，记录改为引用哈希；可重复执行）
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.connection import SessionLocal, engine
+from app.database.init_db import add_missing_columns, create_missing_indexes
+from app.models.database import Base
+from app.core.content_store import backfill_content_blobs
+
+def main():
+    """主函数"""
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    create_missing_indexes()
+
+    db = SessionLocal()
+    try:
+        migrated = backfill_content_blobs(db)
+    except Exception as e:
+        db.rollback()
+        print(f"迁移历史正文失败: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    print(f"历史正文迁移完成！共迁移 {migrated} 条记录")
+    print("旧列中的正文已清空，SQLite需执行 VACUUM 才会缩小数据库文件")
+
+if __name__ == "__main__":
+    main()
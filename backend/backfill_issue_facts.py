@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+补写问题事实表（为事实表上线前的历史记录解析 detected_issues，可重复执行，已有事实行的记录跳过）
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.connection import SessionLocal, engine
+from app.database.init_db import create_missing_indexes
+from app.models.database import Base
+from app.core.issue_facts import backfill_issue_facts
+
+def main():
+    """主函数"""
+    Base.metadata.create_all(bind=engine)
+    create_missing_indexes()
+
+    db = SessionLocal()
+    try:
+        written = backfill_issue_facts(db)
+    except Exception as e:
+        db.rollback()
+        print(f"补写问题事实失败: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    print(f"问题事实补写完成！共写入 {written} 行")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+冷启动基准 - 启动真实的uvicorn进程，测量从进程启动到首个200响应的耗时
+
+用法（在backend目录下）:
+    python -m benchmarks.bench_cold_start
+    python -m benchmarks.bench_cold_start --runs 5 --mode development
+
+使用本地数据库（data/content_optimizer.db）；首轮可能包含建表和词库编译，
+之后各轮为常规冷启动。首个200（/health）的中位数超过预算时以退出码1结束。
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET_MS = 1000
+SAMPLE_NOTE = "这个减肥药效果绝对好，包治百病。我们的广告推广很好！"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_200(url: str, deadline: float) -> bool:
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.005)
+    return False
+
+
+def post_json(url: str, payload: dict) -> int:
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.status
+
+
+def measure(mode: str, warmup: int) -> dict:
+    """一次冷启动：返回 首个200、首个分析请求完成 的耗时（毫秒，均自进程启动起算）"""
+    port = free_port()
+    env = dict(os.environ, STARTUP_MODE=mode, STARTUP_WARMUP=str(warmup))
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        if not wait_for_200(f"{base}/health", start + 60):
+            raise RuntimeError(process.stdout.read().decode("utf-8", "replace") if process.poll() is not None else "启动超时")
+        first_200 = (time.perf_counter() - start) * 1000
+        post_json(f"{base}/api/content/analyze", {"content": SAMPLE_NOTE})
+        first_analyze = (time.perf_counter() - start) * 1000
+        return {"first_200": first_200, "first_analyze": first_analyze}
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动基准")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mode", choices=("production", "development"), default="production")
+    parser.add_argument("--no-warmup", action="store_true", help="关闭后台预热（拼音库在首个分析请求时加载）")
+    args = parser.parse_args()
+
+    print(f"模式: {args.mode}  后台预热: {'关' if args.no_warmup else '开'}")
+    print(f"{'run':>3} | {'first 200 ms':>12} | {'first analyze ms':>16}")
+    results = []
+    for run in range(args.runs):
+        result = measure(args.mode, 0 if args.no_warmup else 1)
+        results.append(result)
+        print(f"{run + 1:>3} | {result['first_200']:>12.0f} | {result['first_analyze']:>16.0f}")
+
+    median_first_200 = statistics.median(r["first_200"] for r in results)
+    median_first_analyze = statistics.median(r["first_analyze"] for r in results)
+    print(f"中位数: 首个200 {median_first_200:.0f}ms，首个分析请求 {median_first_analyze:.0f}ms")
+    if median_first_200 >= TARGET_MS:
+        print(f"未达到目标：首个200应在 {TARGET_MS}ms 内")
+        sys.exit(1)
+    print(f"达到目标：首个200在 {TARGET_MS}ms 内")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+近似匹配基准 - 验证编辑距离1匹配在5万词库下每KB正文耗时低于1毫秒
+
+用法（在backend目录下）:
+    python -m benchmarks.bench_fuzzy
+    python -m benchmarks.bench_fuzzy --sizes 50000 --notes 50
+
+正文分三类：干净笔记、注入近似写法的笔记、全部由词库用字组成的对抗性文本（最坏情况，仅供参考）。
+前两类超过目标时以退出码1结束。
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import generate_lexicon, generate_corpus, LEXICON_CHARS, FILLER_CHARS
+from app.core.algorithms.fuzzy_matcher import FuzzyMatcher
+from app.core.algorithms.text_normalizer import normalize_word
+
+TARGET_MS_PER_KB = 1.0
+NOTE_LENGTH = 1000
+
+
+def mutate(word: str, rng: random.Random) -> str:
+    """对词做一次内部编辑：插入、删除、替换或相邻换位"""
+    position = rng.randrange(1, len(word) - 1)
+    operation = rng.choice(("insert", "delete", "substitute", "transpose"))
+    if operation == "insert":
+        return word[:position] + rng.choice(FILLER_CHARS) + word[position:]
+    if operation == "delete":
+        return word[:position] + word[position + 1:]
+    if operation == "substitute":
+        return word[:position] + rng.choice(FILLER_CHARS) + word[position + 1:]
+    return word[:position] + word[position + 1] + word[position] + word[position + 2:]
+
+
+def build_near_miss_corpus(lexicon_words: List[str], count: int, seed: int = 47) -> Tuple[List[str], List[str]]:
+    """在干净笔记中注入近似写法，返回 (语料, 注入的原词)"""
+    rng = random.Random(seed)
+    candidates = [w for w in lexicon_words if len(w) >= 4]
+    corpus = []
+    injected = []
+    for note in generate_corpus(count, NOTE_LENGTH, [], hit_rate=0, seed=seed):
+        for _ in range(3):
+            word = rng.choice(candidates)
+            cut = rng.randrange(len(note))
+            note = note[:cut] + "，" + mutate(word, rng) + "，" + note[cut:]
+            injected.append(word)
+        corpus.append(note)
+    return corpus, injected
+
+
+def measure(matcher: FuzzyMatcher, corpus: List[str], rounds: int = 3) -> Tuple[float, int]:
+    """返回 (每KB耗时毫秒, 命中数)"""
+    kilobytes = sum(len(text.encode("utf-8")) for text in corpus) / 1024
+    hits = sum(len(matcher.find_all(text)) for text in corpus)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in corpus:
+            matcher.find_all(text)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / rounds
+    return elapsed_ms / kilobytes, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="近似匹配基准")
+    parser.add_argument("--sizes", default="10000,50000", help="词库规模（逗号分隔）")
+    parser.add_argument("--notes", type=int, default=30, help="每类语料的笔记数")
+    args = parser.parse_args()
+
+    print(f"{'lexicon':>8} | {'keys':>8} | {'build s':>7} | {'clean ms/KB':>11} | "
+          f"{'near-miss ms/KB':>15} | {'recall':>6} | {'adversarial ms/KB':>17}")
+
+    failed = False
+    for size in (int(s) for s in args.sizes.split(",")):
+        lexicon = generate_lexicon(size)
+        words = [normalize_word(entry["word"]) for entry in lexicon]
+
+        start = time.perf_counter()
+        matcher = FuzzyMatcher(words)
+        build_seconds = time.perf_counter() - start
+
+        clean_corpus = generate_corpus(args.notes, NOTE_LENGTH, lexicon, hit_rate=0)
+        near_miss_corpus, injected = build_near_miss_corpus(words, args.notes)
+        rng = random.Random(48)
+        adversarial_corpus = [
+            "".join(rng.choice(LEXICON_CHARS) for _ in range(NOTE_LENGTH)) for _ in range(max(1, args.notes // 3))
+        ]
+
+        clean_ms, _ = measure(matcher, clean_corpus)
+        near_miss_ms, _ = measure(matcher, near_miss_corpus)
+        adversarial_ms, _ = measure(matcher, adversarial_corpus, rounds=1)
+
+        found = {words[index] for text in near_miss_corpus for _, _, index in matcher.find_all(text)}
+        recall = sum(1 for word in injected if word in found) / len(injected)
+
+        print(f"{size:>8} | {matcher.key_count:>8} | {build_seconds:>7.2f} | {clean_ms:>11.3f} | "
+              f"{near_miss_ms:>15.3f} | {recall:>6.1%} | {adversarial_ms:>17.3f}")
+        failed = failed or clean_ms >= TARGET_MS_PER_KB or near_miss_ms >= TARGET_MS_PER_KB
+
+    if failed:
+        print(f"未达到目标：每KB正文耗时应低于 {TARGET_MS_PER_KB} 毫秒")
+        sys.exit(1)
+    print(f"达到目标：每KB正文耗时低于 {TARGET_MS_PER_KB} 毫秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+词库内存基准 - 对比列表-字典与紧凑存储两种表示加载百万词条后的RSS增量
+
+用法（在backend目录下）:
+    python -m benchmarks.bench_lexicon_memory
+    python -m benchmarks.bench_lexicon_memory --size 200000
+
+每种表示在独立子进程中构建，避免相互影响；词条逐行生成且每个字段都是新字符串对象，
+与从数据库逐行读取的情况一致。
+"""
+import argparse
+import gc
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import LEXICON_CHARS, CATEGORIES, REPLACEMENT_TYPES
+
+REPRESENTATIONS = ("dicts", "compact")
+
+
+def current_rss_kb() -> int:
+    """当前进程常驻内存（KB）；无/proc时退回到峰值RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def prohibited_rows(size: int, seed: int = 42):
+    """逐行生成违禁词 (word, category, risk_level)，模拟数据库结果"""
+    rng = random.Random(seed)
+    for _ in range(size):
+        word = "".join(rng.choice(LEXICON_CHARS) for _ in range(rng.randint(2, 6)))
+        yield word, CATEGORIES[rng.randrange(len(CATEGORIES))].encode().decode(), rng.randint(1, 3)
+
+
+def replacement_rows(size: int, seed: int = 43):
+    """逐行生成谐音替换 (原词, 替换词, 类型, 优先级, 置信度, 使用次数, id)，每个原词3个替换，按原词分组"""
+    rng = random.Random(seed)
+    alphabet = sorted(set(LEXICON_CHARS))
+    base = len(alphabet)
+    for i in range(size):
+        # 原词唯一（与original_words.word唯一约束一致）：序号的三位编码 + 随机后缀
+        prefix = alphabet[i // base // base % base] + alphabet[i // base % base] + alphabet[i % base]
+        original = prefix + "".join(rng.choice(LEXICON_CHARS) for _ in range(rng.randint(0, 3)))
+        for j in range(3):
+            yield (
+                original.encode().decode(),
+                original[:1] + "*" + original[1:] if j == 0 else original[:-1] + rng.choice(LEXICON_CHARS),
+                REPLACEMENT_TYPES[j % len(REPLACEMENT_TYPES)].encode().decode(),
+                rng.randint(0, 1),
+                round(rng.uniform(0.5, 0.95), 2),
+                rng.randint(0, 100),
+                i * 3 + j + 1
+            )
+
+
+def build_dicts(size: int):
+    """原表示：列表-字典 / 字典-列表-字典"""
+    words = [
+        {"word": word, "category": category, "risk_level": risk_level}
+        for word, category, risk_level in prohibited_rows(size)
+    ]
+    mappings = {}
+    for original, replacement, r_type, priority, confidence, usage_count, r_id in replacement_rows(size // 10):
+        mappings.setdefault(original, []).append({
+            "replacement": replacement, "type": r_type, "priority": priority,
+            "confidence": confidence, "usage_count": usage_count, "id": r_id
+        })
+    return words, mappings
+
+
+def build_compact(size: int):
+    """紧凑表示"""
+    from app.core.algorithms.lexicon_store import ProhibitedLexicon, ReplacementTable
+    return ProhibitedLexicon(prohibited_rows(size)), ReplacementTable(replacement_rows(size // 10))
+
+
+def child(representation: str, size: int):
+    """子进程：构建指定表示并输出 RSS增量KB 和 构建耗时秒"""
+    builder = build_compact if representation == "compact" else build_dicts
+    if representation == "compact":
+        import app.core.algorithms.lexicon_store  # noqa: F401  导入开销不计入
+    gc.collect()
+    before = current_rss_kb()
+    start = time.perf_counter()
+    lexicon = builder(size)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    after = current_rss_kb()
+    print(after - before, round(elapsed, 2), len(lexicon[0]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="词库内存基准")
+    parser.add_argument("--size", type=int, default=1_000_000, help="违禁词条数（谐音原词数取其1/10，每词3个替换）")
+    parser.add_argument("--child", choices=REPRESENTATIONS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.size)
+        return
+
+    print(f"违禁词 {args.size} 条，谐音替换 {args.size // 10 * 3} 条")
+    print(f"{'representation':<14} | {'RSS MB':>8} | {'bytes/entry':>11} | {'build s':>7}")
+    results = {}
+    for representation in REPRESENTATIONS:
+        output = subprocess.check_output(
+            [sys.executable, "-m", "benchmarks.bench_lexicon_memory",
+             "--child", representation, "--size", str(args.size)],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).decode().split()
+        rss_kb, build_seconds = int(output[0]), float(output[1])
+        results[representation] = rss_kb
+        entries = args.size + args.size // 10 * 3
+        print(f"{representation:<14} | {rss_kb / 1024:>8.1f} | {rss_kb * 1024 / entries:>11.1f} | {build_seconds:>7.2f}")
+
+    if results["compact"]:
+        print(f"紧凑存储内存为原表示的 {results['compact'] / results['dicts']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+分析结果序列化基准 - 对比Pydantic响应路径与快速JSON路径的耗时和传输字节数
+
+用法（在backend目录下）:
+    python -m benchmarks.bench_serialization
+"""
+import gzip
+import random
+import sys
+import os
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.api.content import (
+    ContentAnalysisResponse, DetectedIssue, OptimizationSuggestion,
+    _serialize_issue, _serialize_suggestion
+)
+from app.core.responses import dumps_json, brotli
+
+ISSUE_COUNTS = [10, 100, 500]
+ROUNDS = 50
+
+WORDS = ["减肥药", "包治百病", "广告", "推广", "微商", "第一", "最好", "绝对"]
+CONTEXT_CHARS = "这款产品效果真的很好大家一定要试试看我已经用了三个月皮肤变得特别光滑"
+
+
+def build_analysis_result(issue_count: int) -> dict:
+    """构造与ContentAnalyzer输出结构一致的合成分析结果"""
+    rng = random.Random(issue_count)
+    issues = []
+    for i in range(issue_count):
+        word = rng.choice(WORDS)
+        start = i * 7
+        context = "".join(rng.choice(CONTEXT_CHARS) for _ in range(40))
+        issues.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "type": "prohibited_word",
+            "word": word,
+            "start_pos": start,
+            "end_pos": start + len(word),
+            "position": start,
+            "risk_level": rng.randint(1, 3),
+            "category": "commercial",
+            "reason": "上下文分析：检测到风险用法，营销推广",
+            "context": context,
+            "analysis": "上下文分析：检测到风险用法，营销推广",
+            "confidence": 0.8,
+            "severity": "medium",
+            "suggestions": [word[0] + "*" + word[1:], word[0] + " " + word[1:], "推荐"]
+        })
+    suggestions = [{
+        "type": "prohibited_words",
+        "title": "违禁词替换",
+        "description": f"发现 {issue_count} 个需要替换的词汇，建议使用谐音词或其他表达方式。",
+        "priority": "high"
+    }]
+    return {"issues": issues, "score": 40, "suggestions": suggestions}
+
+
+def pydantic_path(result: dict) -> bytes:
+    """原实现：逐个构建Pydantic对象，再经jsonable_encoder和标准json序列化"""
+    model = ContentAnalysisResponse(
+        detected_issues=[DetectedIssue(**_serialize_issue(issue)) for issue in result["issues"]],
+        content_score=result["score"],
+        suggestions=[OptimizationSuggestion(**_serialize_suggestion(s)) for s in result["suggestions"]],
+        processing_time=0.01
+    )
+    return JSONResponse(content=jsonable_encoder(model)).body
+
+
+def fast_path(result: dict) -> bytes:
+    """快速路径：直接整理dict并用dumps_json序列化"""
+    return dumps_json({
+        "detected_issues": [_serialize_issue(issue) for issue in result["issues"]],
+        "content_score": result["score"],
+        "suggestions": [_serialize_suggestion(s) for s in result["suggestions"]],
+        "processing_time": 0.01
+    })
+
+
+def time_call(func, arg) -> float:
+    """返回单次调用的平均耗时（毫秒）"""
+    func(arg)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        func(arg)
+    return (time.perf_counter() - start) * 1000 / ROUNDS
+
+
+def main():
+    print(f"{'issues':>6} | {'pydantic ms':>11} | {'fast ms':>8} | {'raw B':>8} | {'gzip B':>7} | {'br B':>7}")
+    for count in ISSUE_COUNTS:
+        result = build_analysis_result(count)
+        slow_ms = time_call(pydantic_path, result)
+        fast_ms = time_call(fast_path, result)
+
+        body = fast_path(result)
+        gzip_size = len(gzip.compress(body, compresslevel=6))
+        br_size = len(brotli.compress(body, quality=5)) if brotli else 0
+
+        print(f"{count:>6} | {slow_ms:>11.3f} | {fast_ms:>8.3f} | {len(body):>8} | {gzip_size:>7} | {br_size or '-':>7}")
+
+
+if __name__ == "__main__":
+    main()
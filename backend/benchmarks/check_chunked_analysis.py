@@ -0,0 +1,145 @@
+"""
+分块检测一致性检查 - 长文本分块检测合并后的结果必须与整篇检测完全相同（含顺序）
+
+用法（在backend目录下）:
+    python -m benchmarks.check_chunked_analysis
+    python -m benchmarks.check_chunked_analysis --cases 200 --seed 7 --pool
+
+用很小的块（默认300字）制造大量块边界，文本包含多段落、无换行的长段落、无句读的长句、
+密集命中以及插入分隔符/零宽字符的变形写法；开启近似匹配后同样检查。
+默认在当前进程内逐块执行，--pool 时经进程池执行（检查子进程映射制品和结果传回）。
+出现不一致时输出用例并以退出码1结束。
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import (
+    generate_lexicon, generate_homophones, generate_whitelist, generate_emojis, generate_note,
+    FILLER_CHARS
+)
+from benchmarks.fixtures import build_session_factory
+
+# 插入词条内部的分隔符和零宽字符（规范化时被去除，命中的原文区间随之变长）
+SEPARATORS = [" ", "*", "·", "-", "​", "  ", "**"]
+
+
+def long_text(rng: random.Random, lexicon, length: int) -> str:
+    """多种形态拼接的长文本"""
+    parts = []
+    total = 0
+    while total < length:
+        kind = rng.random()
+        if kind < 0.5:
+            part = generate_note(rng, rng.randint(100, 800), lexicon, hit_rate=0.8)
+        elif kind < 0.7:
+            # 无换行的长段落
+            part = generate_note(rng, rng.randint(400, 1500), lexicon, hit_rate=0.8).replace("\n", "")
+        elif kind < 0.85:
+            # 无句读的长句
+            part = "".join(
+                rng.choice(FILLER_CHARS) if rng.random() < 0.8 else lexicon[rng.randrange(len(lexicon))]["word"]
+                for _ in range(rng.randint(200, 700))
+            )
+        else:
+            # 插入分隔符的变形写法
+            words = []
+            for _ in range(rng.randint(5, 30)):
+                word = lexicon[rng.randrange(len(lexicon))]["word"]
+                separator = rng.choice(SEPARATORS)
+                words.append(separator.join(word) + rng.choice(FILLER_CHARS))
+            part = "".join(words)
+        parts.append(part + rng.choice(["\n", "", "。", "\n\n"]))
+        total += len(parts[-1])
+    return "".join(parts)
+
+
+def comparable(results):
+    """去掉每次生成的随机id后比较"""
+    return [
+        ((start, end, word_info["word"], match_type),
+         None if issue is None else {key: value for key, value in issue.items() if key != "id"})
+        for (start, end, word_info, match_type), issue in results
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分块检测一致性检查")
+    parser.add_argument("--cases", type=int, default=60, help="随机长文本数")
+    parser.add_argument("--length", type=int, default=6000, help="每篇字数")
+    parser.add_argument("--chunk-chars", type=int, default=300, help="核心区间最少字数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--pool", action="store_true", help="经进程池执行")
+    args = parser.parse_args()
+
+    os.environ["FUZZY_MATCH_ENABLED"] = "1"
+    os.environ["CHUNKED_ANALYSIS_MIN_CHARS"] = "0"
+    os.environ["CHUNKED_ANALYSIS_CHUNK_CHARS"] = str(args.chunk_chars)
+    os.environ.setdefault("CHUNKED_ANALYSIS_WORKERS", "8")
+
+    from app.core import chunked_analysis
+    from app.core.algorithms.parsed_document import ParsedDocument
+    from app.core.algorithms.smart_prohibited_detector import SmartProhibitedDetector
+    from app.core.lexicon_artifact import lexicon_artifacts
+
+    lexicon = generate_lexicon(500)
+    session_factory = build_session_factory(
+        lexicon,
+        generate_homophones(lexicon, ratio=0.3),
+        generate_whitelist(lexicon, ratio=0.2),
+        generate_emojis()
+    )
+    artifact_dir = tempfile.mkdtemp(prefix="check_lexicon_")
+    atexit.register(shutil.rmtree, artifact_dir, True)
+    lexicon_artifacts.configure(path=os.path.join(artifact_dir, "lexicon.bin"), session_factory=session_factory)
+    lexicon_artifacts.rebuild()
+    atexit.register(chunked_analysis.shutdown_pool)
+
+    detector = SmartProhibitedDetector(session_factory())
+    spec = {"artifact_path": detector.lexicon.artifact.path, "version": detector.lexicon.version}
+    reach = chunked_analysis.max_word_length(detector.lexicon) + 1
+    loop = asyncio.new_event_loop()
+    rng = random.Random(args.seed)
+    failures = 0
+    chunk_count = 0
+
+    for index in range(args.cases):
+        text = long_text(rng, lexicon, args.length)
+        expected = comparable(detector.detect_with_matches(text))
+        if args.pool:
+            actual = loop.run_until_complete(chunked_analysis.detect_matches(detector, ParsedDocument(text)))
+            chunk_count += len(chunked_analysis.plan_chunks(text, reach, chunked_analysis.chunk_size(len(text))))
+        else:
+            actual = []
+            for start, core_start, core_end, end in chunked_analysis.plan_chunks(text, reach, args.chunk_chars):
+                actual.extend(chunked_analysis._detect_chunk(spec, (start, core_start, core_end, text[start:end])))
+                chunk_count += 1
+        actual = comparable(actual)
+        if actual == expected:
+            continue
+        failures += 1
+        missing = [item for item in expected if item not in actual]
+        extra = [item for item in actual if item not in expected]
+        print(f"❌ #{index}: 整篇 {len(expected)} 个命中，分块 {len(actual)} 个")
+        for label, items in (("缺少", missing), ("多出", extra)):
+            for match, issue in items[:3]:
+                print(f"   {label}: {match} {issue and issue['context'][:30]!r}")
+        if missing and extra and missing[0][0] == extra[0][0] and missing[0][1] and extra[0][1]:
+            expected_issue, actual_issue = missing[0][1], extra[0][1]
+            print(f"   差异字段: {[key for key in expected_issue if expected_issue[key] != actual_issue.get(key)]}")
+        if not missing and not extra:
+            print("   命中相同，顺序不同")
+
+    print(f"用例: {args.cases}  块: {chunk_count}  不一致: {failures}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
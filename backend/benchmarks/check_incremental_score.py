@@ -0,0 +1,139 @@
+"""
+增量评分一致性检查 - 随机编辑后，增量评分与对编辑后文本的完整分析结果必须一致
+
+用法（在backend目录下）:
+    python -m benchmarks.check_incremental_score
+    python -m benchmarks.check_incremental_score --cases 2000 --seed 7
+
+两类用例：优化器实际产生的编辑（各优化项组合），以及在词库命中密集的短文本上随机登记的
+插入/删除/替换（含分隔符、表情、句末标点和换行，覆盖变形匹配、近似匹配和句子边界变化）。
+比较各问题风险等级的多重集合（评分在0分截断，单比较评分会掩盖差异）和评分；
+出现不一致时输出用例并以退出码1结束。
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import random
+import shutil
+import sys
+import tempfile
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import (
+    generate_lexicon, generate_homophones, generate_whitelist, generate_emojis, generate_corpus,
+    LEXICON_CHARS, FILLER_CHARS, PUNCTUATION, EMOJIS
+)
+from benchmarks.fixtures import build_session_factory
+
+# 随机编辑插入的片段：词库用字、正文用字、分隔符、表情、句末标点、换行
+EDIT_PIECES = list(LEXICON_CHARS[:40]) + list(FILLER_CHARS[:20]) + list(PUNCTUATION) + EMOJIS + [
+    " ", "*", "\n", "\n\n", "推荐", "绝对", "第一次", "广告", "限时特价"
+]
+OPTIMIZATION_SETS = [
+    None,
+    ["homophone_replacement"],
+    ["structure_optimization"],
+    ["emoji_optimization"],
+    ["homophone_replacement", "emoji_optimization"],
+]
+
+
+def random_edit_log(text: str, rng: random.Random):
+    """在文本上随机登记若干编辑（冲突的自动被拒绝）"""
+    from app.core.algorithms.edit_log import EditLog
+
+    edit_log = EditLog(text)
+    lexicon_words = [word for word in EDIT_PIECES if len(word) > 1]
+    for _ in range(rng.randint(1, 6)):
+        start = rng.randint(0, len(text))
+        end = min(len(text), start + rng.choice((0, 0, 1, 2, 4, 8)))
+        piece = "".join(rng.choice(EDIT_PIECES) for _ in range(rng.randint(0, 3)))
+        if rng.random() < 0.3:
+            piece = rng.choice(lexicon_words)
+        edit_log.replace(start, end, piece)
+    return edit_log
+
+
+def check(analyzer, loop, text: str, edit_log, label: str) -> bool:
+    """增量评分与完整分析是否一致；不一致时输出用例"""
+    from app.core.algorithms.incremental_scorer import IncrementalScorer
+    from app.core.algorithms.parsed_document import ParsedDocument
+
+    _, snapshot = loop.run_until_complete(analyzer.analyze_for_rescoring(text))
+    final_doc = ParsedDocument(edit_log.apply())
+    full = loop.run_until_complete(analyzer.analyze_content(final_doc.content, final_doc))
+    expected = Counter(issue.get("risk_level", 1) for issue in full["issues"])
+    actual = Counter(IncrementalScorer(analyzer).risk_levels(snapshot, edit_log, final_doc))
+    score = analyzer.rescore(snapshot, edit_log, final_doc)
+    if expected == actual and score == full["score"]:
+        return True
+    print(f"❌ {label}: 完整分析 {dict(expected)} 评分 {full['score']}，增量 {dict(actual)} 评分 {score}")
+    print(f"   原文: {text!r}")
+    print(f"   编辑: {[(edit.start, edit.end, edit.text) for edit in edit_log.edits]}")
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="增量评分一致性检查")
+    parser.add_argument("--cases", type=int, default=500, help="随机编辑用例数")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    from app.core.algorithms.content_analyzer import ContentAnalyzer
+    from app.core.algorithms.content_optimizer import ContentOptimizer
+    from app.core.algorithms.edit_log import EditLog
+    from app.core.lexicon_artifact import lexicon_artifacts
+
+    lexicon = generate_lexicon(300)
+    session_factory = build_session_factory(
+        lexicon,
+        generate_homophones(lexicon, ratio=0.5),
+        generate_whitelist(lexicon, ratio=0.2),
+        generate_emojis()
+    )
+    artifact_dir = tempfile.mkdtemp(prefix="check_lexicon_")
+    atexit.register(shutil.rmtree, artifact_dir, True)
+    lexicon_artifacts.configure(path=os.path.join(artifact_dir, "lexicon.bin"), session_factory=session_factory)
+    lexicon_artifacts.rebuild()
+
+    db = session_factory()
+    loop = asyncio.new_event_loop()
+    analyzer = ContentAnalyzer(db)
+    optimizer = ContentOptimizer(db)
+    rng = random.Random(args.seed)
+    failures = 0
+
+    # 1. 优化器实际产生的编辑
+    corpus = generate_corpus(40, 300, lexicon, hit_rate=0.5, seed=args.seed)
+    optimizer_cases = 0
+    for index, text in enumerate(corpus):
+        for suggestions in OPTIMIZATION_SETS:
+            from app.core.algorithms.parsed_document import ParsedDocument
+            from app.core.algorithms.replacement_policy import ReplacementPolicy
+            doc = ParsedDocument(text)
+            edit_log = EditLog(text)
+            policy = ReplacementPolicy(optimizer.homophone_mappings, text, deterministic=False)
+            if not suggestions or "homophone_replacement" in suggestions:
+                optimizer._plan_homophone_replacements(doc, edit_log, policy)
+            if not suggestions or "structure_optimization" in suggestions:
+                optimizer._plan_structure_optimization(doc, edit_log, policy)
+            if not suggestions or "emoji_optimization" in suggestions:
+                optimizer.emoji_inserter.plan_emoji_insertions(doc, edit_log)
+            optimizer_cases += 1
+            failures += not check(analyzer, loop, text, edit_log, f"优化器 #{index} {suggestions}")
+
+    # 2. 随机编辑（短文本、命中密集）
+    dense_corpus = generate_corpus(args.cases, 120, lexicon, hit_rate=0.9, seed=args.seed + 1)
+    for index, text in enumerate(dense_corpus):
+        failures += not check(analyzer, loop, text, random_edit_log(text, rng), f"随机编辑 #{index}")
+
+    total = optimizer_cases + len(dense_corpus)
+    print(f"用例: {total}  不一致: {failures}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+词库预筛一致性检查 - 预筛只能多报不能漏报，跳过检测后的分析结果必须与完整分析相同
+
+用法（在backend目录下）:
+    python -m benchmarks.check_prefilter
+    python -m benchmarks.check_prefilter --cases 2000 --seed 7
+
+文本以正文用字为主，稀疏地混入词库用字、词条、插入分隔符的变形写法、同音字替换的谐音写法、
+近似写法（缺字/换字/换位/多字）以及大小写变化的英文词条，使预筛判定落在干净与候选两侧。检查：
+1. 预筛判定不可能命中时，检测（开启和关闭近似匹配）没有任何命中；
+2. 未列为候选的谐音原词不在正文中出现（忽略大小写）；
+3. 开启预筛的分析结果与关闭预筛的完整分析相同（去掉随机id）。
+出现不一致时输出用例并以退出码1结束。
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import (
+    generate_lexicon, generate_homophones, generate_whitelist, generate_emojis,
+    LEXICON_CHARS, FILLER_CHARS, PUNCTUATION, EMOJIS
+)
+from benchmarks.fixtures import build_session_factory
+
+# 含大小写字母的词条（谐音原词忽略大小写出现）
+LATIN_WORDS = ["VIP", "Pro会员", "iPhone", "OK绷", "wifi密码"]
+SEPARATORS = [" ", "*", "·", "​"]
+
+
+def same_sound_chars():
+    """语料用字按拼音分组：字 -> 其他同音字"""
+    from app.core.algorithms.pinyin_keys import char_pinyin
+
+    groups = {}
+    for char in set(LEXICON_CHARS + FILLER_CHARS):
+        groups.setdefault(char_pinyin(char), []).append(char)
+    return {char: [other for other in group if other != char] for group in groups.values() for char in group}
+
+
+def variant(rng: random.Random, word: str, same_sound) -> str:
+    """词条的一种写法：原样、插入分隔符、大小写变化、同音字替换或编辑距离为1的近似写法"""
+    kind = rng.random()
+    if kind < 0.25:
+        return word
+    if kind < 0.4:
+        return rng.choice(SEPARATORS).join(word)
+    if kind < 0.45:
+        return word.swapcase()
+    if kind < 0.6:
+        chars = list(word)
+        for position in rng.sample(range(len(chars)), rng.randint(1, len(chars))):
+            if same_sound.get(chars[position]):
+                chars[position] = rng.choice(same_sound[chars[position]])
+        return "".join(chars)
+    position = rng.randrange(len(word))
+    if kind < 0.7:
+        return word[:position] + word[position + 1:]
+    if kind < 0.8:
+        return word[:position] + rng.choice(FILLER_CHARS) + word[position + 1:]
+    if kind < 0.9 and position + 1 < len(word):
+        return word[:position] + word[position + 1] + word[position] + word[position + 2:]
+    return word[:position] + rng.choice(FILLER_CHARS) + word[position:]
+
+
+def sparse_text(rng: random.Random, words, same_sound, length: int, density: float) -> str:
+    """正文用字为主的文本，按density混入词库用字和词条写法"""
+    parts = []
+    total = 0
+    while total < length:
+        roll = rng.random()
+        if roll < density / 2:
+            part = variant(rng, rng.choice(words), same_sound)
+        elif roll < density:
+            part = rng.choice(LEXICON_CHARS)
+        elif roll < density + 0.05:
+            part = rng.choice(PUNCTUATION + "\n") + (rng.choice(EMOJIS) if rng.random() < 0.2 else "")
+        else:
+            part = rng.choice(FILLER_CHARS)
+        parts.append(part)
+        total += len(part)
+    return "".join(parts)
+
+
+def comparable(analysis):
+    """去掉每次生成的随机id后比较"""
+    return {
+        **analysis,
+        "issues": [{key: value for key, value in issue.items() if key != "id"} for issue in analysis["issues"]]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="词库预筛一致性检查")
+    parser.add_argument("--cases", type=int, default=600, help="随机文本数")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ["FUZZY_MATCH_ENABLED"] = "1"
+
+    from app.core.algorithms.content_analyzer import ContentAnalyzer
+    from app.core.algorithms.parsed_document import ParsedDocument
+    from app.core.lexicon_artifact import lexicon_artifacts
+
+    lexicon = generate_lexicon(500) + [
+        {"word": word, "category": "commercial", "risk_level": 2} for word in LATIN_WORDS
+    ]
+    homophones = generate_homophones(lexicon, ratio=0.3)
+    for word in LATIN_WORDS[:3]:
+        homophones[word] = [{"replacement": word[0] + "*" + word[1:], "type": "符号分隔", "priority": 1,
+                             "confidence": 0.9}]
+    session_factory = build_session_factory(
+        lexicon, homophones, generate_whitelist(lexicon, ratio=0.2), generate_emojis()
+    )
+    artifact_dir = tempfile.mkdtemp(prefix="check_lexicon_")
+    atexit.register(shutil.rmtree, artifact_dir, True)
+    lexicon_artifacts.configure(path=os.path.join(artifact_dir, "lexicon.bin"), session_factory=session_factory)
+    compiled = lexicon_artifacts.rebuild()
+
+    loop = asyncio.new_event_loop()
+    analyzer = ContentAnalyzer(session_factory())
+    baseline = ContentAnalyzer(session_factory())
+    baseline.smart_detector.prefilter = None
+    detector = analyzer.smart_detector
+    exact_prefilter = compiled.prefilter(None)
+    words = [entry["word"] for entry in lexicon]
+    same_sound = same_sound_chars()
+    rng = random.Random(args.seed)
+    failures = 0
+    clean_count = 0
+
+    for index in range(args.cases):
+        density = rng.choice((0.0, 0.002, 0.01, 0.03, 0.1))
+        text = sparse_text(rng, words, same_sound, rng.randint(20, 1500), density)
+        doc = ParsedDocument(text)
+        errors = []
+
+        possible = detector.prefilter.may_match_prohibited(doc)
+        matches = detector.find_word_matches(text, doc)
+        if not possible and matches:
+            errors.append(f"预筛判定干净，检测命中 {[(s, e, info['word'], t) for s, e, info, t in matches[:3]]}")
+        if not exact_prefilter.may_match_prohibited(doc):
+            exact = [match for match in matches if match[3] != "fuzzy"]
+            if exact:
+                errors.append(f"预筛（不含近似）判定干净，检测命中 {[(s, e, t) for s, e, _, t in exact[:3]]}")
+
+        candidates = detector.prefilter.homophone_candidates(text)
+        missed = [word for word in homophones
+                  if word not in candidates and re.search(re.escape(word), text, re.IGNORECASE)]
+        if missed:
+            errors.append(f"谐音原词未列为候选: {missed[:5]}")
+
+        clean_count += not possible and not candidates
+        expected = comparable(loop.run_until_complete(baseline.analyze_content(text)))
+        actual = comparable(loop.run_until_complete(analyzer.analyze_content(text)))
+        if actual != expected:
+            errors.append(f"分析结果不同: 完整 {len(expected['issues'])} 个问题 评分 {expected['score']}，"
+                          f"预筛 {len(actual['issues'])} 个问题 评分 {actual['score']}")
+
+        if errors:
+            failures += 1
+            print(f"❌ #{index}: {text[:60]!r}")
+            for error in errors:
+                print(f"   {error}")
+
+    print(f"用例: {args.cases}  判定干净: {clean_count}  不一致: {failures}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
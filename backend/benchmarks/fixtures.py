@@ -0,0 +1,66 @@
+"""
+基准测试数据库 - 用合成数据填充内存SQLite，供各引擎和HTTP接口使用
+"""
+import json
+from typing import Dict, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.database import (
+    Base, ProhibitedWord, OriginalWord, HomophoneReplacement,
+    WhitelistPattern, XiaohongshuEmoji
+)
+
+
+def build_session_factory(lexicon: List[Dict], homophones: Dict[str, List[Dict]],
+                          whitelist: List[Dict], emojis: List[Dict]):
+    """创建并填充内存数据库，返回会话工厂"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        conn.execute(ProhibitedWord.__table__.insert(), [
+            {"word": w["word"], "category": w["category"], "risk_level": w["risk_level"],
+             "status": 1, "created_by": "benchmark"}
+            for w in lexicon
+        ])
+
+        if homophones:
+            conn.execute(OriginalWord.__table__.insert(), [
+                {"id": i + 1, "word": word, "category": "benchmark", "status": 1, "created_by": "benchmark"}
+                for i, word in enumerate(homophones)
+            ])
+            rows = []
+            for i, replacements in enumerate(homophones.values()):
+                for r in replacements:
+                    rows.append({
+                        "original_word_id": i + 1,
+                        "replacement_word": r["replacement"],
+                        "replacement_type": r["type"],
+                        "priority": r["priority"],
+                        "confidence_score": r["confidence"],
+                        "usage_count": 0,
+                        "status": 1,
+                        "created_by": "benchmark"
+                    })
+            conn.execute(HomophoneReplacement.__table__.insert(), rows)
+
+        if whitelist:
+            conn.execute(WhitelistPattern.__table__.insert(), [
+                {**p, "is_active": 1, "created_by": "benchmark"} for p in whitelist
+            ])
+
+        if emojis:
+            conn.execute(XiaohongshuEmoji.__table__.insert(), [
+                {**{k: v for k, v in e.items() if k != "keywords"},
+                 "keywords": json.dumps(e["keywords"], ensure_ascii=False), "status": 1}
+                for e in emojis
+            ])
+
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -0,0 +1,130 @@
+"""
+基准测试框架 - 计时、分位数、峰值内存、基线保存与比较
+"""
+import gc
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Sequence
+
+# 比较基线时允许的相对退化幅度
+DEFAULT_TOLERANCE = 0.25
+# 参与回归判断的指标（越小越好）
+COMPARED_METRICS = ("p50_ms", "p99_ms", "peak_memory_kb")
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """计算分位数（线性插值）"""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def run_benchmark(name: str, func: Callable[[Any], Any], inputs: List[Any],
+                  repeat: int = 3, warmup: int = 3) -> Dict[str, Any]:
+    """对每个输入调用func，统计吞吐量、延迟分位数和峰值内存"""
+    for item in inputs[:warmup]:
+        func(item)
+
+    latencies = []
+    total_chars = 0
+    gc.collect()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in inputs:
+            call_start = time.perf_counter()
+            func(item)
+            latencies.append(time.perf_counter() - call_start)
+            if isinstance(item, str):
+                total_chars += len(item)
+    elapsed = time.perf_counter() - start
+
+    # 峰值内存单独测量，避免tracemalloc拖慢计时
+    gc.collect()
+    tracemalloc.start()
+    for item in inputs:
+        func(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "name": name,
+        "calls": len(latencies),
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "chars_per_s": round(total_chars / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 4),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 4),
+        "peak_memory_kb": round(peak / 1024, 1)
+    }
+
+
+def environment_info() -> Dict[str, str]:
+    """记录运行环境，便于判断基线是否可比"""
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        commit = "unknown"
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "commit": commit
+    }
+
+
+def print_results(results: List[Dict[str, Any]]):
+    """打印结果表格"""
+    header = f"{'benchmark':<28} | {'calls':>6} | {'ops/s':>9} | {'chars/s':>11} | {'p50 ms':>9} | {'p99 ms':>9} | {'peak KB':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['name']:<28} | {r['calls']:>6} | {r['throughput_per_s']:>9} | {r['chars_per_s']:>11} | "
+              f"{r['p50_ms']:>9} | {r['p99_ms']:>9} | {r['peak_memory_kb']:>9}")
+
+
+def save_baseline(path: str, scale: str, results: List[Dict[str, Any]]):
+    """保存机器可读的基线文件"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "scale": scale,
+            "environment": environment_info(),
+            "results": {r["name"]: r for r in results}
+        }, f, ensure_ascii=False, indent=2)
+    print(f"基线已保存: {path}")
+
+
+def compare_with_baseline(path: str, scale: str, results: List[Dict[str, Any]],
+                          tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """与基线比较，返回退化超过容忍度的指标说明"""
+    with open(path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    if baseline.get("scale") != scale:
+        return [f"基线规模为 {baseline.get('scale')}，当前规模为 {scale}，无法比较"]
+
+    regressions = []
+    for r in results:
+        base = baseline["results"].get(r["name"])
+        if not base:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = base.get(metric), r.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change > tolerance:
+                regressions.append(f"{r['name']}.{metric}: {old} -> {new} (+{change:.0%})")
+    return regressions
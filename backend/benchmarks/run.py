@@ -0,0 +1,155 @@
+"""
+检测与优化引擎基准测试
+
+用法（在backend目录下）:
+    python -m benchmarks.run --scale small
+    python -m benchmarks.run --scale medium --save benchmarks/baselines/medium.json
+    python -m benchmarks.run --scale medium --compare benchmarks/baselines/medium.json
+
+比较模式下任一指标退化超过容忍度时以退出码1结束，可直接用于CI。
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import (
+    generate_lexicon, generate_homophones, generate_whitelist, generate_emojis, generate_corpus
+)
+from benchmarks.fixtures import build_session_factory
+from benchmarks.harness import (
+    run_benchmark, print_results, save_baseline, compare_with_baseline, DEFAULT_TOLERANCE
+)
+
+SCALES = {
+    "small": {"lexicon": 200, "notes": 30, "length": 300, "repeat": 3},
+    "medium": {"lexicon": 2000, "notes": 30, "length": 1000, "repeat": 2},
+    "large": {"lexicon": 20000, "notes": 20, "length": 3000, "repeat": 1},
+}
+
+
+def build_benchmarks(session_factory, corpus, clean_corpus):
+    """构建 (名称, 函数, 输入) 列表"""
+    from app.core.algorithms.smart_prohibited_detector import SmartProhibitedDetector
+    from app.core.algorithms.content_analyzer import ContentAnalyzer
+    from app.core.algorithms.content_optimizer import ContentOptimizer
+    from app.core.algorithms.emoji_inserter import EmojiInserter
+    from app.core.lexicon_artifact import lexicon_artifacts, compile_lexicon, CompiledLexicon
+
+    loop = asyncio.new_event_loop()
+    db = session_factory()
+
+    # 词库制品编译到临时目录，各引擎从中映射词库
+    artifact_dir = tempfile.mkdtemp(prefix="bench_lexicon_")
+    atexit.register(shutil.rmtree, artifact_dir, True)
+    artifact_path = os.path.join(artifact_dir, "lexicon.bin")
+    lexicon_artifacts.configure(path=artifact_path, session_factory=session_factory)
+    lexicon_artifacts.rebuild()
+    scratch_path = os.path.join(artifact_dir, "scratch.bin")
+
+    detector = SmartProhibitedDetector(db)
+    analyzer = ContentAnalyzer(db)
+    optimizer = ContentOptimizer(db)
+    emoji_inserter = EmojiInserter(db)
+
+    def analyze_per_request(text):
+        """与接口一致：每个请求新建分析器（含词库加载）"""
+        return loop.run_until_complete(ContentAnalyzer(db).analyze_content(text))
+
+    benchmarks = [
+        ("detector", detector.detect_prohibited_words, corpus),
+        ("detector_clean", detector.detect_prohibited_words, clean_corpus),
+        ("analyzer", lambda text: loop.run_until_complete(analyzer.analyze_content(text)), corpus),
+        ("analyzer_clean", lambda text: loop.run_until_complete(analyzer.analyze_content(text)), clean_corpus),
+        ("analyzer_per_request", analyze_per_request, corpus),
+        ("optimizer", lambda text: loop.run_until_complete(optimizer.optimize_content(text)), corpus),
+        ("emoji_inserter", emoji_inserter.analyze_content_and_insert_emojis, corpus),
+        # 冷启动：从数据库编译词库 vs 映射已编译的制品
+        ("lexicon_compile", lambda _: compile_lexicon(db, scratch_path), [None] * 3),
+        ("lexicon_open", lambda _: CompiledLexicon(artifact_path), [None] * 30),
+    ]
+    benchmarks.extend(build_http_benchmarks(session_factory, corpus, clean_corpus))
+    return benchmarks
+
+
+def build_http_benchmarks(session_factory, corpus, clean_corpus):
+    """通过TestClient测量完整HTTP路径（不触发应用启动时的数据库初始化）"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.database.connection import get_database
+
+    def override_database():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_database] = override_database
+    client = TestClient(app)
+
+    def post(path):
+        def call(text):
+            response = client.post(path, json={"content": text, "user_session": "benchmark"})
+            response.raise_for_status()
+            return response
+        return call
+
+    return [
+        ("http_analyze", post("/api/content/analyze"), corpus),
+        ("http_analyze_clean", post("/api/content/analyze"), clean_corpus),
+        ("http_optimize", post("/api/content/optimize"), corpus),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检测与优化引擎基准测试")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--only", help="只运行指定基准（逗号分隔）")
+    parser.add_argument("--save", help="保存结果为基线文件")
+    parser.add_argument("--compare", help="与基线文件比较")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="允许的相对退化幅度")
+    args = parser.parse_args()
+
+    scale = SCALES[args.scale]
+    lexicon = generate_lexicon(scale["lexicon"])
+    session_factory = build_session_factory(
+        lexicon,
+        generate_homophones(lexicon),
+        generate_whitelist(lexicon),
+        generate_emojis()
+    )
+    corpus = generate_corpus(scale["notes"], scale["length"], lexicon)
+    clean_corpus = generate_corpus(scale["notes"], scale["length"], lexicon, hit_rate=0)
+
+    print(f"规模: {args.scale}  词库: {scale['lexicon']}  笔记: {scale['notes']} x {scale['length']} 字")
+
+    selected = set(args.only.split(",")) if args.only else None
+    results = []
+    for name, func, inputs in build_benchmarks(session_factory, corpus, clean_corpus):
+        if selected and name not in selected:
+            continue
+        results.append(run_benchmark(name, func, inputs, repeat=scale["repeat"]))
+
+    print_results(results)
+
+    if args.save:
+        save_baseline(args.save, args.scale, results)
+
+    if args.compare:
+        regressions = compare_with_baseline(args.compare, args.scale, results, args.tolerance)
+        if regressions:
+            print("性能退化:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("与基线相比无明显退化")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+合成数据生成 - 可复现的违禁词库、谐音词库、白名单、表情和笔记语料
+"""
+import random
+from typing import Dict, List
+
+# 词库用字和正文用字部分重叠，既能构造命中，也能生成基本干净的正文
+LEXICON_CHARS = (
+    "减肥药包治百病广告推微商第一最好绝对神奇效果根治疗秘方独家权威专利限时特价优惠"
+    "抢购爆款暴利赚钱兼职代理加盟返现红包免费领取保证无效退款国家级顶级极品首选唯一"
+    "全网销量冠军史上奇迹速效瘦身丰胸美白祛斑增高壮阳催眠迷幻赌博彩票贷款套现刷单"
+)
+FILLER_CHARS = (
+    "今天天气很好我和朋友一起去公园散步看到很多花开了心情特别愉快晚上回家做了一顿饭"
+    "味道还不错分享给大家这家店的环境安静适合看书学习周末可以带家人来坐坐服务也热情"
+    "最近在学做甜点蛋糕烤得有点焦下次再试试咖啡豆是新买的香气很浓喝完整个人都精神了"
+)
+PUNCTUATION = "。！？，"
+EMOJIS = ["😊", "✨", "👍", "🌟", "💫", "🍰", "☕"]
+CATEGORIES = ["medical", "commercial", "absolute", "finance", "gambling", "adult", "fraud"]
+REPLACEMENT_TYPES = ["同音字", "形近字", "符号分隔", "英文混用"]
+
+
+def generate_lexicon(size: int, seed: int = 42, min_len: int = 2, max_len: int = 6) -> List[Dict]:
+    """生成合成违禁词库（词条唯一）"""
+    rng = random.Random(seed)
+    seen = set()
+    words = []
+    while len(words) < size:
+        length = rng.randint(min_len, max_len)
+        word = "".join(rng.choice(LEXICON_CHARS) for _ in range(length))
+        if word in seen:
+            continue
+        seen.add(word)
+        words.append({
+            "word": word,
+            "category": CATEGORIES[rng.randrange(len(CATEGORIES))],
+            "risk_level": rng.randint(1, 3)
+        })
+    return words
+
+
+def generate_homophones(lexicon: List[Dict], ratio: float = 0.2, seed: int = 43) -> Dict[str, List[Dict]]:
+    """为部分违禁词生成谐音替换"""
+    rng = random.Random(seed)
+    mappings = {}
+    for entry in lexicon:
+        if rng.random() >= ratio:
+            continue
+        word = entry["word"]
+        replacements = []
+        for i in range(rng.randint(1, 3)):
+            position = rng.randrange(1, len(word))
+            if i == 0:
+                replacement = word[:position] + "*" + word[position:]
+            else:
+                replacement = word[:position - 1] + rng.choice(FILLER_CHARS) + word[position:]
+            replacements.append({
+                "replacement": replacement,
+                "type": REPLACEMENT_TYPES[i % len(REPLACEMENT_TYPES)],
+                "priority": 1 if i == 0 and rng.random() < 0.5 else 0,
+                "confidence": round(rng.uniform(0.5, 0.95), 2)
+            })
+        mappings[word] = replacements
+    return mappings
+
+
+def generate_whitelist(lexicon: List[Dict], ratio: float = 0.05, seed: int = 44) -> List[Dict]:
+    """为部分违禁词生成白名单正则"""
+    rng = random.Random(seed)
+    patterns = []
+    for entry in lexicon:
+        if rng.random() >= ratio:
+            continue
+        word = entry["word"]
+        patterns.append({
+            "prohibited_word": word,
+            "pattern": f"不是{word}|{word}吗",
+            "category": "否定用法",
+            "priority": rng.randint(1, 3)
+        })
+    return patterns
+
+
+def generate_emojis(count: int = 60, seed: int = 45) -> List[Dict]:
+    """生成合成表情数据"""
+    rng = random.Random(seed)
+    names = ["开心", "快乐", "得意", "难过", "生气", "惊讶", "吃瓜", "好", "害羞", "哭惹"]
+    emojis = []
+    for i in range(count):
+        name = names[i % len(names)]
+        emojis.append({
+            "code": f"[{name}{i}R]",
+            "name": name,
+            "emoji_type": "R",
+            "category": "basic_emotions",
+            "subcategory": "正面情绪" if i % 2 == 0 else "负面情绪",
+            "keywords": [name, rng.choice(names)]
+        })
+    return emojis
+
+
+def generate_note(rng: random.Random, length: int, lexicon: List[Dict], hit_rate: float) -> str:
+    """生成一篇合成笔记：按句组织，按hit_rate在句中插入违禁词"""
+    parts = []
+    total = 0
+    sentence_count = 0
+    while total < length:
+        sentence_len = rng.randint(8, 30)
+        sentence = "".join(rng.choice(FILLER_CHARS) for _ in range(sentence_len))
+        if lexicon and rng.random() < hit_rate:
+            word = lexicon[rng.randrange(len(lexicon))]["word"]
+            cut = rng.randrange(len(sentence))
+            sentence = sentence[:cut] + word + sentence[cut:]
+        if rng.random() < 0.1:
+            sentence += rng.choice(EMOJIS)
+        sentence += rng.choice(PUNCTUATION)
+        sentence_count += 1
+        if sentence_count % 4 == 0:
+            sentence += "\n"
+        parts.append(sentence)
+        total += len(sentence)
+    return "".join(parts)[:length]
+
+
+def generate_corpus(count: int, length: int, lexicon: List[Dict], hit_rate: float = 0.3, seed: int = 46) -> List[str]:
+    """生成合成笔记语料；hit_rate=0 时生成不含注入违禁词的干净笔记"""
+    rng = random.Random(seed)
+    return [generate_note(rng, length, lexicon, hit_rate) for _ in range(count)]
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+编译词库制品（直接改动数据库后执行；运行中的服务在下次取用时自动切换到新制品）
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.connection import SessionLocal
+from app.core.config import LEXICON_ARTIFACT_PATH
+from app.core.lexicon_artifact import compile_lexicon, CompiledLexicon
+
+def main():
+    """主函数"""
+    path = sys.argv[1] if len(sys.argv) > 1 else LEXICON_ARTIFACT_PATH
+    print(f"开始编译词库制品: {path}")
+
+    db = SessionLocal()
+    try:
+        metadata = compile_lexicon(db, path)
+    except Exception as e:
+        print(f"编译词库制品失败: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    lexicon = CompiledLexicon(path)
+    print(f"违禁词 {metadata['prohibited_words']} 条，谐音原词 {metadata['homophone_originals']} 个，"
+          f"白名单词 {metadata['whitelist_words']} 个，耗时 {metadata['compile_ms']} 毫秒")
+    print(f"词库制品编译完成！版本 {lexicon.version}，大小 {os.path.getsize(path)} 字节")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+生产环境gunicorn配置 - 多个uvicorn工作进程，主进程预加载应用、词库和拼音库后fork（写时复制共享）
+
+    python run_production.py             # 启动
+    python run_production.py reload      # 滚动重载：主进程重新编译词库后替换工作进程，进行中的请求正常完成
+
+各项均可用环境变量覆盖。
+"""
+import gc
+import multiprocessing
+import os
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+worker_class = "app.core.workers.DrainingUvicornWorker"
+
+# 主进程导入应用并预热，工作进程fork后直接共享这些内存页
+preload_app = True
+
+# 处理一定数量请求后回收工作进程（加随机抖动，避免同时重启），防止内存缓慢增长
+max_requests = int(os.getenv("MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", 200))
+
+# 重载或回收时，旧工作进程最多等待这么久完成进行中的请求
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+timeout = int(os.getenv("WORKER_TIMEOUT", 60))
+keepalive = 5
+
+pidfile = os.getenv("GUNICORN_PID_FILE", os.path.join(BACKEND_DIR, "data", "gunicorn.pid"))
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+# 生产模式启动（数据库结构已是最新时跳过建表和初始化数据）；须在预加载应用之前设置
+os.environ.setdefault("STARTUP_MODE", "production")
+
+
+def when_ready(server):
+    """主进程就绪、首次fork之前：初始化数据库，映射词库，加载拼音库"""
+    from app.core.startup import preload_for_workers
+    lexicon = preload_for_workers()
+    server.log.info("主进程预加载完成: 词库版本 %s", lexicon.version)
+    # 预加载的对象移出GC跟踪，避免工作进程中的垃圾回收触碰这些页面导致写时复制
+    gc.freeze()
+
+
+def on_reload(server):
+    """收到HUP：主进程先重新编译并切换词库，随后新工作进程从主进程fork，旧工作进程处理完进行中的请求后退出"""
+    from app.core.startup import reload_lexicon_for_workers
+    lexicon = reload_lexicon_for_workers()
+    server.log.info("词库已重新映射: 版本 %s", lexicon.version)
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    server.log.info("工作进程已启动: pid %s", worker.pid)
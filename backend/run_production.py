@@ -0,0 +1,42 @@
+"""
+生产环境启动脚本 - gunicorn + uvicorn工作进程（配置见 gunicorn.conf.py）
+
+    python run_production.py           # 启动
+    python run_production.py reload    # 向主进程发送HUP，滚动重载词库
+"""
+import os
+import signal
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PID_FILE = os.getenv("GUNICORN_PID_FILE", os.path.join(BACKEND_DIR, "data", "gunicorn.pid"))
+
+
+def start():
+    """以gunicorn替换当前进程"""
+    os.chdir(BACKEND_DIR)
+    os.makedirs(os.path.dirname(PID_FILE), exist_ok=True)
+    os.environ.setdefault("STARTUP_MODE", "production")
+    print("🚀 正在以生产模式启动小红书内容优化工具后端服务...")
+    os.execvp(sys.executable, [
+        sys.executable, "-m", "gunicorn", "-c", os.path.join(BACKEND_DIR, "gunicorn.conf.py"), "app.main:app"
+    ])
+
+
+def reload():
+    """通知主进程滚动重载"""
+    try:
+        with open(PID_FILE) as f:
+            pid = int(f.read().strip())
+    except (OSError, ValueError):
+        print(f"❌ 未找到运行中的服务（{PID_FILE}）")
+        sys.exit(1)
+    os.kill(pid, signal.SIGHUP)
+    print(f"🔄 已通知主进程 {pid} 重载词库")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "reload":
+        reload()
+    else:
+        start()
@@ -0,0 +1,35 @@
+"""
+一致性检查测试 - 以固定种子运行 benchmarks 下的一致性检查，任何不一致都使测试失败
+
+各检查在导入 app 之前设置环境变量（近似匹配、分块大小等），配置在导入时读取，
+因此每个检查在独立的子进程中运行（在backend目录下执行 python -m pytest）。
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHECKS = [
+    # 增量评分（IncrementalScorer.rescore）与完整分析一致
+    ("check_incremental_score", "--cases", "200", "--seed", "1"),
+    ("check_incremental_score", "--cases", "200", "--seed", "7"),
+    # 词库预筛不漏报，跳过检测后的分析结果与完整分析相同
+    ("check_prefilter", "--cases", "300", "--seed", "1"),
+    ("check_prefilter", "--cases", "300", "--seed", "7"),
+    # 长文本分块检测合并后与整篇检测相同（当前进程逐块 / 经进程池）
+    ("check_chunked_analysis", "--cases", "30", "--seed", "1"),
+    ("check_chunked_analysis", "--cases", "5", "--seed", "2", "--pool"),
+]
+
+
+@pytest.mark.parametrize("check", CHECKS, ids=[" ".join(check) for check in CHECKS])
+def test_property_check(check):
+    module, *args = check
+    result = subprocess.run(
+        [sys.executable, "-m", f"benchmarks.{module}", *args],
+        cwd=BACKEND_DIR, capture_output=True, text=True, timeout=600
+    )
+    assert result.returncode == 0, f"{module} 出现不一致:\n{result.stdout[-4000:]}{result.stderr[-4000:]}"